@@ -4,16 +4,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from typing import List, Optional
 
-from app.database import async_session_maker
+from app.dao.base import BaseDAO
+from app.dao.session import read_session_scope
 from app.billing.models import Invoice, Transaction
 
-class InvoicesDAO:
+class InvoicesDAO(BaseDAO):
     model = Invoice
 
     @classmethod
     async def get_pending_invoices_count(cls, user_id: int) -> int:
         """Получить количество неоплаченных счетов"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = (select(func.count(cls.model.id))
                     .filter_by(user_id=user_id, status="pending"))
             result = await session.execute(query)
@@ -22,23 +23,28 @@ class InvoicesDAO:
     @classmethod
     async def get_user_invoices_count(cls, user_id: int) -> int:
         """Получить общее количество счетов пользователя"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = (select(func.count(cls.model.id))
                     .filter_by(user_id=user_id))
             result = await session.execute(query)
             return result.scalar()
 
+    @classmethod
+    async def get_user_invoices_page(cls, user_id: int, cursor: Optional[str] = None, limit: int = 50) -> dict:
+        """Получить страницу счетов пользователя (новые сначала)"""
+        return await cls.find_page(
+            order_by="-created_at",
+            after=cursor,
+            limit=limit,
+            options=(joinedload(cls.model.user),),
+            user_id=user_id
+        )
+
     @classmethod
     async def get_user_invoices(cls, user_id: int, limit: int = 50) -> List[Invoice]:
         """Получить счета пользователя"""
-        async with async_session_maker() as session:
-            query = (select(cls.model)
-                    .options(joinedload(cls.model.user))
-                    .filter_by(user_id=user_id)
-                    .order_by(cls.model.created_at.desc())
-                    .limit(limit))
-            result = await session.execute(query)
-            return result.unique().scalars().all()
+        page = await cls.get_user_invoices_page(user_id, limit=limit)
+        return page["items"]
 
 class TransactionsDAO:
     model = Transaction
@@ -46,7 +52,7 @@ class TransactionsDAO:
     @classmethod
     async def get_user_transactions(cls, user_id: int, limit: int = 50) -> List[Transaction]:
         """Получить транзакции пользователя"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = (select(cls.model)
                     .options(
                         joinedload(cls.model.user),
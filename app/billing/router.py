@@ -1,8 +1,10 @@
 # app/billing/router.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
 from app.users.dependencies import get_current_user
 from app.database import async_session_maker
 from app.users.models import User
+from app.billing.dao import InvoicesDAO
 
 router = APIRouter(prefix="/billing", tags=["Billing"])
 
@@ -12,9 +14,32 @@ async def get_balance(current_user: User = Depends(get_current_user)):
     pass
 
 @router.get("/invoices")
-async def get_invoices(current_user: User = Depends(get_current_user)):
-    """Получить историю счетов"""
-    pass
+async def get_invoices(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user)
+):
+    """Получить историю счетов (пагинация по курсору next_cursor)"""
+    try:
+        page = await InvoicesDAO.get_user_invoices_page(current_user.id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "invoices": [
+            {
+                "id": invoice.id,
+                "amount": invoice.amount,
+                "status": invoice.status,
+                "description": invoice.description,
+                "due_date": invoice.due_date,
+                "paid_at": invoice.paid_at,
+                "created_at": invoice.created_at
+            }
+            for invoice in page["items"]
+        ],
+        "next_cursor": page["next_cursor"]
+    }
 
 @router.post("/deposit")
 async def deposit_funds(
@@ -1,30 +1,36 @@
 from sqlalchemy import select, and_, or_
 from app.dao.base import BaseDAO
 from app.chat.models import Message
-from app.database import async_session_maker
+from app.dao.session import session_scope
 
 
 class MessagesDAO(BaseDAO):
     model = Message
 
-@classmethod
-async def get_messages_between_users(cls, user_id_1: int, user_id_2: int):
-    """
-    Асинхронно находит и возвращает все сообщения между двумя пользователями.
+    @classmethod
+    async def get_messages_between_users(cls, user_id_1: int, user_id_2: int,
+                                         cursor: str = None, limit: int = 100) -> dict:
+        """
+        Асинхронно находит и возвращает страницу сообщений между двумя пользователями.
 
-    Аргументы:
-        user_id_1: ID первого пользователя.
-        user_id_2: ID второго пользователя.
+        Аргументы:
+            user_id_1: ID первого пользователя.
+            user_id_2: ID второго пользователя.
+            cursor: Курсор для загрузки более ранних сообщений (next_cursor предыдущей страницы).
+            limit: Количество сообщений на странице.
 
-    Возвращает:
-        Список сообщений между двумя пользователями.
-    """
-    async with async_session_maker() as session:
-        query = select(cls.model).filter(
+        Возвращает:
+            Словарь {"items": сообщения в хронологическом порядке, "next_cursor": курсор или None}.
+        """
+        page = await cls.find_page(
             or_(
                 and_(cls.model.sender_id == user_id_1, cls.model.recipient_id == user_id_2),
                 and_(cls.model.sender_id == user_id_2, cls.model.recipient_id == user_id_1)
-            )
-        ).order_by(cls.model.id)
-        result = await session.execute(query)
-        return result.scalars().all()
\ No newline at end of file
+            ),
+            order_by="-id",
+            after=cursor,
+            limit=limit
+        )
+        # Страница выбирается от новых к старым, а отдается в порядке переписки
+        page["items"].reverse()
+        return page
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request, Response, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.chat.dao import MessagesDAO
 from app.chat.schemas import MessageRead, MessageCreate
 from app.users.dao import UsersDAO
@@ -17,13 +17,30 @@ templates = Jinja2Templates(directory='app/templates')
 # Страница чата
 @router.get("/", response_class=HTMLResponse, summary="Chat Page")
 async def get_chat_page(request: Request, user_data: User = Depends(get_current_user)):
-    users_all = await UsersDAO.find_all()
+    # Для списка собеседников нужны только id и ник — без ORM-объектов и join ролей
+    users_all = await UsersDAO.find_all(columns=['id', 'user_nick'])
     return templates.TemplateResponse("chat.html",
                                       {"request": request, "user": user_data, 'users_all': users_all})
 
 @router.get("/messages/{user_id}", response_model=List[MessageRead])
-async def get_messages(user_id: int, current_user: User = Depends(get_current_user)):
-    return await MessagesDAO.get_messages_between_users(user_id_1=user_id, user_id_2=current_user.id) or []
+async def get_messages(
+    user_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user)
+):
+    """Последние сообщения переписки; курсор более ранней страницы — в заголовке X-Next-Cursor"""
+    try:
+        page = await MessagesDAO.get_messages_between_users(
+            user_id_1=user_id, user_id_2=current_user.id, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["items"]
 
 @router.post("/messages", response_model=MessageCreate)
 async def send_message(message: MessageCreate, current_user: User = Depends(get_current_user)):
@@ -11,6 +11,102 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
 
+    # Короткоживущий access-токен с ролью в claims и refresh-токен для его продления
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Пул потоков для bcrypt: одновременных вычислений и максимум ожидающих (0 — без ограничения)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 100
+
+    # Одна сессия БД (unit of work) на HTTP-запрос
+    DB_REQUEST_SESSION: bool = True
+
+    # Реплики для чтения: DSN через запятую (пусто — все запросы идут в основную БД)
+    DB_REPLICA_URLS: str = ""
+    # Сколько секунд после записи клиент читает из основной БД (read-your-writes)
+    DB_STICKY_AFTER_WRITE_SECONDS: int = 5
+
+    # Пул соединений (на каждый воркер uvicorn и на каждую реплику)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # секунд ожидания свободного соединения
+    DB_POOL_RECYCLE: int = 1800  # секунд жизни соединения, -1 — без ограничения
+    DB_POOL_PRE_PING: bool = True
+    # Кэш подготовленных запросов asyncpg; 0 — для pgbouncer в режиме transaction
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    # Инструментация SQL (можно менять на лету через /monitoring/sql)
+    SQL_INSTRUMENTATION: bool = True
+    SQL_SLOW_QUERY_MS: int = 200
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10  # одинаковых запросов за HTTP-запрос
+    SQL_SLOW_LOG_PARAMS: bool = False  # True — значения параметров медленных запросов в логе
+
+    # Кэш сущностей find_one_or_none_by_id (модели с __cache_ttl__), записей на процесс
+    ENTITY_CACHE_SIZE: int = 10000
+    # Снимок текущего пользователя для get_current_user (хранится в том же кэше), секунд
+    PRINCIPAL_CACHE_TTL: int = 60
+    # Скомпилированные списки разрешенных IP пользователей (тот же кэш), секунд.
+    # Между воркерами не синхронизируется: удаленный адрес в других воркерах
+    # перестает пропускаться не позже чем через TTL
+    IP_ALLOWLIST_CACHE_TTL: int = 30
+
+    # Ограничение частоты входа и регистрации (скользящее окно, по IP и по email)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory — в процессе, redis — общий для воркеров
+    RATE_LIMIT_REDIS_URL: str = ""
+    RATE_LIMIT_MAX_KEYS: int = 100000  # ключей в памяти процесса
+    RATE_LIMIT_LOGIN_WINDOW: int = 60  # секунд
+    RATE_LIMIT_LOGIN_PER_IP: int = 20
+    RATE_LIMIT_LOGIN_PER_EMAIL: int = 10
+    RATE_LIMIT_REGISTER_WINDOW: int = 3600
+    RATE_LIMIT_REGISTER_PER_IP: int = 10
+    RATE_LIMIT_REGISTER_PER_EMAIL: int = 3
+
+    # Логирование приложения (app.logger)
+    LOG_LEVEL: str = "INFO"
+    LOG_RATE_LIMIT_BURST: int = 50  # записей с одного места вызова за окно, 0 — без ограничения
+    LOG_RATE_LIMIT_WINDOW_S: float = 10
+
+    # Отложенная пакетная запись журнала действий пользователей (users_logs)
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL_MS: int = 200
+    AUDIT_ENQUEUE_TIMEOUT_MS: int = 50  # ожидание места в очереди, затем синхронная запись
+
+    # Помесячные секции users_logs (PostgreSQL, app.users.log_partitions)
+    LOG_PARTITION_MONTHS_AHEAD: int = 12  # сколько будущих месяцев создавать заранее
+    LOG_PARTITION_MIN_MONTHS_AHEAD: int = 3  # меньший запас будущих секций — ошибка в логе
+    LOG_PARTITION_DETACH_ONLY: bool = False  # True — истекшие секции только отсоединяются, без DROP
+    LOG_PARTITION_LOCK_TIMEOUT_MS: int = 5000  # ожидание блокировки users_logs при DDL
+
+    # Пакетная очистка несекционированного users_logs (app.users.log_purge)
+    LOG_PURGE_BATCH_SIZE: int = 5000  # строк в одном DELETE
+    LOG_PURGE_PAUSE_MS: int = 200  # пауза между пакетами
+    LOG_PURGE_MAX_RUNTIME_S: int = 600  # предел длительности одного запуска, дальше — в следующий
+    LOG_PURGE_STATE_FILE: str = "logs/log_purge_state.json"  # водяной знак для продолжения
+
+    # Архив журнала перед очисткой (app.users.log_archive)
+    LOG_ARCHIVE_ENABLED: bool = True
+    LOG_ARCHIVE_DIR: str = "logs/archive"
+    # True — LOG_ARCHIVE_DIR доступен всем процессам, которые могут стать ведущими
+    # (общий том на всех узлах или один узел); без этого запуск с выбором ведущего не пройдет
+    LOG_ARCHIVE_DIR_SHARED: bool = False
+    LOG_ARCHIVE_COMPRESSION: str = "gzip"  # "zstd" — при установленном пакете zstandard
+    LOG_ARCHIVE_BLOCK_ROWS: int = 1000  # строк в независимо сжатом блоке (единица чтения)
+    LOG_ARCHIVE_SEGMENT_ROWS: int = 200000  # строк в одном файле-сегменте
+
+    # Выбор ведущего процесса для фоновых задач (advisory-блокировки PostgreSQL, app.tasks.leader)
+    LEADER_ELECTION_ENABLED: bool = True  # False — задачи выполняет каждый процесс
+    LEADER_RETRY_INTERVAL_S: int = 15  # как часто ведомые пробуют захватить лидерство
+    LEADER_CHECK_INTERVAL_S: int = 10  # как часто ведущий проверяет свое соединение
+
+    # Планировщик фоновых задач (app.tasks.scheduler, задачи — app.tasks.jobs)
+    SCHEDULER_JITTER_S: int = 30  # случайная задержка первого запуска задач
+    LOG_CLEANUP_DAYS: int = 30  # срок хранения users_logs
+    LOG_CLEANUP_INTERVAL_S: int = 86400
+    LOG_CLEANUP_CRON: str = ""  # например "30 3 * * *"; если задано, используется вместо интервала
+    LOG_CLEANUP_TIMEOUT_S: int = 3600
+
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
     )
@@ -23,5 +119,21 @@ def get_db_url():
     return (f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@"
             f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
 
+def get_engine_options():
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    }
+
+def get_replica_urls():
+    return [url.strip() for url in settings.DB_REPLICA_URLS.split(",") if url.strip()]
+
 def get_auth_data():
     return {"secret_key": settings.SECRET_KEY, "algorithm": settings.ALGORITHM}
\ No newline at end of file
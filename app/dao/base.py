@@ -1,89 +1,309 @@
 # app.dao.base.py
-from sqlalchemy.exc import SQLAlchemyError
+import base64
+import json
+from enum import Enum
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func
-from app.database import async_session_maker
+from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, insert as sqlalchemy_insert, func, tuple_, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.util import identity_key
+from app.dao.session import session_scope, read_session_scope, in_write_scope
+from app.dao.cache import entity_cache, get_cache_ttl, request_memo, invalidate_entities
 from app.utils.datetime_utils import DateTimeUtils
-from datetime import datetime
+from datetime import datetime, date
 
 
 class BaseDAO:
+    """
+    Базовый DAO. Все методы работают через session_scope(): внутри запроса
+    переиспользуется сессия запроса, вне его открывается своя транзакция.
+
+    Если у модели задан __cache_ttl__, find_one_or_none_by_id использует кэш
+    сущностей (app.dao.cache), а методы записи его сбрасывают.
+    """
     model = None
 
     @classmethod
-    async def find_one_or_none_by_id(cls, data_id: int):
+    async def find_one_or_none_by_id(cls, data_id: int, columns: list[str] = None,
+                                     as_rows: bool = False, as_dicts: bool = False):
         """
         Асинхронно находит и возвращает один экземпляр модели по указанным критериям или None.
 
         Аргументы:
             data_id: Критерии фильтрации в виде идентификатора записи.
+            columns, as_rows, as_dicts: Проекция без ORM-объектов (см. find_all).
 
         Возвращает:
-            Экземпляр модели или None, если ничего не найдено.
+            Экземпляр модели (строку/словарь при проекции) или None, если ничего не найдено.
         """
-        async with async_session_maker() as session:
-            query = select(cls.model).filter_by(id=data_id)
-            result = await session.execute(query)
-            return result.scalar_one_or_none()
+        ttl = get_cache_ttl(cls.model)
+        # В транзакционных блоках (read-modify-write) читаем из БД в обход кэша
+        if ttl is None or cls._is_projection(columns, as_rows, as_dicts) or in_write_scope():
+            return await cls.find_one_or_none(id=data_id, columns=columns, as_rows=as_rows, as_dicts=as_dicts)
+
+        key = (cls.model, data_id)
+        memo = request_memo()
+        if memo is not None and key in memo:
+            return memo[key]
+
+        async with read_session_scope() as session:
+            cached = entity_cache.get(key)
+            if cached is not None:
+                # Копия в сессии без запроса к БД; закэшированный экземпляр не меняется
+                instance = await session.merge(cached, load=False)
+            else:
+                already_loaded = identity_key(cls.model, data_id) in session.identity_map
+                instance = await session.get(cls.model, data_id)
+                if instance is not None and not already_loaded and not session.is_modified(instance):
+                    session.expunge(instance)
+                    entity_cache.set(key, instance, ttl)
+                    instance = await session.merge(instance, load=False)
+
+        if memo is not None and instance is not None:
+            memo[key] = instance
+        return instance
 
     @classmethod
-    async def find_one_or_none(cls, **filter_by):
+    async def find_one_or_none(cls, columns: list[str] = None, as_rows: bool = False,
+                               as_dicts: bool = False, **filter_by):
         """
         Асинхронно находит и возвращает один экземпляр модели по указанным критериям или None.
 
         Аргументы:
+            columns, as_rows, as_dicts: Проекция без ORM-объектов (см. find_all).
             **filter_by: Критерии фильтрации в виде именованных параметров.
 
         Возвращает:
-            Экземпляр модели или None, если ничего не найдено.
+            Экземпляр модели (строку/словарь при проекции) или None, если ничего не найдено.
         """
-        async with async_session_maker() as session:
-            query = select(cls.model).filter_by(**filter_by)
+        async with read_session_scope() as session:
+            query = cls._build_select(columns, as_rows, as_dicts).filter_by(**filter_by)
             result = await session.execute(query)
-            return result.scalar_one_or_none()
+            if not cls._is_projection(columns, as_rows, as_dicts):
+                return result.scalar_one_or_none()
+
+            row = result.one_or_none()
+            if row is not None and as_dicts:
+                return dict(row._mapping)
+            return row
 
     @classmethod
-    async def find_all(cls, **filter_by):
+    async def find_all(cls, columns: list[str] = None, as_rows: bool = False,
+                       as_dicts: bool = False, **filter_by):
         """
         Асинхронно находит и возвращает все экземпляры модели, удовлетворяющие указанным критериям.
 
         Аргументы:
+            columns: Выбрать только указанные поля (проекция) вместо целых объектов.
+            as_rows: Вернуть легкие строки (Row с доступом по имени поля) без
+                ORM-гидратации, identity map и жадных join-ов; без columns — все поля таблицы.
+            as_dicts: То же, но строки в виде словарей.
+            **filter_by: Критерии фильтрации в виде именованных параметров.
+
+        Возвращает:
+            Список экземпляров модели (строк/словарей при проекции).
+        """
+        async with read_session_scope() as session:
+            query = cls._build_select(columns, as_rows, as_dicts).filter_by(**filter_by)
+            result = await session.execute(query)
+            if not cls._is_projection(columns, as_rows, as_dicts):
+                return result.scalars().all()
+            if as_dicts:
+                return [dict(row._mapping) for row in result]
+            return result.all()
+
+    @classmethod
+    async def stream(cls, *criteria, batch_size: int = 1000, order_by=None, options: tuple = (),
+                     columns: list[str] = None, as_rows: bool = False, as_dicts: bool = False,
+                     **filter_by):
+        """
+        Асинхронный генератор по большой выборке: строки читаются серверным
+        курсором пачками по batch_size (yield_per), поэтому память не зависит
+        от размера таблицы. Использует отдельную сессию на время обхода.
+
+        Аргументы:
+            *criteria: Дополнительные SQL-условия.
+            batch_size: Сколько строк забирать из курсора за раз.
+            order_by: Поле или список полей сортировки (как в find_page), по умолчанию без сортировки.
+            options: Опции загрузки (только связи "многие к одному", например joinedload).
+            columns, as_rows, as_dicts: Проекция без ORM-объектов (см. find_all).
+            **filter_by: Критерии фильтрации в виде именованных параметров.
+
+        Возвращает:
+            Асинхронный итератор экземпляров модели (строк/словарей при проекции).
+        """
+        projection = cls._is_projection(columns, as_rows, as_dicts)
+        query = cls._build_select(columns, as_rows, as_dicts).filter_by(**filter_by).where(*criteria)
+        if options:
+            query = query.options(*options)
+        if order_by is not None:
+            query = query.order_by(*cls.keyset_order(order_by))
+
+        execution_options = {"yield_per": batch_size}
+        async with read_session_scope(dedicated=True) as session:
+            if not projection:
+                result = await session.stream_scalars(query, execution_options=execution_options)
+                async for instance in result:
+                    yield instance
+                return
+
+            result = await session.stream(query, execution_options=execution_options)
+            async for row in result:
+                yield dict(row._mapping) if as_dicts else row
+
+    @classmethod
+    async def exists(cls, *criteria, **filter_by) -> bool:
+        """
+        Проверяет наличие записи одним запросом SELECT EXISTS(...), не загружая ее.
+
+        Аргументы:
+            *criteria: Дополнительные SQL-условия.
+            **filter_by: Критерии фильтрации в виде именованных параметров.
+
+        Возвращает:
+            True, если хотя бы одна запись удовлетворяет условиям.
+        """
+        subquery = select(literal(1)).select_from(cls.model).filter_by(**filter_by).where(*criteria)
+        async with read_session_scope() as session:
+            return bool(await session.scalar(select(subquery.exists())))
+
+    @classmethod
+    async def find_page(cls, *criteria, order_by="-id", after: str = None, limit: int = 50,
+                        options: tuple = (), query=None, **filter_by) -> dict:
+        """
+        Keyset (cursor) пагинация: вместо OFFSET используется условие
+        WHERE (col, id) < (...) по индексу, поэтому время выборки страницы
+        не растет с размером таблицы и номером страницы.
+
+        Аргументы:
+            *criteria: Дополнительные SQL-условия (например, диапазон дат).
+            order_by: Поле или список полей сортировки; префикс "-" — по убыванию.
+                Все поля должны иметь одно направление, id добавляется автоматически.
+            after: Курсор, полученный из предыдущей страницы (next_cursor).
+            limit: Размер страницы.
+            options: Опции загрузки (joinedload и т.п.).
+            query: Готовый SELECT нужных колонок (например, с join-ами) вместо
+                целых объектов модели; поля сортировки должны входить в выборку
+                под своими именами. Фильтры тогда передаются только через criteria.
             **filter_by: Критерии фильтрации в виде именованных параметров.
 
         Возвращает:
-            Список экземпляров модели.
+            Словарь {"items": список экземпляров (словарей при query),
+            "next_cursor": курсор или None}.
         """
-        async with async_session_maker() as session:
-            query = select(cls.model).filter_by(**filter_by)
+        names, descending = cls._parse_order_by(order_by)
+        columns = [getattr(cls.model, name) for name in names]
+
+        projection = query is not None
+        if projection:
+            query = query.where(*criteria)
+        else:
+            query = select(cls.model).options(*options).filter_by(**filter_by).where(*criteria)
+        if after:
+            values = cls._decode_cursor(after, columns)
+            if descending:
+                query = query.where(tuple_(*columns) < tuple_(*values))
+            else:
+                query = query.where(tuple_(*columns) > tuple_(*values))
+
+        query = query.order_by(*cls.keyset_order(order_by))
+        query = query.limit(limit + 1)
+
+        async with read_session_scope() as session:
             result = await session.execute(query)
-            return result.scalars().all()
+            if projection:
+                items = [dict(row._mapping) for row in result]
+            else:
+                items = list(result.unique().scalars().all())
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = cls.make_cursor(items[-1], order_by)
+
+        return {"items": items, "next_cursor": next_cursor}
 
     @classmethod
-    async def add(cls, **values):
+    def keyset_order(cls, order_by="-id") -> list:
+        """
+        ORDER BY страниц find_page: поля order_by и id в конце, поэтому порядок
+        однозначен и при равных значениях полей. Страницы, выбранные иначе
+        (например, OFFSET), сортируются так же, чтобы их курсор был корректен.
+        """
+        names, descending = cls._parse_order_by(order_by)
+        columns = [getattr(cls.model, name) for name in names]
+        return [col.desc() if descending else col.asc() for col in columns]
+
+    @classmethod
+    def make_cursor(cls, instance, order_by="-id") -> str:
+        """Строит курсор find_page, указывающий на позицию сразу после instance (объекта или словаря)"""
+        names, _ = cls._parse_order_by(order_by)
+        if isinstance(instance, dict):
+            values = [instance[name] for name in names]
+        else:
+            values = [getattr(instance, name) for name in names]
+        return cls._encode_cursor(values)
+
+    @classmethod
+    async def estimate_count(cls, *criteria, **filter_by) -> tuple[int, bool]:
+        """
+        Количество строк по критериям без полного COUNT(*).
+
+        В PostgreSQL берется оценка планировщика (EXPLAIN, строится по
+        статистике таблицы и не читает сами строки), в остальных СУБД —
+        точный COUNT.
+
+        Возвращает:
+            Кортеж (количество, признак приблизительной оценки).
+        """
+        query = select(cls.model.id).filter_by(**filter_by).where(*criteria)
+        async with read_session_scope() as session:
+            dialect = session.get_bind().dialect
+            if dialect.name != "postgresql":
+                total = await session.scalar(select(func.count()).select_from(query.subquery()))
+                return total or 0, False
+
+            # Значения фильтров — простые скаляры, подставляем их литералами
+            sql = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+            connection = await session.connection()
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"]), True
+
+    @classmethod
+    async def add(cls, returning: bool = False, **values):
         """
         Асинхронно создает новый экземпляр модели с указанными значениями.
         Автоматически обрабатывает datetime поля.
 
         Аргументы:
+            returning: Если True, выполняет один INSERT ... RETURNING: экземпляр
+                возвращается сразу со значениями по умолчанию из БД (created_at и т.п.)
+                без отдельного refresh.
             **values: Именованные параметры для создания нового экземпляра модели.
 
         Возвращает:
             Созданный экземпляр модели.
         """
-        async with async_session_maker() as session:
-            async with session.begin():
-                # Обрабатываем datetime поля
-                processed_values = cls._process_datetime_values(values)
-                
-                new_instance = cls.model(**processed_values)
-                session.add(new_instance)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
+        async with session_scope() as session:
+            # Обрабатываем datetime поля
+            processed_values = cls._process_datetime_values(values)
+
+            if returning:
+                result = await session.scalars(
+                    sqlalchemy_insert(cls.model).returning(cls.model), [processed_values]
+                )
+                new_instance = result.one()
+                invalidate_entities(cls.model, [new_instance.id], session)
                 return new_instance
 
+            new_instance = cls.model(**processed_values)
+            session.add(new_instance)
+            await session.flush()
+            invalidate_entities(cls.model, [new_instance.id], session)
+            return new_instance
+
     @classmethod
     async def add_many(cls, instances: list[dict]):
         """
@@ -96,21 +316,135 @@ class BaseDAO:
         Возвращает:
             Список созданных экземпляров модели.
         """
-        async with async_session_maker() as session:
-            async with session.begin():
-                # Обрабатываем datetime поля для каждого экземпляра
-                processed_instances = [
-                    cls.model(**cls._process_datetime_values(instance_data))
-                    for instance_data in instances
-                ]
-                
-                session.add_all(processed_instances)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return processed_instances
+        return await cls.bulk_insert(instances)
+
+    @classmethod
+    async def bulk_insert(cls, rows: list[dict], returning: bool = True):
+        """
+        Массовая вставка одним многострочным INSERT ... RETURNING
+        (без создания объектов по одному через unit of work).
+
+        Аргументы:
+            rows: Список словарей со значениями полей.
+            returning: Если True, возвращает созданные экземпляры модели.
+
+        Возвращает:
+            Список созданных экземпляров модели или количество вставленных строк.
+        """
+        if not rows:
+            return [] if returning else 0
+
+        processed_rows = [cls._process_datetime_values(row) for row in rows]
+        async with session_scope() as session:
+            if returning:
+                result = await session.scalars(
+                    sqlalchemy_insert(cls.model).returning(cls.model), processed_rows
+                )
+                return list(result.all())
+
+            await session.execute(sqlalchemy_insert(cls.model), processed_rows)
+            return len(processed_rows)
+
+    @classmethod
+    async def bulk_upsert(cls, rows: list[dict], conflict_cols: list[str], update_cols=None,
+                          returning: bool = True):
+        """
+        Массовая вставка с обновлением при конфликте:
+        INSERT ... ON CONFLICT (conflict_cols) DO UPDATE ... RETURNING одним запросом.
+
+        Аргументы:
+            rows: Список словарей с одинаковым набором полей.
+            conflict_cols: Поля уникального индекса, по которому определяется конфликт.
+            update_cols: Поля, обновляемые при конфликте. Список имен (берутся значения
+                из вставляемой строки) или словарь {поле: выражение}; если выражение
+                вызываемое, оно получает EXCLUDED-строку. Пусто — DO NOTHING.
+            returning: Если True, возвращает вставленные/обновленные экземпляры модели.
+
+        Возвращает:
+            Список экземпляров модели или количество затронутых строк.
+        """
+        if not rows:
+            return [] if returning else 0
+
+        # Одна строка не может быть затронута дважды в одном ON CONFLICT — оставляем последнюю
+        unique_rows = {}
+        for row in rows:
+            processed = cls._process_datetime_values(row)
+            unique_rows[tuple(processed[col] for col in conflict_cols)] = processed
+
+        stmt = pg_insert(cls.model).values(list(unique_rows.values()))
+        if update_cols:
+            if isinstance(update_cols, dict):
+                set_ = {
+                    col: value(stmt.excluded) if callable(value) else value
+                    for col, value in update_cols.items()
+                }
+            else:
+                set_ = {col: stmt.excluded[col] for col in update_cols}
+            stmt = stmt.on_conflict_do_update(index_elements=conflict_cols, set_=set_)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict_cols)
+
+        async with session_scope() as session:
+            invalidate_entities(cls.model, None, session)
+            if returning:
+                result = await session.scalars(
+                    stmt.returning(cls.model),
+                    execution_options={"populate_existing": True}
+                )
+                return list(result.all())
+
+            result = await session.execute(stmt)
+            return result.rowcount
+
+    @classmethod
+    async def copy_records(cls, rows: list[dict], columns: list[str] = None) -> int:
+        """
+        Быстрая загрузка больших объемов через COPY (asyncpg copy_records_to_table).
+        Python-значения по умолчанию колонок подставляются автоматически,
+        ORM-события и RETURNING не используются.
+
+        Аргументы:
+            rows: Список словарей со значениями полей.
+            columns: Загружаемые поля; по умолчанию — ключи первой строки.
+
+        Возвращает:
+            Количество загруженных строк.
+        """
+        if not rows:
+            return 0
+
+        table = cls.model.__table__
+        mapper_columns = cls.model.__mapper__.columns
+        columns = list(columns or rows[0].keys())
+
+        # Колонки с Python default, которых нет во входных данных
+        defaults = {
+            key: column.default
+            for key, column in mapper_columns.items()
+            if key not in columns and column.default is not None and not column.primary_key
+        }
+        columns += list(defaults)
+
+        records = []
+        for row in rows:
+            processed = cls._process_datetime_values(row)
+            for key, default in defaults.items():
+                processed[key] = default.arg(None) if default.is_callable else default.arg
+            records.append(tuple(processed.get(key) for key in columns))
+
+        async with session_scope() as session:
+            # COPY идет мимо ORM — отмечаем запись явно (read-your-writes)
+            session.info["has_writes"] = True
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                table.name,
+                records=records,
+                columns=[mapper_columns[key].name for key in columns],
+                schema_name=table.schema
+            )
+        return len(records)
 
     @classmethod
     async def update(cls, filter_by, **values):
@@ -125,21 +459,41 @@ class BaseDAO:
         Возвращает:
             Количество обновленных экземпляров модели.
         """
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = (
-                    sqlalchemy_update(cls.model)
-                    .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
-                    .values(**values)
-                    .execution_options(synchronize_session="fetch")
-                )
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+        async with session_scope() as session:
+            # Синхронизация объектов сессии по умолчанию (evaluate) — без дополнительного SELECT
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+                .values(**values)
+            )
+            result = await session.execute(query)
+            cls._invalidate_cache(session, filter_by)
+            return result.rowcount
+
+    @classmethod
+    async def update_returning(cls, filter_by, **values):
+        """
+        Обновляет записи одним UPDATE ... RETURNING и возвращает их новое состояние
+        (без повторного чтения).
+
+        Аргументы:
+            filter_by: Критерии фильтрации в виде именованных параметров.
+            **values: Именованные параметры для обновления значений экземпляров модели.
+
+        Возвращает:
+            Список обновленных экземпляров модели.
+        """
+        async with session_scope() as session:
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+                .values(**values)
+                .returning(cls.model)
+            )
+            result = await session.scalars(query, execution_options={"populate_existing": True})
+            instances = list(result.all())
+            cls._invalidate_cache(session, filter_by)
+            return instances
 
     @classmethod
     async def delete(cls, delete_all: bool = False, **filter_by):
@@ -157,16 +511,38 @@ class BaseDAO:
             if not filter_by:
                 raise ValueError("Необходимо указать хотя бы один параметр для удаления.")
 
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+        async with session_scope() as session:
+            query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
+            result = await session.execute(query)
+            cls._invalidate_cache(session, filter_by)
+            return result.rowcount
+
+    @classmethod
+    async def delete_returning(cls, **filter_by):
+        """
+        Удаляет записи одним DELETE ... RETURNING.
+
+        Аргументы:
+            **filter_by: Критерии фильтрации в виде именованных параметров (обязательны).
+
+        Возвращает:
+            Список удаленных экземпляров модели (в состоянии до удаления).
+        """
+        if not filter_by:
+            raise ValueError("Необходимо указать хотя бы один параметр для удаления.")
+
+        async with session_scope() as session:
+            query = sqlalchemy_delete(cls.model).filter_by(**filter_by).returning(cls.model)
+            result = await session.scalars(query)
+            instances = list(result.all())
+            cls._invalidate_cache(session, filter_by)
+            return instances
+
+    @classmethod
+    def _invalidate_cache(cls, session, filter_by: dict):
+        """Сбрасывает кэш сущностей после записи: по id, если он в фильтре, иначе всю модель"""
+        ids = [filter_by["id"]] if "id" in filter_by else None
+        invalidate_entities(cls.model, ids, session)
             
     @classmethod
     def _process_datetime_values(cls, values: dict) -> dict:
@@ -179,3 +555,67 @@ class BaseDAO:
             if isinstance(value, datetime):
                 processed[key] = DateTimeUtils.to_naive_utc(value)
         return processed
+
+    @classmethod
+    def _build_select(cls, columns: list[str] = None, as_rows: bool = False, as_dicts: bool = False):
+        """SELECT целых объектов модели или только нужных колонок"""
+        if columns:
+            return select(*[getattr(cls.model, name) for name in columns])
+        if as_rows or as_dicts:
+            return select(*cls.model.__table__.columns)
+        return select(cls.model)
+
+    @staticmethod
+    def _is_projection(columns, as_rows: bool, as_dicts: bool) -> bool:
+        return bool(columns) or as_rows or as_dicts
+
+    @staticmethod
+    def _parse_order_by(order_by) -> tuple[list[str], bool]:
+        """Разбирает order_by find_page в список полей (с id в конце) и направление"""
+        fields = [order_by] if isinstance(order_by, str) else list(order_by)
+        descending = fields[0].startswith('-')
+        if any(field.startswith('-') != descending for field in fields):
+            raise ValueError("Все поля сортировки должны иметь одно направление")
+
+        names = [field.lstrip('-') for field in fields]
+        if 'id' not in names:
+            names.append('id')
+        return names, descending
+
+    @staticmethod
+    def _encode_cursor(values: list) -> str:
+        """Кодирует значения ключа сортировки в непрозрачный курсор"""
+        def default(value):
+            if isinstance(value, (datetime, date)):
+                return value.isoformat()
+            if isinstance(value, Enum):
+                return value.value
+            raise TypeError(f"Тип {type(value).__name__} не поддерживается в курсоре")
+
+        raw = json.dumps(values, default=default, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor: str, columns: list) -> list:
+        """Декодирует курсор и приводит значения к типам колонок сортировки"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+            if not isinstance(values, list) or len(values) != len(columns):
+                raise ValueError("число значений не совпадает с полями сортировки")
+
+            decoded = []
+            for column, value in zip(columns, values):
+                try:
+                    python_type = column.type.python_type
+                except NotImplementedError:
+                    python_type = None
+                if value is not None and python_type is datetime:
+                    value = datetime.fromisoformat(value)
+                elif value is not None and python_type is date:
+                    value = date.fromisoformat(value)
+                decoded.append(value)
+        except (ValueError, TypeError):
+            # Подделанный или поврежденный курсор — ошибка клиента (400), а не 500
+            raise ValueError("Некорректный курсор пагинации")
+        return decoded
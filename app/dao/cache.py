@@ -0,0 +1,128 @@
+# app/dao/cache.py
+"""
+Кэш сущностей для BaseDAO.find_one_or_none_by_id.
+
+Модель включает кэш атрибутом __cache_ttl__ (секунды). Два уровня:
+- память запроса: повторный запрос той же сущности в рамках HTTP-запроса
+  не идет в БД;
+- LRU процесса с TTL: отсоединенные экземпляры, которые при выдаче
+  копируются в сессию через merge(load=False) без SQL.
+
+Записи через BaseDAO (add/update/delete/bulk_upsert) и собственные методы
+записи DAO сбрасывают ключи сразу и повторно после коммита, чтобы
+параллельный запрос не успел закэшировать старое значение. Между воркерами
+кэш не синхронизируется — устаревание ограничено TTL модели.
+"""
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.dao.session import get_request_state
+
+
+class EntityCache:
+    """LRU-кэш с TTL: (модель, id) -> отсоединенный экземпляр"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        instance, expires_at = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return instance
+
+    def set(self, key, instance, ttl: float):
+        self._items[key] = (instance, time.monotonic() + ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def invalidate(self, model, ids: Optional[Iterable[int]] = None):
+        """Сбрасывает указанные id модели или все ее записи (ids=None)"""
+        if ids is None:
+            for key in [key for key in self._items if key[0] is model]:
+                del self._items[key]
+            return
+        for data_id in ids:
+            self._items.pop((model, data_id), None)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+entity_cache = EntityCache(maxsize=settings.ENTITY_CACHE_SIZE)
+
+
+def get_cache_ttl(model) -> Optional[float]:
+    """TTL кэша модели или None, если модель не кэшируется"""
+    return getattr(model, "__cache_ttl__", None)
+
+
+def request_memo() -> Optional[dict]:
+    """Память сущностей текущего HTTP-запроса (None вне запроса)"""
+    state = get_request_state()
+    if state is None:
+        return None
+    return state.setdefault("entities", {})
+
+
+def _invalidate_now(model, ids):
+    entity_cache.invalidate(model, ids)
+    memo = request_memo()
+    if memo:
+        if ids is None:
+            for key in [key for key in memo if key[0] is model]:
+                del memo[key]
+        else:
+            for data_id in ids:
+                memo.pop((model, data_id), None)
+
+
+def invalidate_entities(model, ids: Optional[Iterable[int]] = None, session=None):
+    """
+    Сбрасывает кэш сущностей модели после записи.
+
+    Аргументы:
+        model: Класс модели.
+        ids: Затронутые id; None — все записи модели.
+        session: Сессия записи; ключи будут сброшены повторно после ее коммита.
+    """
+    if get_cache_ttl(model) is None:
+        return
+
+    ids = None if ids is None else list(ids)
+    _invalidate_now(model, ids)
+    if session is not None:
+        session.info.setdefault("entity_invalidations", []).append((model, ids))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for model, ids in session.info.pop("entity_invalidations", []):
+        _invalidate_now(model, ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_invalidations(session, previous_transaction):
+    session.info.pop("entity_invalidations", None)
@@ -0,0 +1,290 @@
+# app/dao/session.py
+"""
+Единица работы (unit of work) для DAO.
+
+Сессия привязывается к контексту (contextvar): все вызовы DAO внутри запроса
+или внутри session_scope() используют одну AsyncSession и одну транзакцию,
+которая фиксируется один раз в конце.
+
+Транзакция запроса фиксируется, когда обработчик вернул ответ (перед
+отправкой заголовков). Вызовы DAO после этого (тело StreamingResponse,
+BackgroundTasks) открывают собственную транзакцию, а прямая запись в уже
+зафиксированную сессию запроса завершается ошибкой, а не теряется молча.
+
+Запись "по возможности" (ошибка которой не должна прерывать запрос)
+выполняется в savepoint_scope(): ошибка откатывает только точку сохранения,
+а не всю транзакцию запроса.
+
+Чтение (read_session_scope) направляется в реплики, если они настроены.
+В основную БД чтение идет внутри session_scope() (read-modify-write),
+после записи в текущем запросе и в течение окна "липкости" после записи
+этим же клиентом (cookie db_primary_until).
+"""
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import async_session_maker, read_session_makers
+
+
+STICKY_COOKIE = "db_primary_until"
+
+_current_session: ContextVar[Optional[AsyncSession]] = ContextVar("current_db_session", default=None)
+# Внутри session_scope() чтение идет из основной БД
+_force_primary: ContextVar[bool] = ContextVar("db_force_primary", default=False)
+# Состояние HTTP-запроса: {"read_session": сессия реплики, "sticky": читать из основной БД}
+_request_state: ContextVar[Optional[dict]] = ContextVar("db_request_state", default=None)
+
+_read_makers = itertools.cycle(read_session_makers) if read_session_makers else None
+
+
+class WriteAfterCommitError(RuntimeError):
+    """Запись в сессию HTTP-запроса после того, как ее транзакция зафиксирована"""
+
+
+def _check_not_committed(session):
+    if session.info.get("request_committed"):
+        raise WriteAfterCommitError(
+            "Транзакция запроса уже зафиксирована при отправке ответа; "
+            "запись выполняйте через DAO/session_scope() — они откроют отдельную транзакцию"
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _check_flush_writes(session, flush_context, instances):
+    if session.new or session.dirty or session.deleted:
+        _check_not_committed(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_writes(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _check_not_committed(orm_execute_state.session)
+        orm_execute_state.session.info["has_writes"] = True
+
+
+def _context_session() -> Optional[AsyncSession]:
+    """Сессия контекста, если ее транзакция еще открыта для записи"""
+    session = _current_session.get()
+    if session is not None and session.info.get("request_committed"):
+        return None
+    return session
+
+
+def get_current_session() -> Optional[AsyncSession]:
+    """Возвращает сессию, привязанную к текущему контексту, или None"""
+    return _context_session()
+
+
+def get_request_state() -> Optional[dict]:
+    """Состояние текущего HTTP-запроса (None вне UnitOfWorkMiddleware)"""
+    return _request_state.get()
+
+
+def in_write_scope() -> bool:
+    """Выполняется ли код внутри session_scope() (транзакционный блок)"""
+    return _force_primary.get()
+
+
+@asynccontextmanager
+async def session_scope(independent: bool = False):
+    """
+    Отдает сессию для работы DAO.
+
+    Если в контексте уже есть сессия (запрос или внешний session_scope),
+    переиспользует ее без коммита — транзакцией управляет владелец.
+    Иначе открывает новую сессию с транзакцией, привязывает ее к контексту
+    на время блока (вложенные вызовы DAO попадают в ту же транзакцию)
+    и фиксирует изменения при выходе.
+
+    independent=True всегда открывает новую сессию и транзакцию, даже внутри
+    запроса: так пакетные операции (очистка, архивация журнала) фиксируют
+    каждый пакет сразу, а не держат одну долгую транзакцию запроса.
+    """
+    primary_token = _force_primary.set(True)
+    try:
+        session = None if independent else _context_session()
+        if session is not None:
+            yield session
+            return
+
+        async with async_session_maker() as session:
+            token = _current_session.set(session)
+            try:
+                async with session.begin():
+                    yield session
+            finally:
+                _current_session.reset(token)
+    finally:
+        _force_primary.reset(primary_token)
+
+
+@asynccontextmanager
+async def savepoint_scope():
+    """
+    session_scope() внутри SAVEPOINT: при ошибке в блоке откатываются только
+    его изменения, транзакция запроса остается рабочей (исключение
+    пробрасывается — вызывающий код решает, игнорировать ли его).
+    """
+    async with session_scope() as session:
+        async with session.begin_nested():
+            yield session
+
+
+async def release_request_connection() -> None:
+    """
+    Возвращает соединения запроса в пул перед долгим ожиданием без БД
+    (bcrypt в пуле потоков и т.п.).
+
+    Транзакция запроса без записи завершается — следующий вызов DAO возьмет
+    соединение заново, в новой транзакции, которую так же зафиксирует
+    middleware. Транзакцию с записью не трогаем, чтобы не разрывать единицу
+    работы; внутри session_scope() вызов тоже ничего не делает.
+    """
+    if in_write_scope():
+        return
+
+    session = _context_session()
+    if session is not None and session.in_transaction() and not session.info.get("has_writes"):
+        await session.commit()
+
+    state = _request_state.get()
+    if state is not None and state["read_session"] is not None:
+        await state["read_session"].close()
+        state["read_session"] = None
+
+
+def _reads_from_primary() -> bool:
+    """Нужно ли читать из основной БД (нет реплик или важна свежесть данных)"""
+    if _read_makers is None or _force_primary.get():
+        return True
+
+    state = _request_state.get()
+    if state is not None and state["sticky"]:
+        return True
+
+    session = _context_session()
+    return session is not None and session.info.get("has_writes", False)
+
+
+@asynccontextmanager
+async def read_session_scope(dedicated: bool = False):
+    """
+    Отдает сессию для чтения.
+
+    Если реплики не настроены или нужна свежесть данных (см. _reads_from_primary),
+    работает как session_scope(). Иначе в рамках запроса используется одна
+    сессия реплики (закрывается middleware), вне запроса — временная.
+
+    dedicated=True всегда открывает отдельную сессию (основной БД или реплики)
+    на время блока — для долгих потоковых выборок через серверный курсор,
+    которые не должны занимать общую сессию запроса.
+    """
+    if dedicated:
+        maker = async_session_maker if _reads_from_primary() else next(_read_makers)
+        async with maker() as session:
+            yield session
+        return
+
+    if _reads_from_primary():
+        async with session_scope() as session:
+            yield session
+        return
+
+    state = _request_state.get()
+    if state is not None:
+        if state["read_session"] is None:
+            state["read_session"] = next(_read_makers)()
+        yield state["read_session"]
+        return
+
+    async with next(_read_makers)() as session:
+        yield session
+
+
+def _sticky_until(scope) -> float:
+    """Достает из cookie запроса момент окончания окна чтения из основной БД"""
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(STICKY_COOKIE)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return 0.0
+    return 0.0
+
+
+class UnitOfWorkMiddleware:
+    """
+    ASGI middleware: одна сессия БД на HTTP-запрос.
+
+    Соединение из пула берется лениво, при первом обращении к БД; перед
+    долгими ожиданиями без БД (проверка пароля) его отдает обратно
+    release_request_connection().
+    Транзакция фиксируется, когда обработчик вернул ответ (перед отправкой
+    заголовков, при любом статусе — как и раньше, когда каждый вызов DAO
+    фиксировался сам), поэтому ошибка коммита еще может вернуть клиенту 500.
+    Необработанное исключение откатывает транзакцию.
+    Если в запросе была запись, клиенту ставится cookie, и следующие
+    DB_STICKY_AFTER_WRITE_SECONDS секунд его чтения идут в основную БД.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = {"read_session": None, "sticky": _sticky_until(scope) > time.time()}
+
+        async with async_session_maker() as session:
+            token = _current_session.set(session)
+            state_token = _request_state.set(state)
+            response_started = False
+
+            async def send_wrapper(message):
+                nonlocal response_started
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await session.commit()
+                    # Дальше (тело ответа, фоновые задачи) DAO работает в своих транзакциях
+                    session.info["request_committed"] = True
+                    if _read_makers is not None and session.info.get("has_writes"):
+                        message = self._with_sticky_cookie(message)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                _current_session.reset(token)
+                _request_state.reset(state_token)
+                if state["read_session"] is not None:
+                    await state["read_session"].close()
+
+    @staticmethod
+    def _with_sticky_cookie(message):
+        window = settings.DB_STICKY_AFTER_WRITE_SECONDS
+        cookie = (f"{STICKY_COOKIE}={time.time() + window:.3f}; Max-Age={window}; "
+                  f"Path=/; HttpOnly; SameSite=Lax")
+        headers = list(message.get("headers", []))
+        headers.append((b"set-cookie", cookie.encode("latin-1")))
+        return {**message, "headers": headers}
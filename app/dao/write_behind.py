@@ -0,0 +1,235 @@
+# app/dao/write_behind.py
+"""
+Отложенная (write-behind) пакетная запись.
+
+Записи складываются в ограниченную очередь процесса, фоновая задача пишет
+их пачками — по batch_size записей или раз в flush_interval секунд, что
+наступит раньше. Если очередь заполнена, вызывающий ждет до
+enqueue_timeout (backpressure), после чего submit() возвращает False и
+запись нужно выполнить синхронно. Запуск и остановка (с дозаписью
+очереди) — в lifespan приложения.
+
+Записи, сделанные внутри транзакции (submit(row, session)), попадают в
+очередь только после ее коммита и отбрасываются при откате — как и
+изменения, о которых они сообщают. Если в момент коммита очередь
+заполнена, такие записи пишутся отдельной фоновой задачей.
+
+Пачка, которая не записалась за max_retries попыток из-за данных (а не
+из-за недоступности БД), делится пополам, пока не останутся отдельные
+записи: теряются и пишутся в лог только строки, которые не вставляются.
+"""
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.logger import app_logger as logger
+
+
+# Ошибки доступа к БД: деление пачки не поможет
+_CONNECTION_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+
+class WriteBehindWriter:
+    """Очередь записей и фоновая задача их пакетной записи"""
+
+    def __init__(self, name: str, flush: Callable[[List[dict]], Awaitable], queue_size: int,
+                 batch_size: int, flush_interval: float, enqueue_timeout: float, max_retries: int = 3):
+        self.name = name
+        self.flush = flush
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.rejected = 0
+        self.failed = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._overflow_tasks: set[asyncio.Task] = set()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    def start(self):
+        """Запускает фоновую запись (вызывать из работающего event loop)"""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._closing = False
+        self._task = asyncio.create_task(self._run(), name=f"write-behind-{self.name}")
+        logger.info(f"✅ Отложенная запись {self.name} запущена")
+
+    async def stop(self):
+        """Останавливает прием записей и дописывает очередь"""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._task
+        if self._overflow_tasks:
+            await asyncio.gather(*self._overflow_tasks, return_exceptions=True)
+        self._task = None
+        logger.info(f"✅ Отложенная запись {self.name} остановлена, записано {self.written}")
+
+    async def submit(self, row: dict, session: Session = None) -> bool:
+        """
+        Ставит запись в очередь.
+
+        Аргументы:
+            row: Значения записи.
+            session: Сессия текущей транзакции: запись встанет в очередь после
+                ее коммита и будет отброшена при откате.
+
+        Возвращает:
+            False, если запись не принята (запись не запущена или очередь
+            переполнена дольше enqueue_timeout) — тогда ее нужно записать синхронно.
+        """
+        if not self.is_running:
+            return False
+        if session is not None:
+            session.info.setdefault("write_behind_rows", []).append((self, row))
+            return True
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.backpressure_waits += 1
+            try:
+                await asyncio.wait_for(self._queue.put(row), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+        self.enqueued += 1
+        return True
+
+    def _submit_committed(self, rows: List[dict]):
+        """Записи закоммиченной транзакции: в очередь без ожидания, не поместившиеся — отдельной задачей"""
+        overflow = []
+        for row in rows:
+            try:
+                if not self.is_running:
+                    raise asyncio.QueueFull
+                self._queue.put_nowait(row)
+                self.enqueued += 1
+            except asyncio.QueueFull:
+                overflow.append(row)
+        if overflow:
+            self.backpressure_waits += 1
+            self.enqueued += len(overflow)
+            task = asyncio.get_running_loop().create_task(self._write(overflow))
+            self._overflow_tasks.add(task)
+            task.add_done_callback(self._overflow_tasks.discard)
+
+    async def _next_batch(self) -> List[dict]:
+        batch = []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            # Сначала забираем все, что уже лежит в очереди
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0 or self._closing:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while not (self._closing and self._queue.empty()):
+            batch = await self._next_batch()
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[dict]):
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.flush(batch)
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                error = e
+                logger.error(f"❌ Ошибка записи пачки {self.name} ({len(batch)} записей, попытка {attempt}): {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.5 * attempt)
+
+        if len(batch) > 1 and not isinstance(error, _CONNECTION_ERRORS):
+            # Ошибка в данных: ищем делением пачки строки, которые не вставляются
+            middle = len(batch) // 2
+            await self._write_isolating(batch[:middle])
+            await self._write_isolating(batch[middle:])
+            return
+        self._drop(batch, error)
+
+    async def _write_isolating(self, batch: List[dict]):
+        """Одна попытка записи; при ошибке — делим дальше до отдельных строк"""
+        try:
+            await self.flush(batch)
+            self.written += len(batch)
+            self.batches += 1
+            return
+        except Exception as e:
+            if len(batch) == 1 or isinstance(e, _CONNECTION_ERRORS):
+                self._drop(batch, e)
+                return
+        middle = len(batch) // 2
+        await self._write_isolating(batch[:middle])
+        await self._write_isolating(batch[middle:])
+
+    def _drop(self, rows: List[dict], error: Exception):
+        self.failed += len(rows)
+        logger.error(f"❌ {self.name}: потеряно записей: {len(rows)} ({error})")
+        for row in rows:
+            logger.error(f"❌ {self.name}: не записано: {row!r}")
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "running": self.is_running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "backpressure_waits": self.backpressure_waits,
+            "rejected": self.rejected,
+            "failed": self.failed
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_after_commit(session):
+    rows = session.info.pop("write_behind_rows", None)
+    if not rows:
+        return
+    by_writer: dict = {}
+    for writer, row in rows:
+        by_writer.setdefault(writer, []).append(row)
+    for writer, writer_rows in by_writer.items():
+        writer._submit_committed(writer_rows)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rows(session, previous_transaction):
+    # Транзакция откачена — события о ее изменениях не пишутся
+    # (откат SAVEPOINT внешнюю транзакцию не завершает)
+    if not session.in_transaction():
+        session.info.pop("write_behind_rows", None)
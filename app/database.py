@@ -5,15 +5,31 @@ from sqlalchemy import func
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, declared_attr, Mapped, mapped_column
 
-from app.config import get_db_url
+from app.config import get_db_url, get_replica_urls, get_engine_options
+from app.monitoring.pool_metrics import InstrumentedAsyncQueuePool, instrument_engine
+from app.monitoring.sql_metrics import instrument_sql
 
 
 DATABASE_URL = get_db_url()
 
-engine = create_async_engine(DATABASE_URL) # создаёт асинхронное подключение к базе данных PostgreSQL, используя драйвер asyncpg
+engine = create_async_engine(DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **get_engine_options()) # создаёт асинхронное подключение к базе данных PostgreSQL, используя драйвер asyncpg
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False) # создаёт фабрику асинхронных сессий, используя созданный движок. 
                                                                          # Сессии используются для выполнения транзакций в базе данных
 
+# Движки реплик только для чтения (маршрутизация — в app.dao.session.read_session_scope)
+read_engines = [
+    create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, **get_engine_options())
+    for url in get_replica_urls()
+]
+read_session_makers = [async_sessionmaker(read_engine, expire_on_commit=False) for read_engine in read_engines]
+
+# Метрики пулов (/monitoring/db/pool) и SQL-запросов (/monitoring/sql)
+instrument_engine(engine, "primary")
+instrument_sql(engine)
+for replica_index, read_engine in enumerate(read_engines, start=1):
+    instrument_engine(read_engine, f"replica_{replica_index}")
+    instrument_sql(read_engine)
+
 # настройка аннотаций
 int_pk = Annotated[int, mapped_column(primary_key=True)]
 created_at = Annotated[datetime, mapped_column(server_default=func.now())]
@@ -9,6 +9,15 @@ class TokenNoFoundException(HTTPException):
     def __init__(self):
         super().__init__(status_code=status.HTTP_401_UNAUTHORIZED, detail="Токен не найден")
 
+
+class TooManyRequestsException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много попыток, повторите позже",
+            headers={"Retry-After": str(retry_after)}
+        )
+
 UserAlreadyExistsException = HTTPException(status_code=status.HTTP_409_CONFLICT,
                                            detail='Пользователь уже существует')
 
@@ -5,6 +5,7 @@ from fastapi.templating import Jinja2Templates
 
 from app.users.dependencies import get_current_user
 from app.users.models import User
+from app.logger import app_logger as logger
 
 router = APIRouter(prefix='/lk', tags=['Личный кабинет'])
 templates = Jinja2Templates(directory='app/templates')
@@ -15,7 +16,7 @@ async def services_dashboard(
     current_user: User = Depends(get_current_user)
 ):
     """Панель управления пользователя с статистикой сервисов"""
-    print(f"📊 Загрузка панели управления для пользователя: {current_user.id}")
+    logger.debug("📊 Загрузка панели управления для пользователя: {}", current_user.id)
     
     try:
         from app.services.dao import ServicesDAO
@@ -28,7 +29,7 @@ async def services_dashboard(
         service_stats = await ServicesDAO.get_user_service_stats(current_user.id)
         
     except Exception as e:
-        print(f"Ошибка загрузки данных: {e}")
+        logger.warning("Ошибка загрузки данных: {}", e)
         # Используем временные данные
         user_services = []
         pending_invoices_count = 0
@@ -60,7 +61,7 @@ async def my_services(
         from app.services.dao import ServicesDAO
         user_services = await ServicesDAO.get_user_services(current_user.id)
     except Exception as e:
-        print(f"Ошибка загрузки сервисов: {e}")
+        logger.warning("Ошибка загрузки сервисов: {}", e)
     
     return templates.TemplateResponse("my_services.html", {
         "request": request,
@@ -80,7 +81,7 @@ async def my_invoices(
         from app.billing.dao import InvoicesDAO
         user_invoices = await InvoicesDAO.get_user_invoices(current_user.id)
     except Exception as e:
-        print(f"Ошибка загрузки счетов: {e}")
+        logger.warning("Ошибка загрузки счетов: {}", e)
     
     return templates.TemplateResponse("my_invoices.html", {
         "request": request,
@@ -1,7 +1,16 @@
 import logging
+import os
+import queue
+import random
 import sys
+import threading
+import time
+import zipfile
 from loguru import logger  # Рекомендую использовать loguru - очень удобно!
 
+from app.config import settings
+
+
 # Настройка intercept для стандартного logging
 class InterceptHandler(logging.Handler):
     def emit(self, record):
@@ -11,9 +20,10 @@ class InterceptHandler(logging.Handler):
         except ValueError:
             level = record.levelno
 
-        # Находим caller для корректного отображения
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
+        # Находим caller для корректного отображения: первый кадр вне модуля logging
+        # (кадр самого emit пропускается всегда)
+        frame, depth = sys._getframe(1), 1
+        while frame is not None and frame.f_code.co_filename == logging.__file__:
             frame = frame.f_back
             depth += 1
 
@@ -21,36 +31,162 @@ class InterceptHandler(logging.Handler):
             level, record.getMessage()
         )
 
+
+class RateLimitFilter:
+    """
+    Ограничение шумных сообщений: не больше burst записей с одного места
+    вызова (модуль, функция, строка) за window секунд. Лишние отбрасываются
+    до форматирования и записи в sink; число пропущенных пишется отдельным
+    предупреждением при первой записи с того же места в следующем окне.
+    Ошибки и критические сообщения не ограничиваются.
+
+    Выборка: logger.bind(sample=0.01).info(...) пропускает ~1% таких записей.
+
+    Фильтр не меняет запись. Один экземпляр используется всеми sink'ами:
+    loguru передает им один и тот же словарь записи, поэтому решение по
+    последней записи запоминается (в пределах потока) и не принимается дважды.
+    """
+
+    def __init__(self, burst: int, window: float, min_level: str = "ERROR"):
+        self.burst = burst
+        self.window = window
+        self.min_level = logger.level(min_level).no
+        self.suppressed = 0
+        self._sites: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        self._last = threading.local()
+
+    def __call__(self, record) -> bool:
+        last = getattr(self._last, "decision", None)
+        if last is not None and last[0] is record:
+            return last[1]
+
+        with self._lock:
+            decision, suppressed = self._decide(record)
+        self._last.decision = (record, decision)
+        if suppressed:
+            logger.bind(rate_limited=suppressed).warning(
+                "Пропущено похожих сообщений из {}:{}:{}: {}",
+                record["name"], record["function"], record["line"], suppressed
+            )
+            # Отчет сам прошел через фильтр — решение по текущей записи восстанавливается
+            self._last.decision = (record, decision)
+        return decision
+
+    def _decide(self, record) -> tuple[bool, int]:
+        """Пропустить ли запись и сколько записей с ее места пропущено в прошлом окне"""
+        if record["level"].no >= self.min_level:
+            return True, 0
+
+        sample = record["extra"].get("sample")
+        if sample is not None and random.random() >= sample:
+            return False, 0
+
+        if self.burst <= 0:
+            return True, 0
+        key = (record["name"], record["function"], record["line"])
+        now = time.monotonic()
+        site = self._sites.get(key)
+        if site is None or now - site[0] >= self.window:
+            # [начало окна, записей в окне, пропущено]
+            suppressed = site[2] if site is not None else 0
+            self._sites[key] = [now, 1, 0]
+            return True, suppressed
+        if site[1] < self.burst:
+            site[1] += 1
+            return True, 0
+        site[2] += 1
+        self.suppressed += 1
+        return False, 0
+
+
+def _zip_file(path: str):
+    tmp_path = f"{path}.zip.tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, os.path.basename(path))
+        os.replace(tmp_path, f"{path}.zip")
+        os.remove(path)
+    except OSError as e:
+        # Несжатый файл остается на месте и удаляется по сроку хранения
+        sys.stderr.write(f"Не удалось сжать {path}: {e}\n")
+
+
+# Один фоновый поток на все сжатия: файлы после ротации ждут в очереди
+_compression_queue: "queue.Queue[str]" = queue.Queue()
+_compression_lock = threading.Lock()
+_compression_worker = None
+
+
+def _compression_loop():
+    while True:
+        path = _compression_queue.get()
+        try:
+            _zip_file(path)
+        finally:
+            _compression_queue.task_done()
+
+
+def compress_in_background(path: str):
+    """
+    Сжатие файла после ротации (compression для loguru) в фоновом потоке:
+    поток записи логов не ждет zip. Поток-демон не держит завершение
+    процесса; несжатый к этому моменту файл удаляется по сроку хранения.
+    """
+    global _compression_worker
+    with _compression_lock:
+        if _compression_worker is None:
+            _compression_worker = threading.Thread(
+                target=_compression_loop, name="log-compression", daemon=True
+            )
+            _compression_worker.start()
+    _compression_queue.put(path)
+
+
+def wait_for_compression():
+    """Ждет, пока сжатие всех ротированных файлов завершится"""
+    _compression_queue.join()
+
+
 def setup_logger():
     """Настройка логгера для приложения"""
-    
+
     # Убираем стандартные обработчики
     logging.getLogger().handlers = []
-    
-    # Настраиваем loguru
+
+    rate_limit = RateLimitFilter(settings.LOG_RATE_LIMIT_BURST, settings.LOG_RATE_LIMIT_WINDOW_S)
+
+    # Настраиваем loguru. Файл ротируется и удаляется по сроку встроенными
+    # средствами loguru, сжатие после ротации — в отдельном потоке.
+    # enqueue=True не используется: pickle каждой записи дороже самой записи
+    # (benchmarks/bench_logging.py)
     logger.configure(
         handlers=[
             {
                 "sink": sys.stdout,
                 "format": "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-                "level": "INFO",
+                "level": settings.LOG_LEVEL,
                 "colorize": True,
+                "filter": rate_limit,
             },
             {
                 "sink": "logs/app.log",
                 "format": "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-                "level": "INFO",
+                "level": settings.LOG_LEVEL,
                 "rotation": "10 MB",  # Ротация логов по размеру
                 "retention": "30 days",  # Хранение логов 30 дней
-                "compression": "zip"  # Сжатие старых логов
+                # Сжатие старых логов в zip в отдельном потоке
+                "compression": compress_in_background,
+                "filter": rate_limit,
             }
         ]
     )
-    
-    # Перехватываем логи стандартной библиотеки
-    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
-    
+
+    # Перехватываем логи стандартной библиотеки; записи ниже LOG_LEVEL
+    # отбрасываются до форматирования сообщения
+    logging.basicConfig(handlers=[InterceptHandler()], level=settings.LOG_LEVEL, force=True)
+
     return logger
 
 # Глобальный логгер
-app_logger = setup_logger()
\ No newline at end of file
+app_logger = setup_logger()
@@ -6,9 +6,15 @@ from fastapi.responses import RedirectResponse
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.logger import app_logger as logger
-from app.tasks.log_cleanup_task import log_cleanup
-from app.tasks.background_tasks import background_tasks
-import asyncio
+from app.config import settings
+from app.dao.session import UnitOfWorkMiddleware
+from app.monitoring.sql_metrics import SQLMetricsMiddleware
+from app.users.tokens import TokenRefreshMiddleware
+from app.users.auth import password_hasher
+from app.users.dao import audit_log_writer
+from app.users.log_archive import check_archive_storage
+from app.tasks.scheduler import scheduler
+from app.tasks.jobs import register_jobs
 
 # Импортируем все необходимое
 from app.database import engine, async_session_maker
@@ -26,6 +32,7 @@ from app.students.router import router as router_students
 from app.majors.router import router as router_majors
 
 from app.users.router import router as router_users
+from app.tasks.router import router as router_jobs
 from app.roles.router import router as router_roles
 from app.pages.router import router as router_pages
 from app.lk.router import router as router_lk
@@ -73,10 +80,17 @@ async def lifespan(app: FastAPI):
        # Startup
     logger.info("🚀 Starting FastAPI application...")
     
+    # Архив журнала пишет ведущий процесс — каталог должен быть общим для узлов
+    check_archive_storage()
+
+    # Отложенная пакетная запись журнала действий
+    audit_log_writer.start()
+
     try:
-        # Запускаем фоновую задачу очистки логов
-        asyncio.create_task(log_cleanup.start_periodic_cleanup())
-        logger.info("✅ Фоновая задача очистки логов запущена")
+        # Периодические задачи (очистка логов и др.): один планировщик на процесс,
+        # выполняет задачу только ведущий процесс (app.tasks.leader)
+        register_jobs(scheduler)
+        scheduler.start()
         
     except Exception as e:
         logger.error(f"❌ Ошибка при запуске фоновых задач: {e}")
@@ -85,8 +99,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down application...")
-    log_cleanup.is_running = False
-    logger.info("✅ Фоновая задача очистки логов остановлена")
+    # Отменяем и дожидаемся запусков задач, слагаем лидерство
+    await scheduler.stop()
+
+    password_hasher.shutdown()
+
+    # Дописываем очередь журнала действий до закрытия соединений
+    await audit_log_writer.stop()
 
 
 app = FastAPI(
@@ -106,6 +125,16 @@ app.add_middleware(
     allow_headers=["*"],  # Разрешить все заголовки
 )
 
+# Одна сессия и одна транзакция БД на запрос для всех вызовов DAO
+if settings.DB_REQUEST_SESSION:
+    app.add_middleware(UnitOfWorkMiddleware)
+
+# Продление истекшего access-токена по refresh-токену до обработки запроса
+app.add_middleware(TokenRefreshMiddleware)
+
+# Счетчики SQL на запрос и Server-Timing (снаружи, чтобы учитывать и коммит)
+app.add_middleware(SQLMetricsMiddleware)
+
 
 
 # @app.get("/") # эндпоинт главной страницы
@@ -133,6 +162,8 @@ app.include_router(router_users)
 app.include_router(router_ticket)
 app.include_router(router_services)
 app.include_router(router_billing)
+app.include_router(router_monitoring)
+app.include_router(router_jobs)
 app.include_router(router_students)
 app.include_router(router_majors)
 app.include_router(router_roles)
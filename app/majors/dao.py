@@ -1,6 +1,6 @@
 from app.dao.base import BaseDAO
 from sqlalchemy.future import select
-from app.database import async_session_maker
+from app.dao.session import read_session_scope
 from app.majors.models import  Major
 
 class MajorsDAO(BaseDAO):
@@ -8,7 +8,7 @@ class MajorsDAO(BaseDAO):
 
     @classmethod
     async def find_full_data(cls, major_id: int):
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             # Запрос для получения информации о пользователе вместе с информацией о группе
             query_major = select(Major).filter_by(id=major_id)
             result_major = await session.execute(query_major)
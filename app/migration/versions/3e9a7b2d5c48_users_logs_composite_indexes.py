@@ -0,0 +1,51 @@
+"""users_logs composite indexes (user_id, created_at), (action_type, created_at)
+
+Revision ID: 3e9a7b2d5c48
+Revises: 8c4d2e6f1a07
+Create Date: 2026-10-17 23:05:37.918264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e9a7b2d5c48'
+down_revision: Union[str, Sequence[str], None] = '8c4d2e6f1a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = {
+    'ix_users_logs_user_id_created_at': ['user_id', 'created_at'],
+    'ix_users_logs_action_type_created_at': ['action_type', 'created_at'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в журнал, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name,
+                'users_logs',
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name,
+                table_name='users_logs',
+                if_exists=True,
+                postgresql_concurrently=True
+            )
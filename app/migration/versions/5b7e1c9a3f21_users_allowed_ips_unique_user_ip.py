@@ -0,0 +1,49 @@
+"""users_allowed_ips unique (user_id, ip_address)
+
+Revision ID: 5b7e1c9a3f21
+Revises: dd971b40a4e3
+Create Date: 2026-10-17 10:12:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e1c9a3f21'
+down_revision: Union[str, Sequence[str], None] = 'dd971b40a4e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('users_allowed_ips'):
+        return
+
+    # Удаляем дубликаты, оставляя самую раннюю запись
+    op.execute(
+        """
+        DELETE FROM users_allowed_ips a
+        USING users_allowed_ips b
+        WHERE a.user_id = b.user_id
+          AND a.ip_address = b.ip_address
+          AND a.id > b.id
+        """
+    )
+    op.create_index(
+        'uq_users_allowed_ips_user_ip',
+        'users_allowed_ips',
+        ['user_id', 'ip_address'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('users_allowed_ips'):
+        return
+
+    op.drop_index('uq_users_allowed_ips_user_ip', table_name='users_allowed_ips')
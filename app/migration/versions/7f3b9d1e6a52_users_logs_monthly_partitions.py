@@ -0,0 +1,112 @@
+"""users_logs monthly range partitions by created_at
+
+Revision ID: 7f3b9d1e6a52
+Revises: 3e9a7b2d5c48
+Create Date: 2026-10-17 23:41:09.337518
+
+ТРЕБУЕТ ОКНА ОБСЛУЖИВАНИЯ. Таблица переименовывается и копируется целиком
+(INSERT ... SELECT) в одной транзакции миграции: до ее конца users_logs
+удерживает ACCESS EXCLUSIVE, и любые запросы к журналу — вход в систему,
+аудит, выборки логов — ждут. Время простоя примерно равно времени копирования
+всех строк и построения индексов (порядка минут на десятки миллионов строк).
+Перед запуском остановите приложение (или хотя бы запись в журнал) и оцените
+объем: SELECT reltuples FROM pg_class WHERE relname = 'users_logs'.
+Большой журнал лучше предварительно сократить очисткой (LogCleaner).
+
+Секции создаются с запасом на MONTHS_AHEAD месяцев: default-секции нет, и
+вставка в месяц без секции завершится ошибкой. Дальше секции создает
+app.users.log_partitions.
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3b9d1e6a52'
+down_revision: Union[str, Sequence[str], None] = '3e9a7b2d5c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 12
+INDEXES = {
+    'ix_users_logs_user_id_created_at': ['user_id', 'created_at'],
+    'ix_users_logs_action_type_created_at': ['action_type', 'created_at'],
+}
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(bind) -> bool:
+    return bool(bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('users_logs'))"
+    )).scalar())
+
+
+def _rename_legacy():
+    """Освобождает имена таблицы, первичного ключа и индексов для новой таблицы"""
+    op.execute("ALTER TABLE users_logs RENAME TO users_logs_legacy")
+    op.execute("ALTER TABLE users_logs_legacy RENAME CONSTRAINT users_logs_pkey TO users_logs_legacy_pkey")
+    for name in INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name.replace('users_logs', 'users_logs_legacy')}")
+
+
+def _finish_new_table():
+    """Переносит строки, передает последовательность id новой таблице и удаляет старую"""
+    # Весь журнал копируется под ACCESS EXCLUSIVE — см. окно обслуживания в описании ревизии
+    op.execute("INSERT INTO users_logs SELECT * FROM users_logs_legacy")
+    op.execute("ALTER SEQUENCE IF EXISTS users_logs_id_seq OWNED BY users_logs.id")
+    op.execute("DROP TABLE users_logs_legacy")
+    op.create_foreign_key('users_logs_user_id_fkey', 'users_logs', 'users', ['user_id'], ['id'])
+    op.create_foreign_key('users_logs_changed_by_fkey', 'users_logs', 'users', ['changed_by'], ['id'])
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'users_logs', columns, unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or _is_partitioned(bind):
+        return
+
+    _rename_legacy()
+
+    # Ключ секционирования обязан входить в первичный ключ
+    op.execute(
+        "CREATE TABLE users_logs (LIKE users_logs_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER TABLE users_logs ADD CONSTRAINT users_logs_pkey PRIMARY KEY (id, created_at)")
+
+    # Секции: от самого старого месяца с данными до MONTHS_AHEAD месяцев вперед
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM users_logs_legacy")).scalar()
+    month = oldest.date().replace(day=1) if oldest else current
+    while month <= _add_months(current, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE users_logs_p{month:%Y%m} PARTITION OF users_logs "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+            f"TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+        month = _add_months(month, 1)
+
+    _finish_new_table()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or not _is_partitioned(bind):
+        return
+
+    _rename_legacy()
+    op.execute("CREATE TABLE users_logs (LIKE users_logs_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    op.execute("ALTER TABLE users_logs ADD CONSTRAINT users_logs_pkey PRIMARY KEY (id)")
+    # Секции удаляются вместе с секционированной таблицей
+    _finish_new_table()
@@ -0,0 +1,31 @@
+"""users.token_version
+
+Revision ID: 8c4d2e6f1a07
+Revises: 5b7e1c9a3f21
+Create Date: 2026-10-17 22:40:12.504118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4d2e6f1a07'
+down_revision: Union[str, Sequence[str], None] = '5b7e1c9a3f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), server_default=sa.text('0'), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,45 @@
+"""users_logs_daily_stats: journal summary by day and action_type
+
+Revision ID: a4c8e2f61b93
+Revises: 7f3b9d1e6a52
+Create Date: 2026-10-18 10:12:44.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e2f61b93'
+down_revision: Union[str, Sequence[str], None] = '7f3b9d1e6a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users_logs_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('action_type', sa.String(), nullable=False),
+        sa.Column('count', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.Column('first_at', sa.DateTime(timezone=False), nullable=False),
+        sa.Column('last_at', sa.DateTime(timezone=False), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'action_type')
+    )
+    # Начальное заполнение — единственный полный проход по журналу;
+    # дальше сводку поддерживает приложение (app.users.log_stats)
+    op.execute(
+        "INSERT INTO users_logs_daily_stats (day, action_type, count, first_at, last_at) "
+        "SELECT created_at::date, action_type, count(*), min(created_at), max(created_at) "
+        "FROM users_logs GROUP BY 1, 2"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('users_logs_daily_stats')
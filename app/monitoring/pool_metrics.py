@@ -0,0 +1,182 @@
+# app/monitoring/pool_metrics.py
+"""
+Метрики пула соединений SQLAlchemy.
+
+Счетчики заполняются событиями пула (connect/checkout/close/detach/invalidate),
+время ожидания соединения измеряется в InstrumentedAsyncQueuePool.connect().
+Метрики ведутся в памяти процесса, т.е. отдельно для каждого воркера uvicorn.
+"""
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+# Границы корзин гистограммы времени получения соединения, мс
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Гистограмма с фиксированными корзинами (кумулятивный вид как в Prometheus)"""
+
+    def __init__(self, buckets=CHECKOUT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        for index, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "buckets_ms": buckets
+        }
+
+
+class PoolMetrics:
+    """Метрики одного пула соединений"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.waiting = 0
+        self.wait_timeouts = 0
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.checkout_latency = LatencyHistogram()
+        self._connected_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, pool):
+        """Подписывается на события пула"""
+        self.pool = pool
+        pool._metrics = self
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "close", self._on_close)
+        event.listen(pool, "detach", self._on_close)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+            self._connected_at[id(connection_record)] = time.monotonic()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_close(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._connected_at.pop(id(connection_record), None)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+            self._connected_at.pop(id(connection_record), None)
+
+    def snapshot(self) -> dict:
+        """Текущее состояние пула и накопленные метрики"""
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - connected_at for connected_at in self._connected_at.values()]
+            latency = self.checkout_latency.snapshot()
+            counters = {
+                "waiting": self.waiting,
+                "wait_timeouts": self.wait_timeouts,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "invalidations": self.invalidations
+            }
+
+        pool = self.pool
+        return {
+            "name": self.name,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "recycle_seconds": pool._recycle,
+            **counters,
+            "checkout_latency": latency,
+            "connection_age_seconds": {
+                "count": len(ages),
+                "min": round(min(ages), 1) if ages else 0.0,
+                "max": round(max(ages), 1) if ages else 0.0,
+                "avg": round(sum(ages) / len(ages), 1) if ages else 0.0
+            }
+        }
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул, измеряющий ожидание соединения и число ожидающих"""
+
+    def connect(self):
+        metrics = getattr(self, "_metrics", None)
+        if metrics is None:
+            return super().connect()
+
+        with metrics._lock:
+            metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            with metrics._lock:
+                metrics.wait_timeouts += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with metrics._lock:
+                metrics.waiting -= 1
+                metrics.checkout_latency.observe(elapsed_ms)
+
+    def recreate(self):
+        # Пул пересоздается при dispose(); подписки на события переносит
+        # сам SQLAlchemy, остается перевесить метрики на новый пул
+        new_pool = super().recreate()
+        metrics = getattr(self, "_metrics", None)
+        if metrics is not None:
+            new_pool._metrics = metrics
+            metrics.pool = new_pool
+        return new_pool
+
+
+# Метрики всех пулов процесса: имя движка -> PoolMetrics
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(engine, name: str) -> PoolMetrics:
+    """Подключает сбор метрик к пулу асинхронного движка"""
+    metrics = PoolMetrics(name)
+    metrics.attach(engine.sync_engine.pool)
+    pool_metrics[name] = metrics
+    return metrics
+
+
+def get_pool_metrics() -> list[dict]:
+    """Снимок метрик всех зарегистрированных пулов"""
+    return [metrics.snapshot() for metrics in pool_metrics.values()]
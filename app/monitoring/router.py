@@ -1,12 +1,67 @@
 # app/monitoring/router.py
+from typing import Optional
 from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.users.dependencies import get_current_user
+from app.users.dependencies import get_current_user, get_current_admin
 from app.database import async_session_maker
 from app.users.models import User
+from app.monitoring.pool_metrics import get_pool_metrics
+from app.monitoring.sql_metrics import sql_config
+from app.dao.cache import entity_cache
+from app.users.auth import password_hasher
+from app.users.dao import audit_log_writer
 
 router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
 
+@router.get("/db/pool", summary="Состояние пулов соединений БД")
+async def get_db_pool_stats(current_user: User = Depends(get_current_admin)):
+    """
+    Метрики пулов соединений текущего воркера: занятые/свободные соединения,
+    overflow, ожидающие, гистограмма времени получения соединения и возраст соединений
+    """
+    return {"pools": get_pool_metrics()}
+
+
+@router.get("/cache/entities", summary="Статистика кэша сущностей")
+async def get_entity_cache_stats(current_user: User = Depends(get_current_admin)):
+    """Размер и попадания кэша find_one_or_none_by_id в этом воркере"""
+    return entity_cache.stats()
+
+
+@router.get("/auth/hashing", summary="Загрузка пула хеширования паролей")
+async def get_password_hashing_stats(current_user: User = Depends(get_current_admin)):
+    """Потоки bcrypt, глубина очереди, отказы и время ожидания/выполнения в этом воркере"""
+    return password_hasher.snapshot()
+
+
+@router.get("/audit/writer", summary="Очередь отложенной записи журнала действий")
+async def get_audit_writer_stats(current_user: User = Depends(get_current_admin)):
+    """Глубина очереди, записанные пачки, ожидания и отказы в этом воркере"""
+    return audit_log_writer.stats()
+
+
+class SSQLInstrumentationSettings(BaseModel):
+    enabled: Optional[bool] = Field(None, description="Включить сбор метрик SQL")
+    slow_query_ms: Optional[int] = Field(None, ge=1, description="Порог медленного запроса, мс")
+    n_plus_one_threshold: Optional[int] = Field(None, ge=1, description="Порог повторов шаблона запроса для N+1")
+
+
+@router.get("/sql", summary="Настройки инструментации SQL")
+async def get_sql_instrumentation(current_user: User = Depends(get_current_admin)):
+    """Текущие настройки инструментации SQL в этом воркере"""
+    return sql_config.to_dict()
+
+
+@router.put("/sql", summary="Изменить настройки инструментации SQL")
+async def update_sql_instrumentation(
+    data: SSQLInstrumentationSettings,
+    current_user: User = Depends(get_current_admin)
+):
+    """Включение/выключение и пороги инструментации SQL без перезапуска (в пределах воркера)"""
+    sql_config.update(**data.model_dump())
+    return sql_config.to_dict()
+
 @router.get("/services/{service_id}/stats")
 async def get_service_stats(
     service_id: int,
@@ -0,0 +1,199 @@
+# app/monitoring/sql_metrics.py
+"""
+Инструментация SQL-запросов.
+
+События before/after_cursor_execute движков считают запросы и время БД
+для текущего HTTP-запроса (contextvar), пишут медленные запросы в лог и
+помечают N+1 — один и тот же шаблон запроса, выполненный
+больше порога раз за запрос. SQLMetricsMiddleware отдает итог в заголовке
+Server-Timing и в полях лога. Настройки меняются на лету через
+/monitoring/sql (действуют в пределах процесса).
+
+Параметры медленных запросов (пароли, токены, персональные данные) в лог
+не пишутся — только их число; значения — только при SQL_SLOW_LOG_PARAMS=True.
+Этот флаг задается лишь в окружении, через API его не включить.
+"""
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.logger import app_logger as logger
+
+
+class SQLInstrumentationConfig:
+    """Текущие настройки инструментации (изменяемые во время работы)"""
+
+    def __init__(self):
+        self.enabled = settings.SQL_INSTRUMENTATION
+        self.slow_query_ms = settings.SQL_SLOW_QUERY_MS
+        self.n_plus_one_threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+        self.log_parameters = settings.SQL_SLOW_LOG_PARAMS
+
+    def update(self, **values):
+        for key, value in values.items():
+            if value is not None and hasattr(self, key):
+                setattr(self, key, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_ms,
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "log_parameters": self.log_parameters
+        }
+
+
+sql_config = SQLInstrumentationConfig()
+
+
+class RequestQueryStats:
+    """Статистика запросов к БД в рамках одного HTTP-запроса"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slow = 0
+        self.shapes = Counter()
+        self.n_plus_one = []
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+
+        shape = normalize_statement(statement)
+        self.shapes[shape] += 1
+        # Сообщаем об N+1 один раз на шаблон, в момент превышения порога
+        if self.shapes[shape] == sql_config.n_plus_one_threshold + 1:
+            self.n_plus_one.append(shape)
+            logger.warning(
+                f"⚠️ Возможный N+1: запрос выполнен больше {sql_config.n_plus_one_threshold} раз "
+                f"за один HTTP-запрос: {shape[:500]}"
+            )
+
+
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("sql_request_stats", default=None)
+
+_PARAM_RE = re.compile(r"(\$\d+|%\(\w+\)s|\?)")
+_PARAM_LIST_RE = re.compile(r"\(\s*\?(\s*,\s*\?)+\s*\)")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Шаблон запроса: параметры и списки IN (...) схлопываются, пробелы нормализуются"""
+    shape = _PARAM_RE.sub("?", statement)
+    shape = _PARAM_LIST_RE.sub("(?)", shape)
+    return _SPACES_RE.sub(" ", shape).strip()
+
+
+def describe_parameters(parameters, executemany: bool = False) -> str:
+    """Параметры запроса для лога: значения — только при log_parameters, иначе их число"""
+    if sql_config.log_parameters:
+        return str(parameters)[:1000]
+    if not parameters:
+        return "нет"
+    if executemany:
+        return f"скрыты ({len(parameters)} наборов)"
+    return f"скрыты ({len(parameters)})"
+
+
+def get_request_stats() -> Optional[RequestQueryStats]:
+    """Статистика запросов текущего HTTP-запроса или None"""
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if sql_config.enabled:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+
+    if elapsed_ms >= sql_config.slow_query_ms:
+        if stats is not None:
+            stats.slow += 1
+        logger.bind(db_time_ms=round(elapsed_ms, 2)).warning(
+            f"🐢 Медленный запрос ({elapsed_ms:.1f} мс): {_SPACES_RE.sub(' ', statement)[:1000]} "
+            f"| параметры: {describe_parameters(parameters, executemany)}"
+        )
+
+
+def _handle_error(exception_context):
+    # Ошибочный запрос не доходит до after_cursor_execute — снимаем отметку времени
+    connection = exception_context.connection
+    if connection is not None:
+        start_times = connection.info.get("query_start_time")
+        if start_times:
+            start_times.pop()
+
+
+def instrument_sql(engine):
+    """Подключает инструментацию SQL к асинхронному движку"""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class SQLMetricsMiddleware:
+    """
+    ASGI middleware: собирает статистику запросов к БД за HTTP-запрос,
+    добавляет заголовок Server-Timing и пишет итог в лог.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not sql_config.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                server_timing = f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries"'
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            self._log_summary(scope, stats)
+
+    @staticmethod
+    def _log_summary(scope, stats: RequestQueryStats):
+        if not stats.count:
+            return
+        request_logger = logger.bind(
+            method=scope.get("method"),
+            path=scope.get("path"),
+            db_queries=stats.count,
+            db_time_ms=round(stats.total_ms, 2),
+            db_slow_queries=stats.slow,
+            db_n_plus_one=len(stats.n_plus_one)
+        )
+        message = (f"SQL {scope.get('method')} {scope.get('path')}: "
+                   f"{stats.count} запросов, {stats.total_ms:.1f} мс")
+        # Проблемные запросы — на INFO, остальные — на DEBUG
+        if stats.slow or stats.n_plus_one:
+            request_logger.info(message)
+        else:
+            request_logger.debug(message)
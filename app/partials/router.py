@@ -31,6 +31,7 @@ from app.users.models import User
 from app.users.dependencies import get_current_user
 from app.roles.dependencies import require_roles
 from app.roles.models import Role, RoleTypes
+from app.logger import app_logger as logger
 
 router = APIRouter(prefix="/partials", tags=["Partial Pages"])
 templates = Jinja2Templates(directory="app/templates")
@@ -46,7 +47,7 @@ async def get_profile_partial(
     current_user: User = Depends(get_current_user)
 ):
     """Возвращает частичную страницу профиля без layout"""
-    print(f"🔄 Загрузка частичного профиля для пользователя: {current_user.id}")
+    logger.debug("🔄 Загрузка частичного профиля для пользователя: {}", current_user.id)
     
     try:
         response = templates.TemplateResponse("partials/profile.html", {
@@ -59,10 +60,10 @@ async def get_profile_partial(
             "registration_timestamp": int(current_user.created_at.timestamp()) if current_user.created_at else None,
             # "last_login_timestamp": int(current_user.last_login.timestamp()) if current_user.last_login else None
         })
-        print("✅ Частичный профиль успешно сгенерирован")
+        logger.debug("✅ Частичный профиль успешно сгенерирован")
         return response
     except Exception as e:
-        print(f"❌ Ошибка при генерации частичного профиля: {e}")
+        logger.error("❌ Ошибка при генерации частичного профиля: {}", e)
         return HTMLResponse(f"<div class='error'>Ошибка загрузки профиля: {str(e)}</div>")
 
 @router.get("/profile-simple", response_class=HTMLResponse)
@@ -86,7 +87,7 @@ async def get_all_services_partial(
         from app.services.dao import ServicesDAO
         user_services = await ServicesDAO.get_user_services(current_user.id)
     except Exception as e:
-        print(f"Ошибка загрузки сервисов: {e}")
+        logger.warning("Ошибка загрузки сервисов: {}", e)
         user_services = []
     
     return templates.TemplateResponse("partials/all_services.html", {
@@ -138,7 +139,7 @@ async def get_invoices_partial(
         from app.billing.dao import InvoicesDAO
         user_invoices = await InvoicesDAO.get_user_invoices(current_user.id)
     except Exception as e:
-        print(f"Ошибка загрузки счетов: {e}")
+        logger.warning("Ошибка загрузки счетов: {}", e)
         user_invoices = []
     
     return templates.TemplateResponse("partials/invoices.html", {
@@ -24,7 +24,7 @@ class RolesDAO(BaseDAO):
     @classmethod
     async def get_role_name_by_id(cls, role_id: int) -> str:
         """Получить название роли по ID"""
-        role = await cls.find_by_id(role_id)
+        role = await cls.find_one_or_none_by_id(role_id, columns=['role_name'])
         return role.role_name if role else "Неизвестная роль"
 
     @classmethod
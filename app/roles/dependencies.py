@@ -1,30 +1,32 @@
 # app/roles/dependencies.py
 from fastapi import Depends, HTTPException, status
-from app.users.dependencies import get_current_user
-from app.users.models import User
+from app.users.dependencies import get_current_user, get_token_claims
+from app.users.tokens import TokenClaims
 from app.roles.models import RoleTypes
 
 def require_roles(required_roles: list[RoleTypes]):
     """Зависимость для проверки ролей пользователя"""
-    async def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role_id not in required_roles:
+    async def role_checker(claims: TokenClaims = Depends(get_token_claims)):
+        # Роль проверяется по claims токена, без обращения к БД
+        if claims.role_id not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Недостаточно прав для доступа к этому ресурсу"
             )
-        return current_user
+        return await get_current_user(claims)
     return role_checker
 
 # Альтернативная версия если RoleTypes - это класс с константами
 def require_roles_list(required_role_ids: list[int]):
     """Зависимость для проверки ролей по ID"""
-    async def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role_id not in required_role_ids:
+    async def role_checker(claims: TokenClaims = Depends(get_token_claims)):
+        # Роль проверяется по claims токена, без обращения к БД
+        if claims.role_id not in required_role_ids:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Недостаточно прав для доступа к этому ресурсу"
             )
-        return current_user
+        return await get_current_user(claims)
     return role_checker
 
 # Специфичные проверки для разных уровней доступа
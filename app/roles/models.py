@@ -19,6 +19,9 @@ class Role(Base):
     role_description: Mapped[str_null_true]#[str] = mapped_column(String, nullable=True)
     count_users: Mapped[int] = mapped_column(server_default=text('0'))
 
+    # Кэш find_one_or_none_by_id, секунд (app.dao.cache)
+    __cache_ttl__ = 300
+
     # Определяем отношения: одна группа может иметь много пользователей
     users: Mapped[list["User"]] = relationship("User", back_populates="role")
     
@@ -32,26 +35,28 @@ class Role(Base):
     @classmethod
     async def increment_count(cls, role_id: int):
         """Увеличить счетчик пользователей роли"""
-        from app.database import async_session_maker
+        from app.dao.session import session_scope
+        from app.dao.cache import invalidate_entities
         from sqlalchemy import update
         
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             await session.execute(
                 update(cls).where(cls.id == role_id).values(count_users=cls.count_users + 1)
             )
-            await session.commit()
+            invalidate_entities(cls, [role_id], session)
     
     @classmethod
     async def decrement_count(cls, role_id: int):
         """Уменьшить счетчик пользователей роли"""
-        from app.database import async_session_maker
+        from app.dao.session import session_scope
+        from app.dao.cache import invalidate_entities
         from sqlalchemy import update
         
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             await session.execute(
                 update(cls).where(cls.id == role_id).values(count_users=cls.count_users - 1)
             )
-            await session.commit()
+            invalidate_entities(cls, [role_id], session)
     
     def __str__(self):
         return f"{self.__class__.__name__}(id={self.id}, role_name={self.role_name!r})"
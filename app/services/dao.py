@@ -4,8 +4,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from typing import List, Dict, Any, Optional
 
-from app.database import async_session_maker
-from app.services.models import Service, ServiceStatus
+from app.dao.base import BaseDAO
+from app.dao.session import read_session_scope
+from app.services.models import Service, ServiceStatus, BillingPlan
+
+class BillingPlansDAO(BaseDAO):
+    model = BillingPlan
+
+    @classmethod
+    async def get_plan(cls, plan_id: int) -> Optional[BillingPlan]:
+        """Получить тарифный план по ID (из кэша сущностей, если есть)"""
+        return await cls.find_one_or_none_by_id(plan_id)
+
+    @classmethod
+    async def get_active_plans(cls) -> List[BillingPlan]:
+        """Получить активные тарифные планы"""
+        return await cls.find_all(is_active=True)
+
 
 class ServicesDAO:
     model = Service
@@ -13,7 +28,7 @@ class ServicesDAO:
     @classmethod
     async def get_user_services(cls, user_id: int) -> List[Service]:
         """Получить все сервисы пользователя с загрузкой пользователя"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = (select(cls.model)
                     .options(joinedload(cls.model.user))
                     .filter_by(user_id=user_id)
@@ -24,7 +39,7 @@ class ServicesDAO:
     @classmethod
     async def get_user_service_stats(cls, user_id: int) -> Dict[str, Any]:
         """Получить статистику сервисов пользователя"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             # Количество сервисов по типам
             query = (select(cls.model.service_type, func.count(cls.model.id))
                     .filter_by(user_id=user_id)
@@ -47,7 +62,7 @@ class ServicesDAO:
     @classmethod
     async def get_service_with_user(cls, service_id: int) -> Optional[Service]:
         """Получить сервис с информацией о пользователе"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = (select(cls.model)
                     .options(joinedload(cls.model.user))
                     .filter_by(id=service_id))
@@ -59,6 +59,9 @@ class Service(Base):
 class BillingPlan(Base):
     __tablename__ = "billing_plans"
     __table_args__ = {'extend_existing': True}
+
+    # Кэш find_one_or_none_by_id, секунд (app.dao.cache)
+    __cache_ttl__ = 300
     
     id: Mapped[int_pk]
     name: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -4,7 +4,7 @@ from sqlalchemy.orm import joinedload
 from app.dao.base import BaseDAO
 from app.majors.models import Major
 from app.students.models import Student
-from app.database import async_session_maker
+from app.dao.session import session_scope, read_session_scope
 
 # мы создали событие after_insert для модели Student, 
 # которое автоматически обновляет счетчик студентов в 
@@ -36,7 +36,7 @@ class StudentDAO(BaseDAO):
 
     @classmethod
     async def find_students(cls, **student_data):
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             # Создайте запрос с фильтрацией по параметрам student_data
             query = select(cls.model).options(joinedload(cls.model.major)).filter_by(**student_data)
             result = await session.execute(query)
@@ -51,9 +51,17 @@ class StudentDAO(BaseDAO):
 
             return students_data
 
+    @classmethod
+    async def stream_students(cls, **student_data):
+        """Потоковый обход студентов в том же виде, что и find_students"""
+        async for student in cls.stream(options=(joinedload(cls.model.major),), order_by="id", **student_data):
+            student_dict = student.to_dict()
+            student_dict['major'] = student.major.major_name if student.major else None
+            yield student_dict
+
     @classmethod
     async def find_full_data(cls, student_id):
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             # Первый запрос для получения информации о студенте
             query = select(cls.model).options(joinedload(cls.model.major)).filter_by(id=student_id)
             result = await session.execute(query)
@@ -69,30 +77,26 @@ class StudentDAO(BaseDAO):
 
     @classmethod
     async def add_student(cls, **student_data: dict):
-        async with async_session_maker() as session:
-            async with session.begin():
-                new_student = cls.model(**student_data)
-                session.add(new_student)
-                await session.flush()
-                new_student_id = new_student.id
-                await session.commit()
-                return new_student_id
+        async with session_scope() as session:
+            new_student = cls.model(**student_data)
+            session.add(new_student)
+            await session.flush()
+            new_student_id = new_student.id
+            return new_student_id
 
     @classmethod
     async def delete_student_by_id(cls, student_id: int):
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = select(cls.model).filter_by(id=student_id)
-                result = await session.execute(query)
-                student_to_delete = result.scalar_one_or_none()
-
-                if not student_to_delete:
-                    return None
-
-                # Delete the student
-                await session.execute(
-                    delete(cls.model).filter_by(id=student_id)
-                )
-
-                await session.commit()
-                return student_id
\ No newline at end of file
+        async with session_scope() as session:
+            query = select(cls.model).filter_by(id=student_id)
+            result = await session.execute(query)
+            student_to_delete = result.scalar_one_or_none()
+
+            if not student_to_delete:
+                return None
+
+            # Delete the student
+            await session.execute(
+                delete(cls.model).filter_by(id=student_id)
+            )
+
+            return student_id
\ No newline at end of file
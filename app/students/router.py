@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query
 from app.students.dao import StudentDAO
 from app.students.rb import RBStudent
 from app.students.schemas import SStudent, SStudentAdd
+from app.utils.streaming import stream_response, STREAM_FORMATS
 
 
 
@@ -9,7 +11,17 @@ router = APIRouter(prefix='/students', tags=['Работа со студента
 
 
 @router.get("/", summary="Получить всех студентов")
-async def get_all_students(request_body: RBStudent = Depends()) -> list[SStudent]:
+async def get_all_students(
+    request_body: RBStudent = Depends(),
+    fmt: Optional[Literal["json", "ndjson", "csv"]] = Query(None, alias="format")
+) -> list[SStudent]:
+    if fmt in STREAM_FORMATS:
+        return stream_response(
+            StudentDAO.stream_students(**request_body.to_dict()),
+            fmt,
+            fieldnames=list(SStudent.model_fields),
+            filename="students"
+        )
     return await StudentDAO.find_students(**request_body.to_dict())
 
 
@@ -0,0 +1,39 @@
+# app/tasks/jobs.py
+"""Периодические задачи приложения и их регистрация в планировщике"""
+from app.config import settings
+from app.tasks.leader import log_cleanup_leader
+from app.tasks.scheduler import Job, Scheduler, IntervalTrigger, CronTrigger
+from app.users.log_cleaner import LogCleaner
+from app.users.log_purge import log_purger
+
+
+async def cleanup_logs(days_to_keep: int) -> dict:
+    """Удаление записей users_logs старше days_to_keep дней (секциями или пакетами)"""
+    deleted_count = await LogCleaner.cleanup_old_logs(days_to_keep)
+    return {"deleted_count": deleted_count}
+
+
+def validate_cleanup_params(params: dict):
+    if not isinstance(params["days_to_keep"], int) or params["days_to_keep"] < 1:
+        raise ValueError("days_to_keep должно быть положительным целым числом")
+
+
+def register_jobs(scheduler: Scheduler):
+    if settings.LOG_CLEANUP_CRON:
+        trigger = CronTrigger(settings.LOG_CLEANUP_CRON)
+    else:
+        trigger = IntervalTrigger(settings.LOG_CLEANUP_INTERVAL_S)
+
+    scheduler.add_job(Job(
+        "log_cleanup",
+        cleanup_logs,
+        trigger,
+        params={"days_to_keep": settings.LOG_CLEANUP_DAYS},
+        description="Очистка журнала действий пользователей (users_logs)",
+        timeout=settings.LOG_CLEANUP_TIMEOUT_S,
+        jitter=settings.SCHEDULER_JITTER_S,
+        run_on_start=True,
+        leader=log_cleanup_leader,
+        validate_params=validate_cleanup_params,
+        status_hook=log_purger.get_status
+    ))
@@ -0,0 +1,232 @@
+# app/tasks/leader.py
+"""
+Выбор ведущего процесса для периодических задач.
+
+Каждая задача (например, очистка журнала) выполняется только в одном
+процессе на все воркеры uvicorn и все узлы. Ведущий — процесс, который
+держит сессионную advisory-блокировку PostgreSQL pg_try_advisory_lock(key)
+на отдельном соединении (вне пула приложения, в autocommit — без
+висящей транзакции). Остальные раз в LEADER_RETRY_INTERVAL_S пробуют
+ее захватить.
+
+Переключение при сбое: блокировка снимается сервером, когда закрывается
+соединение ведущего — при остановке процесса сразу, при обрыве сети — по
+TCP keepalive. Ведущий раз в LEADER_CHECK_INTERVAL_S проверяет свое
+соединение и при ошибке слагает лидерство.
+
+Задача проверяет лидерство перед запуском; уже идущий запуск при потере
+лидерства не прерывается. Не на PostgreSQL или при
+LEADER_ELECTION_ENABLED=False процесс всегда считается ведущим.
+"""
+import asyncio
+import hashlib
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.database import DATABASE_URL, engine
+from app.logger import app_logger as logger
+
+
+def process_identity() -> str:
+    """Узел и PID текущего процесса (вычисляется при вызове — воркеры могут быть форками)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lock_key(name: str) -> int:
+    """Стабильный (одинаковый во всех процессах) 64-битный ключ блокировки"""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def _create_leader_engine(name: str):
+    # Имя приложения в pg_stat_activity показывает, какой процесс ведущий
+    return create_async_engine(
+        DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={
+            "server_settings": {
+                "application_name": f"leader:{name}:{process_identity()}"[:63],
+                "tcp_keepalives_idle": "10",
+                "tcp_keepalives_interval": "5",
+                "tcp_keepalives_count": "3",
+            }
+        }
+    )
+
+
+class LeaderElection:
+    """Лидерство одного процесса для задачи name"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.key = lock_key(name)
+        self.acquired_at: Optional[datetime] = None
+        self.elections_won = 0
+        self._enabled = settings.LEADER_ELECTION_ENABLED and engine.dialect.name == "postgresql"
+        self._engine = None
+        self._connection = None
+        self._task: Optional[asyncio.Task] = None
+        self._leader_event = asyncio.Event()
+
+    @property
+    def enabled(self) -> bool:
+        """Идет ли выбор ведущего (иначе процесс всегда ведущий)"""
+        return self._enabled
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_event.is_set()
+
+    def start(self):
+        """Запускает выборы (вызывать из работающего event loop)"""
+        if not self._enabled:
+            self._become_leader()
+            return
+        if self._task is None:
+            self._engine = _create_leader_engine(self.name)
+            self._task = asyncio.create_task(self._run(), name=f"leader-{self.name}")
+
+    async def stop(self):
+        """Слагает лидерство и закрывает соединение"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._release()
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+    async def wait_until_leader(self):
+        """Ждет, пока этот процесс не станет ведущим"""
+        await self._leader_event.wait()
+
+    def _become_leader(self):
+        self.acquired_at = datetime.now(timezone.utc)
+        self.elections_won += 1
+        self._leader_event.set()
+
+    async def _run(self):
+        while True:
+            try:
+                if self.is_leader:
+                    await self._check()
+                    await asyncio.sleep(settings.LEADER_CHECK_INTERVAL_S)
+                else:
+                    await self._try_acquire()
+                    if not self.is_leader:
+                        await asyncio.sleep(settings.LEADER_RETRY_INTERVAL_S)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка выбора ведущего для {self.name}: {e}")
+                await self._release()
+                await asyncio.sleep(settings.LEADER_RETRY_INTERVAL_S)
+
+    async def _try_acquire(self):
+        connection = await self._engine.connect()
+        try:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = await connection.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})
+        except Exception:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return
+
+        self._connection = connection
+        self._become_leader()
+        logger.info(f"👑 Процесс {process_identity()} стал ведущим для {self.name}")
+
+    async def _check(self):
+        try:
+            await asyncio.wait_for(
+                self._connection.execute(text("SELECT 1")),
+                timeout=settings.LEADER_CHECK_INTERVAL_S
+            )
+        except Exception as e:
+            # Соединение потеряно — сервер уже снял блокировку, ее может захватить другой процесс
+            logger.warning(f"⚠️ Процесс {process_identity()} потерял лидерство для {self.name}: {e}")
+            await self._release()
+
+    async def _release(self):
+        was_leader = self.is_leader and self._enabled
+        self._leader_event.clear()
+        self.acquired_at = None
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+        except Exception:
+            pass  # Закрытие соединения все равно снимает блокировку
+        finally:
+            try:
+                await connection.close()
+            except Exception:
+                pass
+        if was_leader:
+            logger.info(f"Процесс {process_identity()} сложил лидерство для {self.name}")
+
+    async def current_holder(self) -> Optional[dict]:
+        """Процесс, который держит блокировку (по данным сервера, с любого процесса)"""
+        if not self._enabled:
+            return {"identity": process_identity(), "pid": None, "client_addr": None, "since": None}
+
+        unsigned = self.key & 0xFFFFFFFFFFFFFFFF
+        async with engine.connect() as connection:
+            row = (await connection.execute(
+                text(
+                    "SELECT a.pid, a.application_name, a.client_addr::text, a.backend_start "
+                    "FROM pg_locks l JOIN pg_stat_activity a ON a.pid = l.pid "
+                    "WHERE l.locktype = 'advisory' AND l.granted AND l.objsubid = 1 "
+                    "AND l.classid = :high AND l.objid = :low"
+                ),
+                {"high": unsigned >> 32, "low": unsigned & 0xFFFFFFFF}
+            )).first()
+        if row is None:
+            return None
+        pid, application_name, client_addr, backend_start = row
+        prefix = f"leader:{self.name}:"
+        identity = application_name or ""
+        if identity.startswith(prefix):
+            identity = identity[len(prefix):]
+        return {
+            "identity": identity,
+            "pid": pid,
+            "client_addr": client_addr,
+            "since": backend_start.isoformat() if backend_start else None
+        }
+
+    def local_status(self) -> dict:
+        return {
+            "job": self.name,
+            "process": process_identity(),
+            "is_leader": self.is_leader,
+            "leader_since": self.acquired_at.isoformat() if self.acquired_at else None,
+            "election_enabled": self._enabled
+        }
+
+    async def get_status(self) -> dict:
+        """Лидерство этого процесса и процесс-держатель блокировки"""
+        status = self.local_status()
+        try:
+            status["holder"] = await self.current_holder()
+        except Exception as e:
+            status["holder"] = None
+            status["holder_error"] = str(e)
+        return status
+
+
+# Лидерство для задачи очистки журнала users_logs (app.tasks.jobs)
+log_cleanup_leader = LeaderElection("log_cleanup")
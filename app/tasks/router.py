@@ -0,0 +1,133 @@
+# app/tasks/router.py
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.users.dependencies import get_current_admin
+from app.users.dao import UserLogsDAO
+from app.users.models import User
+from app.logger import app_logger as logger
+from app.tasks.scheduler import scheduler, Job, JobAlreadyRunningError, JobNotLeaderError, IntervalTrigger, CronTrigger
+from app.tasks.schemas import SJobRun, SJobUpdate
+
+router = APIRouter(prefix="/admin/jobs", tags=["Jobs"])
+
+
+def get_job(name: str) -> Job:
+    try:
+        return scheduler.get(name)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Задача {name} не найдена")
+
+
+def get_leader_job(name: str) -> Job:
+    """
+    Задача для ручного запуска или изменения. Если ее выполняет другой
+    (ведущий) процесс — 409: изменения в этом воркере не подействовали бы.
+    """
+    job = get_job(name)
+    try:
+        scheduler.check_leader(job)
+    except JobNotLeaderError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{e}; повторите запрос")
+    return job
+
+
+def start_job_run(name: str, params: dict = None) -> dict:
+    """scheduler.run_now с ответами API: 409 — уже выполняется или не ведущий, 400 — параметры"""
+    try:
+        return scheduler.run_now(name, params)
+    except (JobAlreadyRunningError, JobNotLeaderError) as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+async def log_job_action(current_user: User, job: Job, action: str, description: str,
+                         old_value: str = None, new_value: str = None):
+    await UserLogsDAO.create_log(
+        user_id=current_user.id,
+        action_type=f'job_{action}',
+        old_value=old_value,
+        new_value=new_value,
+        description=f'{description}: {job.name}',
+        changed_by=current_user.id
+    )
+    logger.info(f"Администратор {current_user.user_email}: {description.lower()} {job.name}")
+
+
+@router.get("/", summary="Фоновые задачи")
+async def list_jobs(current_user: User = Depends(get_current_admin)):
+    """
+    Расписание, следующий запуск, история и длительность запусков задач этого воркера,
+    а также какой процесс выполняет задачу (лидерство)
+    """
+    return {"jobs": await scheduler.status()}
+
+
+@router.get("/{name}", summary="Состояние фоновой задачи")
+async def get_job_status(name: str, current_user: User = Depends(get_current_admin)):
+    return await get_job(name).status()
+
+
+@router.post("/{name}/run", summary="Запустить задачу сейчас", status_code=status.HTTP_202_ACCEPTED)
+async def run_job(name: str, run_data: Optional[SJobRun] = None, current_user: User = Depends(get_current_admin)):
+    """
+    Ручной запуск в фоне с текущими параметрами (или с params только для
+    этого запуска); ответ — запись о начатом запуске, результат — в истории
+    задачи (GET /admin/jobs/{name}).
+    Если задача уже выполняется или этот процесс не ведущий для нее — 409.
+    """
+    job = get_leader_job(name)
+    record = start_job_run(name, run_data.params if run_data else None)
+
+    await log_job_action(current_user, job, 'run', 'Ручной запуск задачи',
+                         new_value=json.dumps(record["params"], default=str))
+    return record
+
+
+@router.post("/{name}/pause", summary="Приостановить задачу")
+async def pause_job(name: str, current_user: User = Depends(get_current_admin)):
+    job = get_leader_job(name)
+    if not job.enabled:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Задача уже приостановлена")
+    scheduler.pause(name)
+    await log_job_action(current_user, job, 'pause', 'Задача приостановлена', "enabled", "paused")
+    return {"message": f"Задача {name} приостановлена"}
+
+
+@router.post("/{name}/resume", summary="Возобновить задачу")
+async def resume_job(name: str, current_user: User = Depends(get_current_admin)):
+    job = get_leader_job(name)
+    if job.enabled:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Задача не приостановлена")
+    scheduler.resume(name)
+    await log_job_action(current_user, job, 'resume', 'Задача возобновлена', "paused", "enabled")
+    return {"message": f"Задача {name} возобновлена"}
+
+
+@router.put("/{name}", summary="Изменить расписание и параметры задачи")
+async def update_job(name: str, job_data: SJobUpdate, current_user: User = Depends(get_current_admin)):
+    job = get_leader_job(name)
+    old_settings = {"schedule": job.trigger.describe(), "timeout_seconds": job.timeout, "params": dict(job.params)}
+
+    try:
+        trigger = None
+        if job_data.cron is not None:
+            trigger = CronTrigger(job_data.cron)
+        elif job_data.interval_seconds is not None:
+            trigger = IntervalTrigger(job_data.interval_seconds)
+        params = job.check_params(job_data.params) if job_data.params else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if params:
+        job.params.update(params)
+    if job_data.timeout_seconds is not None:
+        job.timeout = job_data.timeout_seconds
+    if trigger is not None:
+        scheduler.reschedule(name, trigger)
+
+    new_settings = {"schedule": job.trigger.describe(), "timeout_seconds": job.timeout, "params": dict(job.params)}
+    await log_job_action(current_user, job, 'update', 'Обновлены настройки задачи',
+                         json.dumps(old_settings), json.dumps(new_settings))
+    return {"message": f"Настройки задачи {name} обновлены", "old_settings": old_settings, "new_settings": new_settings}
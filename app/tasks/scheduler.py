@@ -0,0 +1,415 @@
+# app/tasks/scheduler.py
+"""
+Планировщик периодических задач процесса.
+
+Задача (Job) описывается функцией, расписанием (IntervalTrigger или
+CronTrigger), параметрами вызова и ограничениями:
+- jitter — случайная задержка первого запуска, чтобы воркеры и узлы не
+  стартовали задачи одновременно;
+- timeout — предел длительности запуска (по истечении запуск отменяется);
+- повторный запуск не начинается, пока идет предыдущий (и ручной, и по расписанию);
+  у задачи с ведущим процессом запуски идут только в нем, поэтому
+  пересечение исключено и между процессами;
+- после ошибки следующий запуск — с экспоненциальной задержкой
+  retry_base * 2^(n-1), не больше max_backoff и не позже планового;
+- leader — запуск по расписанию только в ведущем процессе (app.tasks.leader).
+
+По каждой задаче ведутся история последних запусков, гистограмма
+длительности и время следующего запуска. stop() отменяет циклы задач и
+идущие запуски и дожидается их завершения.
+
+Состояние (пауза, расписание, параметры) хранится в памяти процесса.
+Для задачи с ведущим процессом ручной запуск и изменения принимаются только
+ведущим (остальные отклоняют их с JobNotLeaderError) — там, где задача
+выполняется; после смены ведущего действуют настройки по умолчанию.
+"""
+import asyncio
+import contextvars
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Optional
+
+from app.logger import app_logger as logger
+from app.monitoring.pool_metrics import LatencyHistogram
+
+
+# Границы корзин гистограммы длительности запуска задачи, мс
+JOB_DURATION_BUCKETS_MS = (100, 500, 1000, 5000, 10000, 30000, 60000, 300000, 600000, 1800000, 3600000)
+
+
+class JobAlreadyRunningError(RuntimeError):
+    """Запуск отклонен: предыдущий запуск задачи еще не завершен"""
+
+
+class JobNotLeaderError(RuntimeError):
+    """Запуск или изменение отклонены: задачу выполняет другой (ведущий) процесс"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IntervalTrigger:
+    """Запуск через равные промежутки времени"""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Интервал должен быть положительным")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+    def describe(self) -> dict:
+        return {"type": "interval", "seconds": self.seconds}
+
+
+class CronTrigger:
+    """
+    Расписание в формате cron (UTC): "минута час день_месяца месяц день_недели".
+    Поддерживаются *, списки (1,15), диапазоны (1-5) и шаги (*/10, 0-30/5);
+    день недели 0-6 (0 и 7 — воскресенье). Если заданы и день месяца, и день
+    недели, подходит любой из них (как в cron).
+    """
+
+    _FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError("Cron-выражение должно состоять из 5 полей")
+        self.expression = expression
+        minutes, hours, days, months, weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self._FIELDS)
+        )
+        self.minutes, self.hours, self.days, self.months = minutes, hours, days, months
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> frozenset:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Некорректный шаг в cron-поле {field!r}")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_text, end_text = part.split("-", 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Значение вне диапазона в cron-поле {field!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return weekday_ok
+        if self._any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron-выражение {self.expression!r} не совпадает ни с одной датой")
+
+    def describe(self) -> dict:
+        return {"type": "cron", "expression": self.expression}
+
+
+class Job:
+    """Периодическая задача и ее статистика"""
+
+    def __init__(self, name: str, func: Callable[..., Awaitable], trigger, *, params: dict = None,
+                 description: str = "", timeout: float = None, jitter: float = 0, run_on_start: bool = False,
+                 retry_base: float = 60, max_backoff: float = 3600, leader=None, history_size: int = 20,
+                 validate_params: Callable[[dict], None] = None, status_hook: Callable[[], dict] = None):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.params = dict(params or {})
+        self.description = description
+        self.timeout = timeout
+        self.jitter = jitter
+        self.run_on_start = run_on_start
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.leader = leader
+        self.validate_params = validate_params
+        self.status_hook = status_hook
+
+        self.enabled = True
+        self.next_run: Optional[datetime] = None
+        self.consecutive_failures = 0
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.history = deque(maxlen=history_size)
+        self.duration = LatencyHistogram(JOB_DURATION_BUCKETS_MS)
+        self.current_run: Optional[dict] = None
+
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self.current_run is not None
+
+    def begin_run(self, reason: str, params: dict = None) -> dict:
+        """
+        Запись о запуске; с этого момента задача считается выполняющейся.
+        params заменяют параметры задачи только для этого запуска.
+        """
+        self.current_run = {
+            "started_at": _utcnow().isoformat(),
+            "reason": reason,
+            "params": {**self.params, **(params or {})},
+            "status": "running"
+        }
+        return self.current_run
+
+    def wake(self):
+        """Пересчитать время следующего запуска (после паузы, смены расписания)"""
+        self._wakeup.set()
+
+    def check_params(self, params: dict) -> dict:
+        """Проверяет новые значения параметров (ValueError при неизвестных или некорректных)"""
+        unknown = set(params) - set(self.params)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры задачи: {', '.join(sorted(unknown))}")
+        if self.validate_params is not None:
+            self.validate_params({**self.params, **params})
+        return params
+
+    def backoff_delay(self) -> float:
+        return min(self.retry_base * 2 ** (self.consecutive_failures - 1), self.max_backoff)
+
+    def compute_next_run(self, now: datetime) -> datetime:
+        next_run = self.trigger.next_after(now)
+        if self.consecutive_failures:
+            next_run = min(next_run, now + timedelta(seconds=self.backoff_delay()))
+        return next_run
+
+    async def status(self) -> dict:
+        status = {
+            "name": self.name,
+            "description": self.description,
+            "schedule": self.trigger.describe(),
+            "params": self.params,
+            "enabled": self.enabled,
+            "running": self.is_running,
+            "current_run": self.current_run,
+            "next_run": self.next_run.isoformat() if self.next_run and self.enabled else None,
+            "timeout_seconds": self.timeout,
+            "runs": self.runs,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "skipped_overlaps": self.skipped,
+            "duration": self.duration.snapshot(),
+            "history": list(self.history),
+        }
+        if self.leader is not None:
+            status["leadership"] = await self.leader.get_status()
+        if self.status_hook is not None:
+            status["progress"] = self.status_hook()
+        return status
+
+
+class Scheduler:
+    """Циклы запуска задач процесса"""
+
+    def __init__(self):
+        self.jobs: dict[str, Job] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._manual_runs: set[asyncio.Task] = set()
+
+    def add_job(self, job: Job):
+        if job.name in self.jobs:
+            raise ValueError(f"Задача {job.name} уже зарегистрирована")
+        self.jobs[job.name] = job
+
+    def get(self, name: str) -> Job:
+        """Задача по имени (KeyError, если такой нет)"""
+        return self.jobs[name]
+
+    def start(self):
+        """Запускает выборы ведущего и циклы задач (вызывать из работающего event loop)"""
+        for job in self.jobs.values():
+            if job.leader is not None:
+                job.leader.start()
+            if job.name not in self._tasks:
+                self._tasks[job.name] = asyncio.create_task(self._job_loop(job), name=f"job-{job.name}")
+        logger.info(f"✅ Планировщик запущен, задач: {len(self.jobs)}")
+
+    async def stop(self):
+        """Отменяет циклы и идущие запуски, дожидается их завершения и слагает лидерство"""
+        tasks = list(self._tasks.values()) + list(self._manual_runs)
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for job in self.jobs.values():
+            if job.leader is not None:
+                await job.leader.stop()
+        logger.info("✅ Планировщик остановлен")
+
+    @staticmethod
+    def check_leader(job: Job):
+        """JobNotLeaderError, если задачу выполняет другой (ведущий) процесс"""
+        if job.leader is not None and not job.leader.is_leader:
+            raise JobNotLeaderError(f"Задачу {job.name} выполняет ведущий процесс, этот процесс — не ведущий")
+
+    def run_now(self, name: str, params: dict = None) -> dict:
+        """
+        Ручной запуск задачи в фоне. Возвращает запись о запуске (она
+        дополняется по ходу выполнения и попадает в историю задачи).
+        params — параметры только этого запуска (проверяются как при изменении задачи).
+        JobNotLeaderError — процесс не ведущий; JobAlreadyRunningError —
+        задача уже выполняется; ValueError — некорректные параметры.
+        """
+        job = self.get(name)
+        self.check_leader(job)
+        if job.is_running:
+            raise JobAlreadyRunningError(f"Задача {name} уже выполняется")
+        if params:
+            job.check_params(params)
+        record = job.begin_run("manual", params)
+        # Пустой контекст: запуск из HTTP-запроса не наследует его сессию БД,
+        # состояние чтения и кэш запроса (contextvars app.dao.session и app.dao.cache)
+        task = asyncio.create_task(
+            self._execute(job, record), name=f"job-{name}-manual", context=contextvars.Context()
+        )
+        self._manual_runs.add(task)
+        task.add_done_callback(lambda done: self._manual_run_done(job, record, done))
+        return record
+
+    def _manual_run_done(self, job: Job, record: dict, task: asyncio.Task):
+        self._manual_runs.discard(task)
+        if job.current_run is record:
+            job.current_run = None  # запуск отменен до начала выполнения
+
+    def pause(self, name: str):
+        job = self.get(name)
+        self.check_leader(job)
+        job.enabled = False
+        job.wake()
+
+    def resume(self, name: str):
+        job = self.get(name)
+        self.check_leader(job)
+        job.enabled = True
+        job.wake()
+
+    def reschedule(self, name: str, trigger):
+        job = self.get(name)
+        self.check_leader(job)
+        job.trigger = trigger
+        job.wake()
+
+    async def status(self) -> list[dict]:
+        return [await job.status() for job in self.jobs.values()]
+
+    async def _sleep_until(self, job: Job, moment: Optional[datetime]) -> bool:
+        """Ждет наступления moment (None — без срока); False, если задачу разбудили раньше"""
+        job._wakeup.clear()
+        timeout = None if moment is None else max((moment - _utcnow()).total_seconds(), 0)
+        try:
+            await asyncio.wait_for(job._wakeup.wait(), timeout=timeout)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _job_loop(self, job: Job):
+        if job.jitter:
+            await asyncio.sleep(random.uniform(0, job.jitter))
+
+        first = job.run_on_start
+        while True:
+            if not job.enabled:
+                job.next_run = None
+                await self._sleep_until(job, None)
+                continue
+
+            now = _utcnow()
+            job.next_run = now if first else job.compute_next_run(now)
+            first = False
+            if not await self._sleep_until(job, job.next_run):
+                continue  # пауза или новое расписание — пересчитываем
+
+            if job.leader is not None and not job.leader.is_leader:
+                continue  # по расписанию задачу выполняет ведущий процесс
+            if job.is_running:
+                job.skipped += 1
+                logger.warning(f"⚠️ Задача {job.name} еще выполняется, плановый запуск пропущен")
+                continue
+
+            await self._execute(job, job.begin_run("schedule"))
+
+    async def _execute(self, job: Job, record: dict) -> dict:
+        """Выполняет задачу; ошибка и превышение времени записываются в историю, а не пробрасываются"""
+        async with job._lock:
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(job.func(**record["params"]), timeout=job.timeout)
+                record.update(status="success", result=result)
+                job.consecutive_failures = 0
+                return record
+            except asyncio.TimeoutError:
+                record.update(status="timeout", error=f"Превышено время выполнения {job.timeout} с")
+                self._failed(job, record)
+                return record
+            except asyncio.CancelledError:
+                record.update(status="cancelled")
+                raise
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                self._failed(job, record)
+                return record
+            finally:
+                duration_ms = (time.perf_counter() - started) * 1000
+                record["duration_ms"] = round(duration_ms, 1)
+                record["finished_at"] = _utcnow().isoformat()
+                job.runs += 1
+                job.duration.observe(duration_ms)
+                job.history.appendleft(record)
+                job.current_run = None
+
+    @staticmethod
+    def _failed(job: Job, record: dict):
+        job.failures += 1
+        job.consecutive_failures += 1
+        logger.error(
+            f"❌ Задача {job.name}: {record['error']}; повтор не ранее чем через {job.backoff_delay():.0f} с"
+        )
+
+
+scheduler = Scheduler()
@@ -0,0 +1,19 @@
+from typing import Any, Optional
+from pydantic import BaseModel, Field, model_validator
+
+
+class SJobUpdate(BaseModel):
+    interval_seconds: Optional[int] = Field(None, ge=1, description="Интервал запуска, секунд")
+    cron: Optional[str] = Field(None, description="Cron-расписание (UTC), вместо интервала")
+    timeout_seconds: Optional[int] = Field(None, ge=1, description="Предел длительности запуска, секунд")
+    params: Optional[dict[str, Any]] = Field(None, description="Параметры вызова задачи (заменяют указанные ключи)")
+
+    @model_validator(mode="after")
+    def check_schedule(self):
+        if self.interval_seconds is not None and self.cron is not None:
+            raise ValueError("Укажите либо interval_seconds, либо cron")
+        return self
+
+
+class SJobRun(BaseModel):
+    params: Optional[dict[str, Any]] = Field(None, description="Параметры только этого запуска (заменяют указанные ключи)")
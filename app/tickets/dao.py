@@ -3,7 +3,7 @@ from sqlalchemy import select, desc, func
 from sqlalchemy.orm import joinedload, selectinload
 from app.dao.base import BaseDAO
 from app.tickets.models import Ticket, TicketMessage, TicketStatus, TicketPriority
-from app.database import async_session_maker
+from app.dao.session import session_scope, read_session_scope
 from app.users.models import User  # Добавьте этот импорт
 from typing import List, Optional
 
@@ -19,35 +19,33 @@ class TicketDAO(BaseDAO):
         priority: str = "Medium"
     ):
         """Создать тикет с первым сообщением в одной транзакции"""
-        async with async_session_maker() as session:
-            try:
-                # Создаем тикет
-                ticket = Ticket(
-                    user_id=user_id,
-                    subject=subject,
-                    description=description,
-                    priority=priority,
-                    status=TicketStatus.OPEN
-                )
-                session.add(ticket)
-                await session.flush()  # Получаем ID без коммита
-                
-                # Создаем первое сообщение
-                message = TicketMessage(
-                    ticket_id=ticket.id,
-                    sender_id=user_id,
-                    message_text=description
-                )
-                session.add(message)
-                
-                await session.commit()
-                await session.refresh(ticket)
-                
-                return ticket
-                
-            except Exception as e:
-                await session.rollback()
-                raise e
+        async with session_scope() as session:
+            # Создаем тикет
+            ticket = Ticket(
+                user_id=user_id,
+                subject=subject,
+                description=description,
+                priority=priority,
+                status=TicketStatus.OPEN
+            )
+            session.add(ticket)
+            await session.flush()  # Получаем ID без коммита
+
+            # Создаем первое сообщение
+            message = TicketMessage(
+                ticket_id=ticket.id,
+                sender_id=user_id,
+                message_text=description
+            )
+            session.add(message)
+            await session.flush()
+            await session.refresh(ticket)
+
+            return ticket
+
+    # Сортировка списков тикетов (ключ keyset-пагинации)
+    USER_TICKETS_ORDER = "-updated_at"
+    ADMIN_TICKETS_ORDER = ["-is_pinned", "-updated_at"]
 
     @classmethod
     async def get_user_tickets(
@@ -55,59 +53,31 @@ class TicketDAO(BaseDAO):
         user_id: int, 
         page: int = 1, 
         page_size: int = 25,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ):
         """Получить тикеты пользователя"""
-        async with async_session_maker() as session:
-            query = select(Ticket).where(Ticket.user_id == user_id)
-
-            if status:
-                query = query.where(Ticket.status == status)
+        filters = {'user_id': user_id}
+        if status:
+            filters['status'] = status
 
+        async with read_session_scope() as session:
             # Подсчет
-            count_query = select(func.count()).select_from(query.subquery())
+            count_query = select(func.count(Ticket.id)).filter_by(**filters)
             total_count = await session.scalar(count_query) or 0
 
-            # Данные с пагинацией
-            query = query.order_by(desc(Ticket.updated_at))
-            query = query.offset((page - 1) * page_size).limit(page_size)
-
-            result = await session.execute(query)
-            tickets = result.scalars().all()
-
-            # Получаем пользователей и количество сообщений
-            tickets_data = []
-            for ticket in tickets:
-                # Получаем пользователя
-                user_query = select(User).where(User.id == ticket.user_id)
-                user_result = await session.execute(user_query)
-                user = user_result.scalar_one_or_none()
-
-                # Получаем количество сообщений
-                msg_count_query = select(func.count(TicketMessage.id)).where(TicketMessage.ticket_id == ticket.id)
-                msg_count = await session.scalar(msg_count_query) or 0
-
-                tickets_data.append({
-                    'id': ticket.id,
-                    'user_id': ticket.user_id,
-                    'user_email': user.user_email if user else "Unknown",
-                    'user_nick': getattr(user, 'user_nick', user.user_email if user else "User"),  # Добавляем user_nick
-                    'subject': ticket.subject,
-                    'description': ticket.description,
-                    'status': ticket.status,
-                    'priority': ticket.priority,
-                    'is_pinned': ticket.is_pinned,
-                    'created_at': ticket.created_at,
-                    'updated_at': ticket.updated_at,
-                    'message_count': msg_count
-                })
+            tickets, next_cursor = await cls._fetch_tickets_page(
+                cls.USER_TICKETS_ORDER, page, page_size, cursor, filters
+            )
+            tickets_data = await cls._serialize_tickets(session, tickets)
 
             return {
                 "tickets": tickets_data,
                 "total_count": total_count,
                 "page": page,
                 "page_size": page_size,
-                "total_pages": (total_count + page_size - 1) // page_size if page_size > 0 else 1
+                "total_pages": (total_count + page_size - 1) // page_size if page_size > 0 else 1,
+                "next_cursor": next_cursor
             }
 
     @classmethod
@@ -118,74 +88,108 @@ class TicketDAO(BaseDAO):
         status: Optional[str] = None,
         priority: Optional[str] = None,
         user_id: Optional[int] = None,
-        is_pinned: Optional[bool] = None
+        is_pinned: Optional[bool] = None,
+        cursor: Optional[str] = None
     ):
         """Получить все тикеты для админов с ограничением 300"""
-        async with async_session_maker() as session:
-            query = select(Ticket)
-
-            if status:
-                query = query.where(Ticket.status == status)
-            if priority:
-                query = query.where(Ticket.priority == priority)
-            if user_id:
-                query = query.where(Ticket.user_id == user_id)
-            if is_pinned is not None:
-                query = query.where(Ticket.is_pinned == is_pinned)
-
-            # Подсчет общего количества (без пагинации для фильтров)
-            count_query = select(func.count()).select_from(query.subquery())
-            total_count = await session.scalar(count_query) or 0
-
-            # Ограничиваем общее количество 300
-            effective_total_count = min(total_count, 300)
-
-            # Данные с пагинацией
-            query = query.order_by(desc(Ticket.is_pinned), desc(Ticket.updated_at))
-            query = query.offset((page - 1) * page_size).limit(page_size)
-
-            result = await session.execute(query)
-            tickets = result.scalars().all()
-
-            # Получаем пользователей и количество сообщений
-            tickets_data = []
-            for ticket in tickets:
-                # Получаем пользователя
-                user_query = select(User).where(User.id == ticket.user_id)
-                user_result = await session.execute(user_query)
-                user = user_result.scalar_one_or_none()
-
-                # Получаем количество сообщений
-                msg_count_query = select(func.count(TicketMessage.id)).where(TicketMessage.ticket_id == ticket.id)
-                msg_count = await session.scalar(msg_count_query) or 0
-
-                tickets_data.append({
-                    'id': ticket.id,
-                    'user_id': ticket.user_id,
-                    'user_email': user.user_email if user else "Unknown",
-                    'user_nick': getattr(user, 'user_nick', user.user_email if user else "User"),  # Добавляем user_nick
-                    'subject': ticket.subject,
-                    'description': ticket.description,
-                    'status': ticket.status,
-                    'priority': ticket.priority,
-                    'is_pinned': ticket.is_pinned,
-                    'created_at': ticket.created_at,
-                    'updated_at': ticket.updated_at,
-                    'message_count': msg_count
-                })
+        filters = {}
+        if status:
+            filters['status'] = status
+        if priority:
+            filters['priority'] = priority
+        if user_id:
+            filters['user_id'] = user_id
+        if is_pinned is not None:
+            filters['is_pinned'] = is_pinned
+
+        async with read_session_scope() as session:
+            # Подсчет ограничен 300 записями, чтобы не сканировать всю таблицу
+            limited = select(Ticket.id).filter_by(**filters).limit(300).subquery()
+            effective_total_count = await session.scalar(select(func.count()).select_from(limited)) or 0
+
+            tickets, next_cursor = await cls._fetch_tickets_page(
+                cls.ADMIN_TICKETS_ORDER, page, page_size, cursor, filters
+            )
+            tickets_data = await cls._serialize_tickets(session, tickets)
 
             return {
                 "tickets": tickets_data,
                 "total_count": effective_total_count,
                 "page": page,
                 "page_size": page_size,
-                "total_pages": (effective_total_count + page_size - 1) // page_size if page_size > 0 else 1
+                "total_pages": (effective_total_count + page_size - 1) // page_size if page_size > 0 else 1,
+                "next_cursor": next_cursor
             }
 
+    @classmethod
+    async def _fetch_tickets_page(cls, order_by, page: int, page_size: int, cursor: Optional[str], filters: dict):
+        """
+        Страница тикетов: по курсору (и для первой страницы) — keyset через find_page,
+        переход на произвольный номер страницы — через OFFSET для совместимости с UI.
+        """
+        if cursor or page == 1:
+            page_data = await cls.find_page(order_by=order_by, after=cursor, limit=page_size, **filters)
+            return page_data["items"], page_data["next_cursor"]
+
+        # Тот же порядок, что у find_page (с id при равных updated_at): курсор
+        # последнего тикета страницы продолжает именно эту последовательность
+        query = (
+            select(Ticket)
+            .filter_by(**filters)
+            .order_by(*cls.keyset_order(order_by))
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+        async with read_session_scope() as session:
+            result = await session.execute(query)
+            tickets = result.scalars().all()
+
+        next_cursor = cls.make_cursor(tickets[-1], order_by) if len(tickets) == page_size else None
+        return tickets, next_cursor
+
+    @staticmethod
+    async def _serialize_tickets(session, tickets) -> list[dict]:
+        """Преобразует тикеты в словари; пользователи и число сообщений — двумя запросами на страницу"""
+        if not tickets:
+            return []
+
+        user_ids = {ticket.user_id for ticket in tickets}
+        users_result = await session.execute(
+            select(User.id, User.user_email, User.user_nick).where(User.id.in_(user_ids))
+        )
+        users = {row.id: row for row in users_result}
+
+        ticket_ids = [ticket.id for ticket in tickets]
+        counts_result = await session.execute(
+            select(TicketMessage.ticket_id, func.count(TicketMessage.id))
+            .where(TicketMessage.ticket_id.in_(ticket_ids))
+            .group_by(TicketMessage.ticket_id)
+        )
+        message_counts = dict(counts_result.all())
+
+        tickets_data = []
+        for ticket in tickets:
+            user = users.get(ticket.user_id)
+            tickets_data.append({
+                'id': ticket.id,
+                'user_id': ticket.user_id,
+                'user_email': user.user_email if user else "Unknown",
+                'user_nick': getattr(user, 'user_nick', user.user_email if user else "User"),  # Добавляем user_nick
+                'subject': ticket.subject,
+                'description': ticket.description,
+                'status': ticket.status,
+                'priority': ticket.priority,
+                'is_pinned': ticket.is_pinned,
+                'created_at': ticket.created_at,
+                'updated_at': ticket.updated_at,
+                'message_count': message_counts.get(ticket.id, 0)
+            })
+        return tickets_data
+
     @classmethod
     async def get_first_ticket_message(cls, ticket_id: int):
         """Получить первое сообщение тикета (описание проблемы)"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = (
                 select(TicketMessage)
                 .where(TicketMessage.ticket_id == ticket_id)
@@ -198,7 +202,7 @@ class TicketDAO(BaseDAO):
     @classmethod
     async def get_ticket_detail(cls, ticket_id: int, user_id: Optional[int] = None):
         """Получить детальную информацию о тикете"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             # Получаем тикет
             ticket_query = select(Ticket).where(Ticket.id == ticket_id)
             if user_id:
@@ -210,35 +214,61 @@ class TicketDAO(BaseDAO):
             if not ticket:
                 return None
 
-            # Получаем пользователя
-            user_query = select(User).where(User.id == ticket.user_id)
-            user_result = await session.execute(user_query)
-            user = user_result.scalar_one_or_none()
+            return await cls._load_ticket_conversation(session, ticket)
 
-            # Получаем сообщения с информацией об отправителях
-            messages_query = (
-                select(TicketMessage)
-                .options(joinedload(TicketMessage.sender))
-                .where(TicketMessage.ticket_id == ticket_id)
-                .order_by(TicketMessage.created_at)
-            )
-            messages_result = await session.execute(messages_query)
-            messages = messages_result.unique().scalars().all()
+    @classmethod
+    async def update_ticket(cls, ticket_id: int, user_id: Optional[int] = None, **values):
+        """
+        Обновить тикет одним UPDATE ... RETURNING.
+        Если передан user_id, обновляется только тикет этого пользователя (проверка доступа в том же запросе).
 
-            # Получаем первое сообщение (описание проблемы)
-            first_message = messages[0] if messages else None
+        Возвращает обновленный тикет или None, если тикет не найден / нет доступа.
+        """
+        filter_by = {'id': ticket_id}
+        if user_id:
+            filter_by['user_id'] = user_id
 
-            return {
-                'ticket': ticket,
-                'user': user,
-                'messages': messages,
-                'first_message': first_message
-            }
+        tickets = await cls.update_returning(filter_by, **values)
+        return tickets[0] if tickets else None
+
+    @classmethod
+    async def get_ticket_conversation(cls, ticket: Ticket):
+        """Получить автора и переписку уже загруженного тикета (в формате get_ticket_detail)"""
+        async with read_session_scope() as session:
+            return await cls._load_ticket_conversation(session, ticket)
+
+    @staticmethod
+    async def _load_ticket_conversation(session, ticket: Ticket) -> dict:
+        """Автор тикета и сообщения с отправителями"""
+        # Получаем пользователя
+        user_query = select(User).where(User.id == ticket.user_id)
+        user_result = await session.execute(user_query)
+        user = user_result.scalar_one_or_none()
+
+        # Получаем сообщения с информацией об отправителях
+        messages_query = (
+            select(TicketMessage)
+            .options(joinedload(TicketMessage.sender))
+            .where(TicketMessage.ticket_id == ticket.id)
+            .order_by(TicketMessage.created_at)
+        )
+        messages_result = await session.execute(messages_query)
+        messages = messages_result.unique().scalars().all()
+
+        # Получаем первое сообщение (описание проблемы)
+        first_message = messages[0] if messages else None
+
+        return {
+            'ticket': ticket,
+            'user': user,
+            'messages': messages,
+            'first_message': first_message
+        }
 
     @classmethod
     async def get_ticket_stats(cls, user_id: Optional[int] = None):
         """Получить статистику по тикетам"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(Ticket)
             
             if user_id:
@@ -281,14 +311,11 @@ class TicketMessageDAO(BaseDAO):
     @classmethod
     async def add_message(cls, ticket_id: int, sender_id: int, message_text: str, is_tech_support: bool = False):
         """Добавить сообщение"""
-        async with async_session_maker() as session:
-            message = TicketMessage(
-                ticket_id=ticket_id,
-                sender_id=sender_id,
-                message_text=message_text,
-                is_tech_support=is_tech_support  # Добавляем флаг техподдержки
-            )
-            session.add(message)
-            await session.commit()
-            await session.refresh(message)
-            return message
\ No newline at end of file
+        # Один INSERT ... RETURNING: id и created_at приходят сразу, без refresh
+        return await cls.add(
+            returning=True,
+            ticket_id=ticket_id,
+            sender_id=sender_id,
+            message_text=message_text,
+            is_tech_support=is_tech_support  # Добавляем флаг техподдержки
+        )
\ No newline at end of file
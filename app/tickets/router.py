@@ -3,7 +3,7 @@ from fastapi import APIRouter, Request, Depends, HTTPException, status, UploadFi
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional
-from app.database import async_session_maker
+from app.dao.session import session_scope
 from sqlalchemy import func, select, text
 from sqlalchemy.orm import joinedload, selectinload
 from app.tickets.models import Ticket, TicketMessage
@@ -19,6 +19,7 @@ from app.users.dependencies import get_current_user
 from app.users.models import User
 from app.roles.dependencies import require_roles_list, require_roles
 from app.roles.models import RoleTypes
+from app.logger import app_logger as logger
 
 router = APIRouter(prefix='/tickets', tags=['Тикеты'])
 templates = Jinja2Templates(directory='app/templates')
@@ -95,7 +96,7 @@ async def create_ticket(
     current_user: User = Depends(get_current_user)
 ):
     """Создать новый тикет"""
-    async with async_session_maker() as session:
+    async with session_scope() as session:
         try:
             # Создаем тикет
             ticket = Ticket(
@@ -116,7 +117,7 @@ async def create_ticket(
             )
             session.add(message)
             
-            await session.commit()
+            await session.flush()
             
             # Получаем созданный тикет с базовой информацией
             await session.refresh(ticket)
@@ -162,8 +163,7 @@ async def create_ticket(
             )
             
         except Exception as e:
-            await session.rollback()
-            print(f"Ошибка создания тикета: {e}")
+            logger.error("Ошибка создания тикета: {}", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Ошибка при создании тикета: {str(e)}"
@@ -176,15 +176,21 @@ async def get_user_tickets(
     current_user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
-    status: Optional[str] = Query(None)
+    status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None)
 ):
     """Получить тикеты текущего пользователя"""
-    result = await TicketDAO.get_user_tickets(
-        user_id=current_user.id,
-        page=page,
-        page_size=page_size,
-        status=status
-    )
+    try:
+        result = await TicketDAO.get_user_tickets(
+            user_id=current_user.id,
+            page=page,
+            page_size=page_size,
+            status=status,
+            cursor=cursor
+        )
+    except ValueError as e:
+        # Параметр status перекрывает fastapi.status, поэтому код указан явно
+        raise HTTPException(status_code=400, detail=str(e))
     return result
 
 @router.get("/api/admin/tickets", response_model=TicketListResponse)
@@ -194,16 +200,22 @@ async def get_admin_tickets(
     page_size: int = Query(25, ge=1, le=100),
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
-    user_id: Optional[int] = Query(None)
+    user_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None)
 ):
     """Получить все тикеты (для админов)"""
-    result = await TicketDAO.get_admin_tickets(
-        page=page,
-        page_size=page_size,
-        status=status,
-        priority=priority,
-        user_id=user_id
-    )
+    try:
+        result = await TicketDAO.get_admin_tickets(
+            page=page,
+            page_size=page_size,
+            status=status,
+            priority=priority,
+            user_id=user_id,
+            cursor=cursor
+        )
+    except ValueError as e:
+        # Параметр status перекрывает fastapi.status, поэтому код указан явно
+        raise HTTPException(status_code=400, detail=str(e))
     return result
 
 # 3. Роуты с динамическими параметрами (в конце)
@@ -263,14 +275,23 @@ async def update_ticket(
     current_user: User = Depends(get_current_user)
 ):
     """Обновить тикет и вернуть полные данные с перепиской"""
-    # Сначала проверяем права доступа
-    ticket_data = await get_ticket_with_access_check(ticket_id, current_user)
-    
-    # Обновляем тикет
-    await TicketDAO.update({"id": ticket_id}, **ticket_update.model_dump(exclude_unset=True))
-    
-    # Получаем обновленный тикет с перепиской
-    updated_ticket_data = await get_ticket_with_access_check(ticket_id, current_user)
+    update_data = ticket_update.model_dump(exclude_unset=True)
+    if update_data:
+        # Один UPDATE ... RETURNING; для обычных пользователей условие user_id проверяет доступ
+        is_staff = current_user.role_id in [RoleTypes.MODERATOR, RoleTypes.ADMIN, RoleTypes.SUPER_ADMIN]
+        ticket = await TicketDAO.update_ticket(
+            ticket_id,
+            user_id=None if is_staff else current_user.id,
+            **update_data
+        )
+        if not ticket:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Тикет не найден или у вас нет прав доступа"
+            )
+        updated_ticket_data = await TicketDAO.get_ticket_conversation(ticket)
+    else:
+        updated_ticket_data = await get_ticket_with_access_check(ticket_id, current_user)
     
     ticket = updated_ticket_data['ticket']
     user = updated_ticket_data['user']
@@ -308,9 +329,6 @@ async def add_message_to_ticket(
     current_user: User = Depends(get_current_user)
 ):
     """Добавить сообщение в тикет"""
-    # Проверяем права доступа
-    await get_ticket_with_access_check(ticket_id, current_user)
-    
     # Определяем, является ли отправитель техподдержкой
     is_staff = current_user.role_id in [RoleTypes.MODERATOR, RoleTypes.ADMIN, RoleTypes.SUPER_ADMIN]
     
@@ -318,44 +336,43 @@ async def add_message_to_ticket(
     # (или можно добавить логику на основе каких-то условий)
     send_as_tech_support = is_staff  # Всегда True для staff
     
-    # Добавляем сообщение
-    new_message = await TicketMessageDAO.add_message(
-        ticket_id=ticket_id,
-        sender_id=current_user.id,
-        message_text=message_data.message_text,
-        is_tech_support=send_as_tech_support
-    )
-    
-    # Обновляем статус тикета
+    # Обновляем статус тикета; условие user_id заодно проверяет права доступа
     if is_staff:
         new_status = TicketStatus.IN_PROGRESS
     else:
         new_status = TicketStatus.AWAITING_USER_RESPONSE
     
-    await TicketDAO.update({"id": ticket_id}, status=new_status)
-    
-    # Получаем сообщение с информацией об отправителе
-    async with async_session_maker() as session:
-        message_query = (
-            select(TicketMessage)
-            .options(joinedload(TicketMessage.sender))
-            .where(TicketMessage.id == new_message.id)
+    ticket = await TicketDAO.update_ticket(
+        ticket_id,
+        user_id=None if is_staff else current_user.id,
+        status=new_status
+    )
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Тикет не найден или у вас нет прав доступа"
         )
-        result = await session.execute(message_query)
-        message_with_sender = result.unique().scalar_one()
     
-    # Определяем отображаемое имя
-    display_name = "Техподдержка" if send_as_tech_support else message_with_sender.sender.user_nick
+    # Добавляем сообщение (один INSERT ... RETURNING); статус откатится вместе с ним при ошибке
+    new_message = await TicketMessageDAO.add_message(
+        ticket_id=ticket_id,
+        sender_id=current_user.id,
+        message_text=message_data.message_text,
+        is_tech_support=send_as_tech_support
+    )
+    
+    # Отправитель — текущий пользователь, повторно его не загружаем
+    display_name = "Техподдержка" if send_as_tech_support else current_user.user_nick
     
     return TicketMessageResponse(
-        id=message_with_sender.id,
-        ticket_id=message_with_sender.ticket_id,
-        sender_id=message_with_sender.sender_id,
+        id=new_message.id,
+        ticket_id=new_message.ticket_id,
+        sender_id=new_message.sender_id,
         sender_name=display_name,
-        sender_email=message_with_sender.sender.user_email if message_with_sender.sender else "Unknown",
+        sender_email=current_user.user_email,
         is_tech_support=send_as_tech_support,
-        message_text=message_with_sender.message_text,
-        created_at=message_with_sender.created_at
+        message_text=new_message.message_text,
+        created_at=new_message.created_at
     )
 
 # Частичные страницы для интеграции в ЛК
@@ -387,7 +404,7 @@ async def admin_tickets_partial(
 @router.get("/api/debug/check-db")
 async def debug_check_db():
     """Проверка подключения к БД и таблиц"""
-    async with async_session_maker() as session:
+    async with session_scope() as session:
         # Проверяем существование таблиц
         tables_check = await session.execute(text("""
             SELECT table_name 
@@ -61,4 +61,5 @@ class TicketListResponse(BaseModel):
     total_count: int
     page: int
     page_size: int
-    total_pages: int
\ No newline at end of file
+    total_pages: int
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (keyset-пагинация)
\ No newline at end of file
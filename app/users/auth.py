@@ -1,11 +1,12 @@
 from passlib.context import CryptContext
 from fastapi import status, HTTPException, Request
 from pydantic import EmailStr
-from jose import jwt
-from datetime import datetime, timedelta, timezone
-from app.config import get_auth_data
+from app.config import settings
 from app.users.dao import UsersDAO
 from app.utils.secutils import SecurityUtils
+from app.users.tokens import create_access_token, create_token_pair
+from app.users.password_hasher import PasswordHasher
+from app.dao.session import release_request_connection
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -18,13 +19,25 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def create_access_token(data: dict) -> str:
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=30)
-    to_encode.update({"exp": expire})
-    auth_data = get_auth_data()
-    encode_jwt = jwt.encode(to_encode, auth_data['secret_key'], algorithm=auth_data['algorithm'])
-    return encode_jwt
+
+# bcrypt в пуле потоков: в async-коде используйте *_async, чтобы не блокировать event loop
+password_hasher = PasswordHasher(
+    pwd_context,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+
+async def get_password_hash_async(password: str) -> str:
+    # Соединение запроса не должно простаивать, пока bcrypt ждет своей очереди
+    await release_request_connection()
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    await release_request_connection()
+    return await password_hasher.verify(plain_password, hashed_password)
+
 
 # async def authenticate_user(user_email: EmailStr, user_pass: str):
 #     user = await UsersDAO.find_one_or_none(user_email=user_email)
@@ -33,14 +46,15 @@ def create_access_token(data: dict) -> str:
 #     return user
 
 async def authenticate_user(user_email: EmailStr, user_pass: str, request: Request = None):
-    user = await UsersDAO.find_one_or_none(user_email=user_email)
-    if not user or verify_password(plain_password=user_pass, hashed_password=user.user_pass) is False:
+    # Пользователь и его разрешенные IP — одним запросом
+    user, allowed_ips = await UsersDAO.find_for_login(user_email)
+    if not user or await verify_password_async(plain_password=user_pass, hashed_password=user.user_pass) is False:
         return None
     
     # Проверяем IP если есть ограничения
     if request:
         client_ip = SecurityUtils.get_client_ip(request)
-        if not await SecurityUtils.is_ip_allowed(user.id, client_ip):
+        if not SecurityUtils.is_ip_in_allowed_list(user.id, client_ip, allowed_ips):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Доступ с IP {client_ip} запрещен"
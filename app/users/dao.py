@@ -1,10 +1,19 @@
-from sqlalchemy import select, delete, desc, update, or_
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, delete, desc, update, insert, or_, and_, literal, null, func, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, aliased
 from app.dao.base import BaseDAO
-from app.users.models import User, UserLog
+from app.users.models import User, UserLog, UserLogDailyStat, UserAllowedIP
 from app.roles.models import Role
-from app.database import async_session_maker
-from datetime import datetime, timezone, timedelta
+from app.dao.session import session_scope, savepoint_scope, read_session_scope, get_current_session
+from app.dao.cache import invalidate_entities
+from app.dao.write_behind import WriteBehindWriter
+from app.config import settings
+from app.utils.datetime_utils import DateTimeUtils
+from app.users.principal import invalidate_principal
+from app.users.tokens import note_token_version
+from datetime import datetime, time, timezone, timedelta
 import logging
 import json  # Добавляем импорт json
 import re
@@ -27,6 +36,23 @@ if (DEBUG_LEVEL >= 1):
 class UsersDAO(BaseDAO):
     model = User
 
+    # Поля для выгрузки списка пользователей (без хеша пароля и настроек безопасности)
+    EXPORT_COLUMNS = [
+        'id', 'user_phone', 'first_name', 'last_name', 'user_nick', 'user_email',
+        'user_status', 'role_id', 'special_notes', 'last_login', 'created_at'
+    ]
+
+    @classmethod
+    def _invalidate_cache(cls, session, filter_by: dict):
+        """Вместе с кэшем User сбрасывает снимки текущего пользователя (get_current_user)"""
+        super()._invalidate_cache(session, filter_by)
+        invalidate_principal(filter_by.get("id"), session)
+
+    @classmethod
+    def stream_users(cls, **filter_by):
+        """Потоковый обход пользователей (словари с EXPORT_COLUMNS)"""
+        return cls.stream(columns=cls.EXPORT_COLUMNS, as_dicts=True, order_by="id", **filter_by)
+
     @classmethod
     async def find_full_data(cls, user_id: int):
         """Найти пользователя с полными данными (включая роль)"""
@@ -35,7 +61,7 @@ class UsersDAO(BaseDAO):
     @classmethod
     async def find_all_with_roles(cls, **filter_by):
         """Найти всех пользователей с загруженными ролями"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(cls.model).options(joinedload(cls.model.role)).filter_by(**filter_by)
             result = await session.execute(query)
             return result.unique().scalars().all()
@@ -48,119 +74,207 @@ class UsersDAO(BaseDAO):
     @classmethod
     async def find_by_email_with_role(cls, user_email: str):
         """Найти пользователя по email с загруженной ролью"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(cls.model).options(joinedload(cls.model.role)).filter_by(user_email=user_email)
             result = await session.execute(query)
             return result.unique().scalar_one_or_none()
 
+    @classmethod
+    async def find_for_login(cls, user_email: str):
+        """
+        Пользователь (с ролью) и его активные разрешенные IP одним запросом.
+
+        Возвращает:
+            (user, [ip_address, ...]) или (None, []), если пользователь не найден.
+        """
+        async with read_session_scope() as session:
+            query = (
+                select(cls.model, UserAllowedIP.ip_address)
+                .outerjoin(
+                    UserAllowedIP,
+                    and_(UserAllowedIP.user_id == cls.model.id, UserAllowedIP.is_active == 1)
+                )
+                .where(cls.model.user_email == user_email)
+            )
+            rows = (await session.execute(query)).all()
+            if not rows:
+                return None, []
+            return rows[0][0], [ip_address for _, ip_address in rows if ip_address]
+
+    @classmethod
+    async def record_login(cls, user_id: int, client_ip: str) -> bool:
+        """
+        Обновляет last_login и пишет в users_logs запись 'login' одним запросом
+        (WITH ... UPDATE ... RETURNING + INSERT ... SELECT, PostgreSQL).
+        """
+        updated = (
+            update(cls.model)
+            .where(cls.model.id == user_id)
+            .values(last_login=datetime.now())
+            .returning(cls.model.id)
+            .cte("updated_user")
+        )
+        stmt = insert(UserLog).from_select(
+            ['user_id', 'action_type', 'old_value', 'new_value', 'description', 'changed_by', 'created_at'],
+            select(
+                updated.c.id,
+                literal('login'),
+                null(),
+                literal(f"ip:{client_ip}"),
+                literal(f'Успешный вход в систему с IP {client_ip}'),
+                updated.c.id,
+                literal(datetime.now(timezone.utc).replace(tzinfo=None))
+            )
+        ).add_cte(updated)
+
+        async with session_scope() as session:
+            result = await session.execute(stmt)
+            invalidate_entities(cls.model, [user_id], session)
+            invalidate_principal(user_id, session)
+            if result.rowcount > 0:
+                # Сводка журнала — в той же транзакции
+                await UserLogStatsDAO.apply_inserts([{'action_type': 'login'}])
+            return result.rowcount > 0
+
     @classmethod
     async def find_by_phone(cls, user_phone: str):
         """Найти пользователя по телефону"""
         return await cls.find_one_or_none(user_phone=user_phone)
 
+    @classmethod
+    async def get_token_state(cls, user_id: int):
+        """Поля пользователя для выпуска токенов (id, role_id, user_status, token_version)"""
+        # Читаем с primary: версия токенов на реплике может отставать
+        async with session_scope():
+            return await cls.find_one_or_none(
+                columns=['id', 'role_id', 'user_status', 'token_version'],
+                id=user_id
+            )
+
+    @classmethod
+    async def _update_revoking_tokens(cls, user_id: int, **values) -> bool:
+        """Обновляет пользователя и увеличивает token_version, отзывая выданные токены"""
+        users = await cls.update_returning(
+            {'id': user_id},
+            token_version=cls.model.token_version + 1,
+            **values
+        )
+        if not users:
+            return False
+        note_token_version(user_id, users[0].token_version)
+        return True
+
+    @classmethod
+    async def revoke_tokens(cls, user_id: int, token_version: int) -> bool:
+        """
+        Отзывает все токены пользователя (выход), если предъявленная версия
+        еще актуальна: токен, отозванный ранее, не сбрасывает новые сеансы.
+        """
+        users = await cls.update_returning(
+            {'id': user_id, 'token_version': token_version},
+            token_version=cls.model.token_version + 1
+        )
+        if not users:
+            return False
+        note_token_version(user_id, users[0].token_version)
+        return True
+
     @classmethod
     async def update_user_role(cls, user_id: int, new_role_id: int) -> bool:
         """Обновить роль пользователя с обновлением счетчиков"""
-        async with async_session_maker() as session:
-            async with session.begin():
-                # Находим пользователя и его текущую роль
-                user = await cls.find_one_or_none_by_id(user_id)
-                if not user:
-                    return False
-                
-                old_role_id = user.role_id
-                
-                # Если роль не изменилась, ничего не делаем
-                if old_role_id == new_role_id:
-                    return True
-                
-                # Обновляем роль пользователя
-                result = await cls.update(
-                    filter_by={'id': user_id},
-                    role_id=new_role_id
-                )
-                
-                if result > 0:
-                    # Обновляем счетчики ролей
-                    if old_role_id:
-                        await Role.decrement_count(old_role_id)
-                    await Role.increment_count(new_role_id)
-                
-                return result > 0
+        # Все шаги выполняются в одной транзакции
+        async with session_scope():
+            # Находим пользователя и его текущую роль
+            user = await cls.find_one_or_none_by_id(user_id)
+            if not user:
+                return False
+
+            old_role_id = user.role_id
+
+            # Если роль не изменилась, ничего не делаем
+            if old_role_id == new_role_id:
+                return True
+
+            # Обновляем роль пользователя (выданные ранее токены отзываются)
+            result = await cls._update_revoking_tokens(user_id, role_id=new_role_id)
+
+            if result:
+                # Обновляем счетчики ролей
+                if old_role_id:
+                    await Role.decrement_count(old_role_id)
+                await Role.increment_count(new_role_id)
+
+            return result
 
     @classmethod
     async def update_user_role_by_email(cls, user_email: str, new_role_id: int) -> bool:
         """Обновить роль пользователя по email с обновлением счетчиков"""
-        async with async_session_maker() as session:
-            async with session.begin():
-                # Находим пользователя и его текущую роль
-                user = await cls.find_by_email(user_email)
-                if not user:
-                    return False
-                
-                old_role_id = user.role_id
-                
-                # Если роль не изменилась, ничего не делаем
-                if old_role_id == new_role_id:
-                    return True
-                
-                # Обновляем роль пользователя
-                result = await cls.update(
-                    filter_by={'user_email': user_email},
-                    role_id=new_role_id
-                )
-                
-                if result > 0:
-                    # Обновляем счетчики ролей
-                    if old_role_id:
-                        await Role.decrement_count(old_role_id)
-                    await Role.increment_count(new_role_id)
-                
-                return result > 0
+        # Все шаги выполняются в одной транзакции
+        async with session_scope():
+            # Находим пользователя и его текущую роль
+            user = await cls.find_by_email(user_email)
+            if not user:
+                return False
+
+            old_role_id = user.role_id
+
+            # Если роль не изменилась, ничего не делаем
+            if old_role_id == new_role_id:
+                return True
+
+            # Обновляем роль пользователя (выданные ранее токены отзываются)
+            result = await cls._update_revoking_tokens(user.id, role_id=new_role_id)
+
+            if result:
+                # Обновляем счетчики ролей
+                if old_role_id:
+                    await Role.decrement_count(old_role_id)
+                await Role.increment_count(new_role_id)
+
+            return result
 
     @classmethod
     async def add_user(cls, **user_data: dict):
         """Добавить пользователя с обновлением счетчика роли"""
-        async with async_session_maker() as session:
-            async with session.begin():
-                new_user = cls.model(**user_data)
-                session.add(new_user)
-                await session.flush()
-                new_user_id = new_user.id
-                
-                # Обновляем счетчик роли
-                role_id = user_data.get('role_id')
-                if role_id:
-                    await Role.increment_count(role_id)
-                
-                await session.commit()
-                return new_user_id
+        async with session_scope() as session:
+            new_user = cls.model(**user_data)
+            session.add(new_user)
+            await session.flush()
+            new_user_id = new_user.id
+            invalidate_entities(cls.model, [new_user_id], session)
+
+            # Обновляем счетчик роли
+            role_id = user_data.get('role_id')
+            if role_id:
+                await Role.increment_count(role_id)
+
+            return new_user_id
 
     @classmethod
     async def delete_user_by_id(cls, user_id: int):
         """Удалить пользователя с обновлением счетчика роли"""
-        async with async_session_maker() as session:
-            async with session.begin():
-                # Находим пользователя
-                user = await cls.find_one_or_none_by_id(user_id)
-                if not user:
-                    return False
-                
-                role_id = user.role_id
-                
-                # Удаляем пользователя
-                result = await cls.delete(id=user_id)
-                
-                if result > 0 and role_id:
-                    # Обновляем счетчик роли
-                    await Role.decrement_count(role_id)
-                
-                return result > 0
+        # Все шаги выполняются в одной транзакции
+        async with session_scope():
+            # Находим пользователя
+            user = await cls.find_one_or_none_by_id(user_id)
+            if not user:
+                return False
+
+            role_id = user.role_id
+
+            # Удаляем пользователя
+            result = await cls.delete(id=user_id)
+
+            if result > 0 and role_id:
+                # Обновляем счетчик роли
+                await Role.decrement_count(role_id)
+
+            return result > 0
 
     @classmethod
     async def get_user_with_role_info(cls, user_id: int):
         """Получить пользователя с информацией о роли"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(cls.model).options(joinedload(cls.model.role)).filter_by(id=user_id)
             result = await session.execute(query)
             return result.unique().scalar_one_or_none()
@@ -168,22 +282,22 @@ class UsersDAO(BaseDAO):
     @classmethod
     async def get_user_with_role_info_by_email(cls, user_email: str):
         """Получить пользователя с информацией о роли по email"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(cls.model).options(joinedload(cls.model.role)).filter_by(user_email=user_email)
             result = await session.execute(query)
             return result.unique().scalar_one_or_none()
         
     @classmethod
     async def update_last_login(cls, user_id: int):
-        """Обновить время последнего входа пользователя"""
-        async with async_session_maker() as session:
-            try:
-                # Используем datetime без временной зоны
-                from datetime import datetime
-                current_time = datetime.now()  # Без timezone!
-
-                print(f"🔄 Обновление last_login для пользователя {user_id}: {current_time}")
-
+        """
+        Обновить время последнего входа пользователя.
+        Ошибка не прерывает запрос: обновление выполняется в SAVEPOINT,
+        и при сбое откатывается только оно.
+        """
+        # Используем datetime без временной зоны
+        current_time = datetime.now()  # Без timezone!
+        try:
+            async with savepoint_scope() as session:
                 # Прямое обновление без загрузки объекта
                 stmt = (
                     update(cls.model)
@@ -191,15 +305,15 @@ class UsersDAO(BaseDAO):
                     .values(last_login=current_time)
                 )
                 result = await session.execute(stmt)
-                await session.commit()
+                invalidate_entities(cls.model, [user_id], session)
+                invalidate_principal(user_id, session)
 
-                print(f"✅ Last_login обновлен для пользователя {user_id}")
-                return result.rowcount > 0
+            logger.debug("Last_login обновлен для пользователя %s: %s", user_id, current_time)
+            return result.rowcount > 0
 
-            except Exception as e:
-                print(f"❌ Ошибка при обновлении last_login: {e}")
-                await session.rollback()
-                return False
+        except SQLAlchemyError as e:
+            logger.error("❌ Ошибка при обновлении last_login для пользователя %s: %s", user_id, e)
+            return False
 
     # НОВЫЕ МЕТОДЫ ДЛЯ ОБНОВЛЕНИЯ ПРОФИЛЯ
     
@@ -221,10 +335,8 @@ class UsersDAO(BaseDAO):
     @classmethod
     async def change_password(cls, user_id: int, new_hashed_password: str) -> bool:
         """Изменяет пароль пользователя"""
-        return await cls.update(
-            filter_by={'id': user_id},
-            user_pass=new_hashed_password
-        ) > 0
+        # Выданные ранее токены (в т.ч. на других устройствах) отзываются
+        return await cls._update_revoking_tokens(user_id, user_pass=new_hashed_password)
     
     @classmethod
     async def verify_current_password(cls, user_id: int, plain_password: str) -> bool:
@@ -233,8 +345,8 @@ class UsersDAO(BaseDAO):
         if not user:
             return False
         
-        from app.users.auth import verify_password
-        return verify_password(plain_password, user.user_pass)
+        from app.users.auth import verify_password_async
+        return await verify_password_async(plain_password, user.user_pass)
     
     @classmethod
     async def update_security_settings(cls, user_id: int, settings: dict) -> bool:
@@ -257,7 +369,7 @@ class UsersDAO(BaseDAO):
     @classmethod
     async def get_user_profile(cls, user_id: int):
         """Получает полный профиль пользователя"""
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(cls.model).filter_by(id=user_id)
             result = await session.execute(query)
             user = result.scalar_one_or_none()
@@ -271,6 +383,8 @@ class UsersDAO(BaseDAO):
                     except (json.JSONDecodeError, TypeError):
                         security_settings = {}
                 
+                # Отвязываем объект от сессии, чтобы словарь не попал в БД при коммите
+                session.expunge(user)
                 # Добавляем распарсенные настройки как атрибут
                 user.security_settings = security_settings
             
@@ -281,16 +395,10 @@ class UsersDAO(BaseDAO):
         """Проверяет доступность никнейма"""
         if not user_nick:
             return False
-            
-        existing_user = await cls.find_one_or_none(user_nick=user_nick)
-        if not existing_user:
-            return True
-            
-        # Если передан exclude_user_id, проверяем что это тот же пользователь
-        if exclude_user_id and existing_user.id == exclude_user_id:
-            return True
-            
-        return False
+
+        # Никнейм самого пользователя (exclude_user_id) считается доступным
+        criteria = [cls.model.id != exclude_user_id] if exclude_user_id else []
+        return not await cls.exists(*criteria, user_nick=user_nick)
     
     @classmethod
     async def find_by_nickname(cls, user_nick: str):
@@ -303,7 +411,7 @@ class UsersDAO(BaseDAO):
         if not secondary_email:
             return None
             
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(cls.model).filter(
                 cls.model.secondary_email == secondary_email,
                 cls.model.secondary_email.isnot(None)
@@ -317,7 +425,7 @@ class UsersDAO(BaseDAO):
         if not email:
             return None
             
-        async with async_session_maker() as session:
+        async with read_session_scope() as session:
             query = select(cls.model).filter(
                 or_(
                     cls.model.user_email == email,
@@ -330,61 +438,233 @@ class UsersDAO(BaseDAO):
 class UserLogsDAO(BaseDAO):
     model = UserLog
 
+    # События безопасности пишутся синхронно, в транзакции самого изменения
+    SYNC_ACTIONS = frozenset({'role_change', 'password_change', 'ip_removed', 'ip_restrictions_disable'})
+
+    @classmethod
+    async def create_log(cls, critical: bool = None, **log_data: dict):
+        """
+        Создать запись в логе.
+
+        Обычные события ставятся в очередь отложенной записи (audit_log_writer)
+        и пишутся пачками в фоне. Синхронно, в текущей транзакции, пишутся
+        события из SYNC_ACTIONS (или при critical=True), а также все события,
+        если фоновая запись не запущена или ее очередь переполнена.
+        Событие в транзакции (запроса или session_scope) ставится в очередь
+        после ее коммита, при откате — отбрасывается.
+        """
+        if critical is None:
+            critical = log_data.get('action_type') in cls.SYNC_ACTIONS
+
+        if not critical:
+            # Время события — момент вызова, а не момент записи пачки
+            log_data.setdefault('created_at', datetime.now(timezone.utc).replace(tzinfo=None))
+            # В транзакции запись встанет в очередь только после коммита
+            if await audit_log_writer.submit(log_data, get_current_session()):
+                return None
+        async with session_scope():
+            log = await cls.add(**log_data)
+            await UserLogStatsDAO.apply_inserts([{'action_type': log.action_type, 'created_at': log.created_at}])
+        return log
+
     @classmethod
-    async def create_log(cls, **log_data: dict):
-        """Создать запись в логе"""
-        return await cls.add(**log_data)
+    def log_filters(cls, user_id: int = None, action_type: str = None, changed_by: int = None,
+                    date_from: datetime = None, date_to: datetime = None) -> list:
+        """SQL-условия выборки журнала; created_at хранится в naive UTC"""
+        criteria = []
+        if user_id is not None:
+            criteria.append(cls.model.user_id == user_id)
+        if action_type:
+            criteria.append(cls.model.action_type == action_type)
+        if changed_by is not None:
+            criteria.append(cls.model.changed_by == changed_by)
+        if date_from:
+            criteria.append(cls.model.created_at >= DateTimeUtils.to_naive_utc(date_from))
+        if date_to:
+            criteria.append(cls.model.created_at < DateTimeUtils.to_naive_utc(date_to))
+        return criteria
 
     @classmethod
-    async def get_user_logs(cls, user_id: int, limit: int = 50, offset: int = 0):
+    def _logs_select(cls):
+        """Записи журнала с email и именами пользователя и автора изменения — одним запросом"""
+        log = cls.model
+        user = aliased(User)
+        changer = aliased(User)
+        return (
+            select(
+                log.id, log.user_id, log.changed_by, log.action_type,
+                log.old_value, log.new_value, log.description, log.created_at,
+                user.user_email.label('user_email'),
+                changer.user_email.label('changer_email'),
+                (user.first_name + ' ' + user.last_name).label('user_name'),
+                (changer.first_name + ' ' + changer.last_name).label('changer_name')
+            )
+            .outerjoin(user, user.id == log.user_id)
+            .outerjoin(changer, changer.id == log.changed_by)
+        )
+
+    @classmethod
+    async def get_logs_page(cls, cursor: str = None, limit: int = 50, with_total: bool = True,
+                            **filters) -> dict:
+        """
+        Страница журнала (новые сначала): фильтрация, сортировка, keyset-пагинация
+        и join пользователей выполняются в БД одним запросом.
+
+        Аргументы:
+            cursor: next_cursor предыдущей страницы.
+            limit: Размер страницы.
+            with_total: Добавить оценку общего числа записей (по статистике
+                PostgreSQL, без COUNT по таблице).
+            **filters: user_id, action_type, changed_by, date_from, date_to.
+
+        Возвращает:
+            Словарь {"items": словари записей, "next_cursor", "total", "total_estimated"}.
+        """
+        criteria = cls.log_filters(**filters)
+        page = await cls.find_page(
+            *criteria,
+            order_by="-created_at",
+            after=cursor,
+            limit=limit,
+            query=cls._logs_select()
+        )
+        if with_total:
+            page["total"], page["total_estimated"] = await cls.estimate_count(*criteria)
+        return page
+
+    @classmethod
+    async def get_totals(cls, older_than: datetime) -> dict:
+        """
+        Общее число записей, число записей старше older_than и диапазон дат —
+        одним проходом по таблице (агрегаты с FILTER).
+        """
+        created_at = cls.model.created_at
+        query = select(
+            func.count().label('total_logs'),
+            func.count().filter(created_at < DateTimeUtils.to_naive_utc(older_than)).label('old_logs'),
+            func.min(created_at).label('oldest_log_date'),
+            func.max(created_at).label('newest_log_date')
+        )
+        async with read_session_scope() as session:
+            return dict((await session.execute(query)).one()._mapping)
+
+    @classmethod
+    def stream_logs(cls, **filter_by):
+        """Потоковый обход логов (словари, новые сначала)"""
+        return cls.stream(as_dicts=True, order_by="-created_at", **filter_by)
+
+    @classmethod
+    async def get_user_logs(cls, user_id: int, limit: int = 50, cursor: str = None):
         """Получить логи пользователя"""
-        async with async_session_maker() as session:
-            query = (select(cls.model)
-                    .options(
-                        joinedload(cls.model.user),
-                        joinedload(cls.model.changer)
-                    )
-                    .filter_by(user_id=user_id)
-                    .order_by(desc(cls.model.created_at))
-                    .limit(limit)
-                    .offset(offset))
-            result = await session.execute(query)
-            return result.scalars().all()
-
-    @classmethod
-    async def get_role_change_logs(cls, user_id: int = None, limit: int = 50):
-        """Получить логи изменения ролей"""
-        async with async_session_maker() as session:
-            query = (select(cls.model)
-                    .options(
-                        joinedload(cls.model.user),
-                        joinedload(cls.model.changer)
-                    )
-                    .filter_by(action_type='role_change'))
-            
-            if user_id:
-                query = query.filter_by(user_id=user_id)
-            
-            query = query.order_by(desc(cls.model.created_at)).limit(limit)
-            result = await session.execute(query)
-            return result.scalars().all()
+        page = await cls.get_logs_page(cursor=cursor, limit=limit, with_total=False, user_id=user_id)
+        return page["items"]
 
     @classmethod
-    async def get_recent_role_changes(cls, days: int = 30):
-        """Получить recent изменения ролей за указанное количество дней"""
-        async with async_session_maker() as session:
-            # Используем timezone-aware datetime
-            since_date = datetime.now(timezone.utc) - timedelta(days=days)
-            
-            query = (select(cls.model)
-                    .options(
-                        joinedload(cls.model.user),
-                        joinedload(cls.model.changer)
-                    )
-                    .filter(
-                        cls.model.action_type == 'role_change',
-                        cls.model.created_at >= since_date
-                    )
-                    .order_by(desc(cls.model.created_at)))
-            result = await session.execute(query)
-            return result.scalars().all()
\ No newline at end of file
+    async def get_role_change_logs(cls, user_id: int = None, days: int = None, limit: int = 50) -> list[dict]:
+        """Получить логи изменения ролей (новые сначала), при days — только за последние дни"""
+        date_from = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+        page = await cls.get_logs_page(
+            limit=limit,
+            with_total=False,
+            action_type='role_change',
+            user_id=user_id,
+            date_from=date_from
+        )
+        return page["items"]
+
+
+class UserLogStatsDAO(BaseDAO):
+    """
+    Сводка журнала users_logs_daily_stats (app.users.log_stats). Методы
+    записи выполняются в текущей транзакции — той же, что меняет журнал.
+    """
+    model = UserLogDailyStat
+
+    @staticmethod
+    def _aggregate(rows) -> list[dict]:
+        """Строки журнала -> счетчики по (день, action_type), отсортированные по ключу"""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        groups = {}
+        for row in rows:
+            created_at = row.get('created_at')
+            created_at = DateTimeUtils.to_naive_utc(created_at) if isinstance(created_at, datetime) else now
+            key = (created_at.date(), row['action_type'])
+            group = groups.get(key)
+            if group is None:
+                groups[key] = {'day': key[0], 'action_type': key[1], 'count': 1,
+                               'first_at': created_at, 'last_at': created_at}
+            else:
+                group['count'] += 1
+                group['first_at'] = min(group['first_at'], created_at)
+                group['last_at'] = max(group['last_at'], created_at)
+        # Одинаковый порядок блокировки строк сводки во всех транзакциях — без взаимных блокировок
+        return [groups[key] for key in sorted(groups)]
+
+    @classmethod
+    async def apply_inserts(cls, rows):
+        """Учитывает вставленные строки журнала (action_type, created_at) одним upsert"""
+        values = cls._aggregate(rows)
+        if not values:
+            return
+        async with session_scope() as session:
+            postgres = session.get_bind().dialect.name == "postgresql"
+            stmt = (pg_insert if postgres else sqlite_insert)(cls.model).values(values)
+            smaller, larger = (func.least, func.greatest) if postgres else (func.min, func.max)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['day', 'action_type'],
+                set_={
+                    'count': cls.model.count + stmt.excluded.count,
+                    'first_at': smaller(cls.model.first_at, stmt.excluded.first_at),
+                    'last_at': larger(cls.model.last_at, stmt.excluded.last_at),
+                    'updated_at': func.now()
+                }
+            )
+            await session.execute(stmt)
+
+    @classmethod
+    async def apply_deletes(cls, rows):
+        """Вычитает удаленные строки журнала; опустевшие дни удаляются из сводки"""
+        values = cls._aggregate(rows)
+        if not values:
+            return
+        table = cls.model.__table__
+        async with session_scope() as session:
+            await session.execute(
+                update(table)
+                .where(table.c.day == bindparam('b_day'), table.c.action_type == bindparam('b_action_type'))
+                .values(count=table.c.count - bindparam('b_count'), updated_at=func.now()),
+                [{'b_day': v['day'], 'b_action_type': v['action_type'], 'b_count': v['count']} for v in values]
+            )
+            await session.execute(delete(table).where(table.c.count <= 0))
+
+    @classmethod
+    async def remove_before(cls, before: datetime):
+        """
+        Учитывает удаление всех строк журнала старше before: дни до него
+        удаляются из сводки. before — граница суток (полночь), как у секций:
+        счетчики по дням нельзя уменьшить для части дня.
+        """
+        before = DateTimeUtils.to_naive_utc(before)
+        if before.time() != time.min:
+            raise ValueError(f"Граница удаления должна приходиться на начало суток: {before}")
+        table = cls.model.__table__
+        async with session_scope() as session:
+            await session.execute(delete(table).where(table.c.day < before.date()))
+
+
+async def _flush_audit_logs(rows: list[dict]):
+    # Пачка журнала и ее учет в сводке — одной транзакцией
+    async with session_scope():
+        await UserLogsDAO.bulk_insert(rows, returning=False)
+        await UserLogStatsDAO.apply_inserts(rows)
+
+
+# Отложенная пакетная запись журнала действий (запуск и остановка — в lifespan)
+audit_log_writer = WriteBehindWriter(
+    name="users_logs",
+    flush=_flush_audit_logs,
+    queue_size=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+    enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT_MS / 1000
+)
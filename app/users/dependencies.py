@@ -1,97 +1,93 @@
 from fastapi import Request, HTTPException, status, Depends
-from jose import jwt, JWTError
 from typing import Optional
-from datetime import datetime, timezone
-from app.config import get_auth_data
 from app.users.models import User
 from app.exceptions import TokenExpiredException, NoJwtException, NoUserIdException, ForbiddenException, TokenNoFoundException
 from app.users.dao import UsersDAO
 from app.roles.models import Role, RoleTypes
 from app.utils.secutils import SecurityUtils
 from app.users.ip_dao import UserAllowedIPsDAO
+from app.users.principal import CurrentUser, get_cached_principal, cache_principal
+from app.users.tokens import ACCESS_COOKIE, TokenClaims, decode_access_token, note_token_version
 
 
 def get_token(request: Request):
-    token = request.cookies.get('users_access_token')
+    token = request.cookies.get(ACCESS_COOKIE)
     if not token:
         raise TokenNoFoundException
     return token
 
+
+def get_token_claims(token: str = Depends(get_token)) -> TokenClaims:
+    """Проверенные claims access-токена (без обращения к БД)"""
+    return decode_access_token(token)
+
   
-async def get_current_user(token: str = Depends(get_token)):
+async def load_principal(user_id: int) -> Optional[CurrentUser]:
     """
-    Основная зависимость для получения текущего пользователя
-    Используется для защищенных эндпоинтов
+    Снимок пользователя для авторизации: из кэша, при промахе — из БД.
+    Полный объект User (пароль, настройки безопасности) нужно загружать через UsersDAO.
     """
-    try:
-        auth_data = get_auth_data()
-        payload = jwt.decode(token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
-    except JWTError:
-        raise NoJwtException
-
-    expire = payload.get('exp')
-    expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
-    if (not expire) or (expire_time < datetime.now(timezone.utc)):
-        raise TokenExpiredException
+    principal = get_cached_principal(user_id)
+    if principal is not None:
+        return principal
 
-    user_id = payload.get('sub')
-    if not user_id:
-        raise NoUserIdException
+    user = await UsersDAO.find_one_or_none_by_id(user_id)
+    if not user:
+        return None
+    return cache_principal(user)
 
-    user = await UsersDAO.find_one_or_none_by_id(int(user_id))
+
+async def get_current_user(claims: TokenClaims = Depends(get_token_claims)):
+    """
+    Основная зависимость для получения текущего пользователя
+    Используется для защищенных эндпоинтов
+    """
+    user = await load_principal(claims.user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Пользователь не найден')
 
+    # Токен отозван в другом воркере (смена роли, пароля, выход)
+    if claims.token_version < user.token_version:
+        note_token_version(user.id, user.token_version)
+        raise TokenExpiredException
+
     return user
 
-async def get_optional_user(request: Request) -> Optional[User]:
+async def get_optional_user(request: Request) -> Optional[CurrentUser]:
     """
     Зависимость для опционального получения пользователя
     Возвращает пользователя если авторизован, иначе None
     Используется для главной страницы и публичных эндпоинтов
     """
     try:
-        token = request.cookies.get('users_access_token')
+        token = request.cookies.get(ACCESS_COOKIE)
         if not token:
             return None
-            
-        auth_data = get_auth_data()
-        payload = jwt.decode(token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
-        
-        # Проверяем срок действия токена
-        expire = payload.get('exp')
-        if expire:
-            expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
-            if expire_time < datetime.now(timezone.utc):
-                return None
-        
-        user_id = payload.get('sub')
-        if not user_id:
-            return None
-            
-        user = await UsersDAO.find_one_or_none_by_id(int(user_id))
-        return user
+
+        # Подпись, срок действия и версия токена
+        claims = decode_access_token(token)
+        return await get_current_user(claims)
         
-    except (JWTError, Exception):
+    except Exception:
         # Любая ошибка - считаем пользователя неавторизованным
         return None
 
-async def get_current_admin(current_user: User = Depends(get_current_user)):
-    """Проверяет, что пользователь имеет роль Admin или SuperAdmin"""
-    if current_user.is_admin:
-        return current_user
+async def get_current_admin(claims: TokenClaims = Depends(get_token_claims)):
+    """Проверяет по claims токена, что пользователь имеет роль Admin или SuperAdmin"""
+    if claims.is_admin:
+        return await get_current_user(claims)
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Недостаточно прав!')
 
-async def get_current_moderator(current_user: User = Depends(get_current_user)):
-    """Проверяет, что пользователь имеет роль SuperAdmin"""
-    if current_user.is_moderator:
-        return current_user
+async def get_current_moderator(claims: TokenClaims = Depends(get_token_claims)):
+    """Проверяет по claims токена, что пользователь имеет роль Moderator или выше"""
+    if claims.is_moderator:
+        return await get_current_user(claims)
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Недостаточно прав!')
 
-async def get_current_super_admin(current_user: User = Depends(get_current_user)):
-    """Проверяет, что пользователь имеет роль SuperAdmin"""
-    if current_user.is_super_admin:
-        return current_user
+async def get_current_super_admin(claims: TokenClaims = Depends(get_token_claims)):
+    """Проверяет по claims токена, что пользователь имеет роль SuperAdmin"""
+    if claims.is_super_admin:
+        return await get_current_user(claims)
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN, 
         detail='Требуются права суперадминистратора!'
@@ -184,7 +180,7 @@ async def get_current_user_with_ip_check(
     """
     Основная зависимость с проверкой IP
     """
-    user = await get_current_user(token)
+    user = await get_current_user(decode_access_token(token))
     
     # Проверяем IP
     client_ip = SecurityUtils.get_client_ip(request)
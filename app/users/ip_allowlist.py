@@ -0,0 +1,149 @@
+# app/users/ip_allowlist.py
+"""
+Скомпилированный список разрешенных IP пользователя.
+
+Записи users_allowed_ips (отдельные адреса и CIDR-сети, IPv4 и IPv6)
+собираются в префиксное дерево по битам адреса; проверка IP — проход по
+дереву не глубже длины префикса, без обращения к БД. Скомпилированные
+списки хранятся в кэше сущностей (app.dao.cache) по ключу (IPAllowlist,
+user_id); записи UserAllowedIPsDAO сбрасывают их сразу и после коммита
+(в своем воркере; в остальных список устаревает не дольше
+IP_ALLOWLIST_CACHE_TTL).
+
+Список закрыт при ошибке: если у пользователя есть записи, но ни одна не
+разобралась, доступ запрещен с любого адреса, а не открыт для всех.
+"""
+import ipaddress
+from typing import Iterable, Optional, Union
+
+from app.config import settings
+from app.dao.cache import entity_cache, invalidate_entities, request_memo
+from app.dao.session import get_current_session
+from app.logger import app_logger as logger
+
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_network(value: str) -> IPNetwork:
+    """Адрес или CIDR-сеть; биты хоста в сети допускаются (10.0.0.1/8 -> 10.0.0.0/8)"""
+    network = ipaddress.ip_network(value.strip(), strict=False)
+    # ::ffff:a.b.c.d хранится как IPv4
+    if network.version == 6 and network.network_address.ipv4_mapped and network.prefixlen >= 96:
+        return ipaddress.ip_network(f"{network.network_address.ipv4_mapped}/{network.prefixlen - 96}")
+    return network
+
+
+def parse_address(value: str) -> IPAddress:
+    address = ipaddress.ip_address(value.strip())
+    if address.version == 6 and address.ipv4_mapped:
+        return address.ipv4_mapped
+    return address
+
+
+class _PrefixTree:
+    """Бинарное префиксное дерево сетей одной версии IP"""
+
+    __slots__ = ("bits", "root")
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        # Узел: [потомок по 0, потомок по 1, конец сети]
+        self.root = [None, None, False]
+
+    def insert(self, network: IPNetwork):
+        node = self.root
+        value = int(network.network_address)
+        for depth in range(network.prefixlen):
+            if node[2]:
+                return  # уже покрыто более широкой сетью
+            bit = (value >> (self.bits - 1 - depth)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+            node = node[bit]
+        node[2] = True
+        # Более узкие сети внутри больше не нужны
+        node[0] = node[1] = None
+
+    def contains(self, address: IPAddress) -> bool:
+        node = self.root
+        value = int(address)
+        for depth in range(self.bits):
+            if node[2]:
+                return True
+            node = node[(value >> (self.bits - 1 - depth)) & 1]
+            if node is None:
+                return False
+        return node[2]
+
+
+class IPAllowlist:
+    """Неизменяемый скомпилированный список разрешенных адресов и сетей"""
+
+    # Включает сброс через invalidate_entities (app.dao.cache)
+    __cache_ttl__ = settings.IP_ALLOWLIST_CACHE_TTL
+
+    __slots__ = ("size", "rows", "_trees")
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self.size = 0  # скомпилированных сетей
+        self.rows = 0  # записей в БД, включая некорректные
+        self._trees = {4: _PrefixTree(32), 6: _PrefixTree(128)}
+        for entry in entries:
+            self.rows += 1
+            try:
+                network = parse_network(entry)
+            except ValueError:
+                logger.warning(f"⚠️ Пропущена некорректная запись списка разрешенных IP: {entry!r}")
+                continue
+            self._trees[network.version].insert(network)
+            self.size += 1
+        if self.rows and not self.size:
+            logger.error(f"❌ Все {self.rows} записей списка разрешенных IP некорректны, доступ закрыт")
+
+    @property
+    def is_empty(self) -> bool:
+        """Записей нет — ограничений по IP нет (некорректные записи не делают список пустым)"""
+        return self.rows == 0
+
+    def matches(self, client_ip: str) -> bool:
+        """Входит ли адрес в одну из сетей списка"""
+        try:
+            address = parse_address(client_ip)
+        except ValueError:
+            return False
+        return self._trees[address.version].contains(address)
+
+    def allows(self, client_ip: str) -> bool:
+        """Разрешен ли доступ с адреса (пустой список разрешает все)"""
+        return self.is_empty or self.matches(client_ip)
+
+
+def get_cached_allowlist(user_id: int) -> Optional[IPAllowlist]:
+    """Скомпилированный список из памяти запроса или кэша процесса"""
+    key = (IPAllowlist, user_id)
+    memo = request_memo()
+    if memo is not None and key in memo:
+        return memo[key]
+
+    allowlist = entity_cache.get(key)
+    if allowlist is not None and memo is not None:
+        memo[key] = allowlist
+    return allowlist
+
+
+def cache_allowlist(user_id: int, entries: Iterable[str]) -> IPAllowlist:
+    """Компилирует список разрешенных IP пользователя и кладет его в кэш"""
+    allowlist = IPAllowlist(entries)
+    key = (IPAllowlist, user_id)
+    entity_cache.set(key, allowlist, IPAllowlist.__cache_ttl__)
+    memo = request_memo()
+    if memo is not None:
+        memo[key] = allowlist
+    return allowlist
+
+
+def invalidate_ip_allowlist(user_id: int, session=None):
+    """Сбрасывает скомпилированный список пользователя (повторно — после коммита сессии)"""
+    invalidate_entities(IPAllowlist, [user_id], session or get_current_session())
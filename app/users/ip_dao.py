@@ -1,13 +1,21 @@
-from sqlalchemy import select, delete, and_
+from sqlalchemy import select, delete, and_, case, or_
 from sqlalchemy.orm import joinedload
 from app.dao.base import BaseDAO
 from app.users.models import UserAllowedIP
 from app.database import async_session_maker
-from typing import List, Optional
+from app.users.principal import invalidate_principal
+from app.users.ip_allowlist import invalidate_ip_allowlist
+from typing import List, Optional, Union
 
 class UserAllowedIPsDAO(BaseDAO):
     model = UserAllowedIP
 
+    @classmethod
+    def _user_ips_changed(cls, user_id: int):
+        """Сбрасывает кэши, зависящие от списка IP пользователя"""
+        invalidate_principal(user_id)
+        invalidate_ip_allowlist(user_id)
+
     @classmethod
     async def find_by_user_id(cls, user_id: int, active_only: bool = True) -> List[UserAllowedIP]:
         """Найти все разрешенные IP для пользователя"""
@@ -25,34 +33,45 @@ class UserAllowedIPsDAO(BaseDAO):
     @classmethod
     async def add_ip_for_user(cls, user_id: int, ip_address: str, description: str = None) -> UserAllowedIP:
         """Добавить IP адрес для пользователя"""
-        # Проверяем, не существует ли уже этот IP
-        existing = await cls.find_by_ip_and_user(user_id, ip_address)
-        if existing:
-            # Если существует но не активен - активируем
-            if not existing.is_active:
-                await cls.update(
-                    filter_by={'id': existing.id},
-                    is_active=1,
-                    description=description
-                )
-                return existing
-            return existing
-        
-        # Создаем новый
-        return await cls.add(
-            user_id=user_id,
-            ip_address=ip_address,
-            description=description
+        records = await cls.add_multiple_ips(
+            user_id, [{'ip_address': ip_address, 'description': description}]
         )
+        return records[0]
 
     @classmethod
-    async def add_multiple_ips(cls, user_id: int, ip_addresses: List[str]) -> List[UserAllowedIP]:
-        """Добавить несколько IP адресов для пользователя"""
-        results = []
+    async def add_multiple_ips(cls, user_id: int, ip_addresses: List[Union[str, dict]]) -> List[UserAllowedIP]:
+        """
+        Добавить несколько IP адресов для пользователя одним запросом (upsert).
+
+        Элементы — строки с IP или словари {'ip_address', 'description'}.
+        Существующий активный IP остается без изменений, неактивный —
+        активируется с новым описанием.
+        """
+        rows = []
         for ip in ip_addresses:
-            ip_record = await cls.add_ip_for_user(user_id, ip)
-            results.append(ip_record)
-        return results
+            if isinstance(ip, str):
+                ip = {'ip_address': ip}
+            rows.append({
+                'user_id': user_id,
+                'ip_address': ip['ip_address'],
+                'description': ip.get('description'),
+                'is_active': 1
+            })
+
+        was_inactive = or_(cls.model.is_active == 0, cls.model.is_active.is_(None))
+        records = await cls.bulk_upsert(
+            rows,
+            conflict_cols=['user_id', 'ip_address'],
+            update_cols={
+                'is_active': 1,
+                'description': lambda excluded: case(
+                    (was_inactive, excluded.description),
+                    else_=cls.model.description
+                )
+            }
+        )
+        cls._user_ips_changed(user_id)
+        return records
 
     @classmethod
     async def deactivate_ip(cls, user_id: int, ip_address: str) -> bool:
@@ -65,6 +84,7 @@ class UserAllowedIPsDAO(BaseDAO):
             filter_by={'id': ip_record.id},
             is_active=0
         )
+        cls._user_ips_changed(user_id)
         return result > 0
 
     @classmethod
@@ -75,12 +95,24 @@ class UserAllowedIPsDAO(BaseDAO):
             return False
         
         result = await cls.delete(id=ip_record.id)
+        cls._user_ips_changed(user_id)
         return result > 0
 
+    @classmethod
+    async def deactivate_all_user_ips(cls, user_id: int) -> int:
+        """Деактивировать все IP адреса пользователя (снять ограничения); возвращает число записей"""
+        result = await cls.update(
+            filter_by={'user_id': user_id, 'is_active': 1},
+            is_active=0
+        )
+        cls._user_ips_changed(user_id)
+        return result
+
     @classmethod
     async def delete_all_user_ips(cls, user_id: int) -> bool:
         """Удалить все IP адреса пользователя"""
         result = await cls.delete(user_id=user_id)
+        cls._user_ips_changed(user_id)
         return result > 0
 
     @classmethod
@@ -96,8 +128,8 @@ class UserAllowedIPsDAO(BaseDAO):
     @classmethod
     async def get_user_allowed_ips_list(cls, user_id: int) -> List[str]:
         """Получить список разрешенных IP адресов пользователя"""
-        ip_records = await cls.find_by_user_id(user_id, active_only=True)
-        return [ip.ip_address for ip in ip_records]
+        rows = await cls.find_all(columns=['ip_address'], user_id=user_id, is_active=1)
+        return [row.ip_address for row in rows]
 
     @classmethod
     async def update_ip_description(cls, user_id: int, ip_address: str, description: str) -> bool:
@@ -110,4 +142,5 @@ class UserAllowedIPsDAO(BaseDAO):
             filter_by={'id': ip_record.id},
             description=description
         )
+        cls._user_ips_changed(user_id)
         return result > 0
\ No newline at end of file
@@ -0,0 +1,415 @@
+# app/users/log_archive.py
+"""
+Архив журнала users_logs на локальном диске (холодное хранение).
+
+Перед очисткой (LogCleaner.cleanup_old_logs) записи старше срока хранения
+читаются серверным курсором (UserLogsDAO.stream) и пишутся в сегменты —
+файлы NDJSON (одна запись — одна строка JSON) в LOG_ARCHIVE_DIR:
+
+    users_logs_<от>_<до>.ndjson.gz      (или .ndjson.zst)
+    users_logs_<от>_<до>.idx.json
+
+Сегмент состоит из независимо сжатых блоков по LOG_ARCHIVE_BLOCK_ROWS строк
+(члены gzip или кадры zstd; файл целиком остается корректным .gz/.zst).
+Рядом лежит индекс: смещение и длина каждого блока в байтах, его диапазон
+времени, а также номера блоков по дням и по user_id. Запрос к архиву
+выбирает сегменты по диапазону времени, в них — блоки по индексу, и читает
+с диска и распаковывает только эти блоки.
+
+Сегмент появляется атомарно: файлы пишутся во временные и переименовываются,
+индекс — последним. Строки читаются из основной БД (реплика может отставать)
+в порядке (created_at, id); позиция последней заархивированной строки
+(водяной знак) хранится в LOG_ARCHIVE_DIR/state.json, поэтому прерванная
+или частичная очистка не приводит к повторной архивации тех же строк.
+Водяной знак по id не подходит: id назначается при вставке (у отложенной
+записи audit_log_writer — позже created_at), и строка с меньшим id может
+стать старше срока хранения уже после архивации строк с большими id.
+
+Архивирует ведущий процесс задачи очистки (app.tasks.leader), и после смены
+ведущего архивацию продолжает процесс на другом узле. Поэтому сегменты и
+водяной знак должны лежать в общем для всех узлов каталоге: при выборе
+ведущего запуск без LOG_ARCHIVE_DIR_SHARED=True или без смонтированного
+каталога завершается ошибкой (check_archive_storage), а не разносит архив
+по локальным дискам узлов.
+
+Очистка удаляет только строки до границы, которой архивация действительно
+достигла (archived_before в результате archive()). Строки старше срока
+хранения к моменту архивации давно записаны: задержка отложенной записи —
+секунды, срок хранения — дни.
+
+zstd используется, если установлен пакет zstandard, иначе — gzip.
+"""
+import asyncio
+import gzip
+import heapq
+import json
+import os
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import tuple_
+
+from app.config import settings
+from app.dao.session import session_scope
+from app.logger import app_logger as logger
+from app.utils.datetime_utils import DateTimeUtils
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость
+    zstandard = None
+
+
+PREFIX = "users_logs"
+EXTENSIONS = {"gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _overlaps(start: str, end: str, date_from: Optional[str], date_to: Optional[str]) -> bool:
+    """Пересекается ли [start, end] с [date_from, date_to) (ISO-строки сравниваются как время)"""
+    return (date_from is None or end >= date_from) and (date_to is None or start < date_to)
+
+
+class _SegmentWriter:
+    """Запись одного сегмента и его индекса (синхронно, выполняется в потоке)"""
+
+    def __init__(self, directory: str, compression: str):
+        self.directory = directory
+        self.compression = compression
+        self.tmp_path = os.path.join(directory, f".{PREFIX}.{os.getpid()}.tmp")
+        self.file = open(self.tmp_path, "wb")
+        self.offset = 0
+        self.rows = 0
+        self.first_id = self.last_id = None
+        self.last_created_at = None
+        self.start = self.end = None
+        self.blocks: list[dict] = []
+        self.days: dict[str, list[int]] = {}
+        self.users: dict[str, list[int]] = {}
+
+    def write_block(self, lines: list[bytes], rows: list[dict]):
+        data = _compress(b"".join(lines), self.compression)
+        self.file.write(data)
+
+        number = len(self.blocks)
+        times = [row["created_at"] for row in rows]
+        block = {"offset": self.offset, "length": len(data), "rows": len(rows),
+                 "from": min(times), "to": max(times)}
+        self.blocks.append(block)
+        self.offset += len(data)
+        self.rows += len(rows)
+
+        for row in rows:
+            for key, bucket in ((row["created_at"][:10], self.days), (str(row["user_id"]), self.users)):
+                numbers = bucket.setdefault(key, [])
+                if not numbers or numbers[-1] != number:
+                    numbers.append(number)
+
+        self.first_id = rows[0]["id"] if self.first_id is None else self.first_id
+        self.last_id = rows[-1]["id"]
+        self.last_created_at = rows[-1]["created_at"]
+        self.start = block["from"] if self.start is None else min(self.start, block["from"])
+        self.end = block["to"] if self.end is None else max(self.end, block["to"])
+
+    def _name(self) -> str:
+        stamp = lambda value: value[:19].replace("-", "").replace(":", "")
+        name = f"{PREFIX}_{stamp(self.start)}_{stamp(self.end)}"
+        if os.path.exists(os.path.join(self.directory, name + EXTENSIONS[self.compression])):
+            name = f"{name}_{self.first_id}"
+        return name
+
+    def close(self) -> Optional[str]:
+        """Переименовывает сегмент, пишет индекс; возвращает имя сегмента (None, если он пуст)"""
+        self.file.close()
+        if not self.rows:
+            os.remove(self.tmp_path)
+            return None
+
+        name = self._name()
+        segment = name + EXTENSIONS[self.compression]
+        os.replace(self.tmp_path, os.path.join(self.directory, segment))
+        index = {
+            "segment": segment,
+            "compression": self.compression,
+            "rows": self.rows,
+            "first_id": self.first_id,
+            "last_id": self.last_id,
+            "from": self.start,
+            "to": self.end,
+            "blocks": self.blocks,
+            "days": self.days,
+            "users": self.users
+        }
+        index_path = os.path.join(self.directory, f"{name}.idx.json")
+        with open(f"{index_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(f"{index_path}.tmp", index_path)
+        return segment
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class LogArchiver:
+    """Архивация истекших записей журнала и запросы к архиву"""
+
+    def __init__(self, directory: str, compression: str, block_rows: int, segment_rows: int):
+        if compression == "zstd" and zstandard is None:
+            logger.warning("⚠️ Пакет zstandard не установлен, архив журнала сжимается gzip")
+            compression = "gzip"
+        self.directory = directory
+        self.compression = compression
+        self.block_rows = block_rows
+        self.segment_rows = segment_rows
+        self.last_run: Optional[dict] = None
+        self._lock = asyncio.Lock()
+        self._indexes: dict[str, tuple[float, dict]] = {}
+
+    @property
+    def state_file(self) -> str:
+        return os.path.join(self.directory, "state.json")
+
+    def _load_watermark(self) -> Optional[tuple[datetime, int]]:
+        """(created_at, id) последней заархивированной строки или None"""
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+            return datetime.fromisoformat(state["last_created_at"]), int(state["last_id"])
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def _save_watermark(self, created_at: str, last_id: int):
+        state = {
+            "last_created_at": created_at,
+            "last_id": last_id,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        with open(f"{self.state_file}.tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(f"{self.state_file}.tmp", self.state_file)
+
+    async def archive(self, cutoff: datetime) -> dict:
+        """
+        Пишет в архив записи старше cutoff, еще не попавшие в него.
+
+        Ошибка записи пробрасывается: очистка не должна удалять
+        незаархивированные строки.
+
+        Возвращает:
+            {"rows": число заархивированных строк, "segments": имена новых сегментов,
+             "archived_before": все строки старше этой границы есть в архиве}.
+        """
+        # Импорт здесь: UserLogsDAO тянет за собой модуль пользователей
+        from app.users.dao import UserLogsDAO
+        from app.users.models import UserLog
+
+        cutoff = DateTimeUtils.to_naive_utc(cutoff)
+        async with self._lock:
+            if not settings.LOG_ARCHIVE_DIR_SHARED:
+                # Общий каталог не создается: без смонтированного тома архив попал бы на локальный диск
+                await asyncio.to_thread(os.makedirs, self.directory, exist_ok=True)
+            watermark = self._load_watermark()
+            criteria = [UserLog.created_at < cutoff]
+            if watermark is not None:
+                criteria.append(tuple_(UserLog.created_at, UserLog.id) > tuple_(*watermark))
+            segments, total = [], 0
+            writer: Optional[_SegmentWriter] = None
+            lines, rows = [], []
+
+            async def flush_block():
+                nonlocal writer, lines, rows
+                if writer is None:
+                    writer = await asyncio.to_thread(_SegmentWriter, self.directory, self.compression)
+                await asyncio.to_thread(writer.write_block, lines, rows)
+                lines, rows = [], []
+
+            async def close_segment():
+                nonlocal writer
+                segment = await asyncio.to_thread(writer.close)
+                await asyncio.to_thread(self._save_watermark, writer.last_created_at, writer.last_id)
+                segments.append(segment)
+                writer = None
+
+            try:
+                # Поток читается из основной БД, а не из реплики, и не в транзакции
+                # вызывающего HTTP-запроса
+                async with session_scope(independent=True):
+                    async for row in UserLogsDAO.stream(
+                        *criteria,
+                        order_by="created_at",  # (created_at, id) — порядок водяного знака
+                        batch_size=self.block_rows,
+                        as_dicts=True
+                    ):
+                        row["created_at"] = row["created_at"].isoformat()
+                        lines.append(json.dumps(row, ensure_ascii=False, default=_encode).encode() + b"\n")
+                        rows.append(row)
+                        total += 1
+                        if len(rows) >= self.block_rows:
+                            await flush_block()
+                            if writer.rows >= self.segment_rows:
+                                await close_segment()
+                if rows:
+                    await flush_block()
+                if writer is not None:
+                    await close_segment()
+            except BaseException:
+                if writer is not None:
+                    await asyncio.to_thread(writer.abort)
+                raise
+
+            self.last_run = {
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "cutoff": cutoff.isoformat(),
+                "rows": total,
+                "segments": segments
+            }
+            if total:
+                logger.info(f"📦 В архив журнала записано {total} строк старше {cutoff:%Y-%m-%d}: {', '.join(segments)}")
+            # Выборка дочитана до конца: заархивировано все старше cutoff
+            return {"rows": total, "segments": segments, "archived_before": cutoff}
+
+    def _load_indexes(self) -> list[dict]:
+        """Индексы всех сегментов (кэшируются до изменения файла)"""
+        if not os.path.isdir(self.directory):
+            return []
+        indexes = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(PREFIX) and name.endswith(".idx.json")):
+                continue
+            path = os.path.join(self.directory, name)
+            mtime = os.path.getmtime(path)
+            cached = self._indexes.get(name)
+            if cached is None or cached[0] != mtime:
+                with open(path, encoding="utf-8") as f:
+                    cached = (mtime, json.load(f))
+                self._indexes[name] = cached
+            indexes.append(cached[1])
+        return indexes
+
+    def _query(self, user_id, action_type, date_from, date_to, limit) -> dict:
+        # Кандидаты — блоки, пересекающиеся с периодом и содержащие user_id / нужные дни
+        candidates = []
+        for index in self._load_indexes():
+            if not _overlaps(index["from"], index["to"], date_from, date_to):
+                continue
+            numbers = range(len(index["blocks"]))
+            if user_id is not None:
+                numbers = index["users"].get(str(user_id), [])
+            if date_from is not None or date_to is not None:
+                days = {
+                    number for day, day_blocks in index["days"].items()
+                    if _overlaps(day, day + "T23:59:59.999999", date_from, date_to)
+                    for number in day_blocks
+                }
+                numbers = [number for number in numbers if number in days]
+            for number in numbers:
+                block = index["blocks"][number]
+                if _overlaps(block["from"], block["to"], date_from, date_to):
+                    candidates.append((block["to"], index, block))
+
+        # Новые блоки первыми; как только limit набран, более старые блоки пропускаются
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        found: list[tuple[str, int, dict]] = []
+        blocks_read = bytes_read = 0
+        for block_to, index, block in candidates:
+            if len(found) >= limit and block_to < found[0][0]:
+                break
+            with open(os.path.join(self.directory, index["segment"]), "rb") as f:
+                f.seek(block["offset"])
+                data = f.read(block["length"])
+            blocks_read += 1
+            bytes_read += len(data)
+            for line in _decompress(data, index["compression"]).splitlines():
+                row = json.loads(line)
+                if user_id is not None and row["user_id"] != user_id:
+                    continue
+                if action_type and row["action_type"] != action_type:
+                    continue
+                if not _overlaps(row["created_at"], row["created_at"], date_from, date_to):
+                    continue
+                item = (row["created_at"], row["id"], row)
+                # Мин-куча из limit самых новых записей
+                if len(found) < limit:
+                    heapq.heappush(found, item)
+                elif item[:2] > found[0][:2]:
+                    heapq.heapreplace(found, item)
+
+        items = [row for _, _, row in sorted(found, key=lambda item: item[:2], reverse=True)]
+        return {"items": items, "blocks_read": blocks_read, "bytes_read": bytes_read}
+
+    async def query(self, user_id: int = None, action_type: str = None, date_from: datetime = None,
+                    date_to: datetime = None, limit: int = 100) -> dict:
+        """
+        Записи архива (новые сначала), прочитанные по индексу: с диска читаются
+        только блоки нужных сегментов, дней и пользователя.
+
+        Возвращает:
+            {"items": записи, "blocks_read": прочитано блоков, "bytes_read": прочитано байт}.
+        """
+        as_iso = lambda value: DateTimeUtils.to_naive_utc(value).isoformat() if value else None
+        return await asyncio.to_thread(
+            self._query, user_id, action_type, as_iso(date_from), as_iso(date_to), limit
+        )
+
+    async def list_segments(self) -> list[dict]:
+        """Сегменты архива: имя, период, число строк и размер"""
+        indexes = await asyncio.to_thread(self._load_indexes)
+        return [
+            {
+                "segment": index["segment"],
+                "from": index["from"],
+                "to": index["to"],
+                "rows": index["rows"],
+                "size_bytes": sum(block["length"] for block in index["blocks"])
+            }
+            for index in indexes
+        ]
+
+
+def check_archive_storage():
+    """
+    Проверка при запуске приложения: с выбором ведущего архив журнала должен
+    быть в общем каталоге (RuntimeError, если он не объявлен общим или не смонтирован).
+    """
+    # Импорт здесь: модуль выбора ведущего создает движки БД
+    from app.tasks.leader import log_cleanup_leader
+
+    if not settings.LOG_ARCHIVE_ENABLED or not log_cleanup_leader.enabled:
+        return
+    if not settings.LOG_ARCHIVE_DIR_SHARED:
+        raise RuntimeError(
+            "Архив журнала пишет ведущий процесс, который может смениться на другом узле: "
+            "укажите в LOG_ARCHIVE_DIR общий для всех узлов каталог и LOG_ARCHIVE_DIR_SHARED=True "
+            "(на одном узле — просто LOG_ARCHIVE_DIR_SHARED=True) или отключите LOG_ARCHIVE_ENABLED"
+        )
+    if not os.path.isdir(settings.LOG_ARCHIVE_DIR):
+        raise RuntimeError(f"Общий каталог архива журнала {settings.LOG_ARCHIVE_DIR} не найден (том не смонтирован?)")
+
+
+log_archiver = LogArchiver(
+    directory=settings.LOG_ARCHIVE_DIR,
+    compression=settings.LOG_ARCHIVE_COMPRESSION,
+    block_rows=settings.LOG_ARCHIVE_BLOCK_ROWS,
+    segment_rows=settings.LOG_ARCHIVE_SEGMENT_ROWS
+)
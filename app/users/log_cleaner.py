@@ -1,8 +1,11 @@
 import logging
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import delete
-from app.database import async_session_maker
-from app.users.models import UserLog
+from app.config import settings
+from app.users.dao import UserLogsDAO
+from app.users.log_archive import log_archiver
+from app.users.log_partitions import LogPartitionManager, add_months, partition_month
+from app.users.log_purge import log_purger
+from app.users.log_stats import log_stats
 
 logger = logging.getLogger(__name__)
 
@@ -10,69 +13,49 @@ class LogCleaner:
     @staticmethod
     async def cleanup_old_logs(days_to_keep: int = 30):
         """
-        Удаляет логи старше указанного количества дней
+        Удаляет логи старше указанного количества дней.
+        При LOG_ARCHIVE_ENABLED строки предварительно пишутся в архив
+        (app.users.log_archive); при ошибке архивации ничего не удаляется,
+        иначе удаляются только строки до границы, которой достигла архивация.
         """
-        try:
-            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
-            
-            async with async_session_maker() as session:
-                async with session.begin():
-                    # Удаляем логи старше cutoff_date
-                    stmt = delete(UserLog).where(
-                        UserLog.created_at < cutoff_date
-                    )
-                    result = await session.execute(stmt)
-                    deleted_count = result.rowcount
-                    
-                    await session.commit()
-                    
-                    logger.info(f"Удалено {deleted_count} записей логов старше {days_to_keep} дней")
-                    return deleted_count
-                    
-        except Exception as e:
-            logger.error(f"Ошибка при очистке логов: {e}")
-            await session.rollback()
-            raise e
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
+        partitioned = await LogPartitionManager.is_partitioned()
+        if partitioned:
+            # Будущие секции — до архивации: ее ошибка не должна оставить вставки без секций
+            await LogPartitionManager.ensure_partitions()
+
+        if settings.LOG_ARCHIVE_ENABLED:
+            archived = await log_archiver.archive(cutoff)
+            cutoff = min(cutoff, archived["archived_before"].replace(tzinfo=timezone.utc))
+
+        if partitioned:
+            # Удаляются целые секции старше срока (с точностью до месяца, не позже cutoff)
+            result = await LogPartitionManager.drop_expired(days_to_keep, cutoff)
+            months = [month for month in map(partition_month, result["partitions"]) if month]
+            if months:
+                boundary = add_months(max(months), 1)
+                await log_stats.record_deletion(datetime.combine(boundary, datetime.min.time()))
+            return result["rows"]
+
+        # Пакетное удаление, не блокирующее вставки в журнал (app.users.log_purge)
+        # Каждый пакет вычитается из сводки в своей транзакции
+        deleted_count = await log_purger.purge(days_to_keep, cutoff=cutoff)
+        logger.info(f"Удалено {deleted_count} записей логов старше {days_to_keep} дней")
+        return deleted_count
 
     @staticmethod
     async def get_log_statistics():
         """
-        Получает статистику по логам
+        Получает точную статистику по логам (один запрос с агрегатами)
         """
         try:
-            async with async_session_maker() as session:
-                from sqlalchemy import func, select
-                
-                # Общее количество логов
-                total_count_query = select(func.count(UserLog.id))
-                total_result = await session.execute(total_count_query)
-                total_count = total_result.scalar()
-                
-                # Количество логов старше 30 дней
-                cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
-                old_count_query = select(func.count(UserLog.id)).where(
-                    UserLog.created_at < cutoff_date
-                )
-                old_result = await session.execute(old_count_query)
-                old_count = old_result.scalar()
-                
-                # Самые старые и новые логи
-                oldest_query = select(func.min(UserLog.created_at))
-                newest_query = select(func.max(UserLog.created_at))
-                
-                oldest_result = await session.execute(oldest_query)
-                newest_result = await session.execute(newest_query)
-                
-                oldest_date = oldest_result.scalar()
-                newest_date = newest_result.scalar()
-                
-                return {
-                    "total_logs": total_count,
-                    "old_logs_30_days": old_count,
-                    "oldest_log_date": oldest_date,
-                    "newest_log_date": newest_date
-                }
-                
+            totals = await UserLogsDAO.get_totals(older_than=datetime.now(timezone.utc) - timedelta(days=30))
+            return {
+                "total_logs": totals["total_logs"],
+                "old_logs_30_days": totals["old_logs"],
+                "oldest_log_date": totals["oldest_log_date"],
+                "newest_log_date": totals["newest_log_date"]
+            }
         except Exception as e:
             logger.error(f"Ошибка при получении статистики логов: {e}")
-            return {}
\ No newline at end of file
+            return {}
@@ -0,0 +1,212 @@
+# app/users/log_partitions.py
+"""
+Помесячное секционирование журнала users_logs (PostgreSQL).
+
+Миграция 7f3b9d1e6a52 переводит users_logs в PARTITION BY RANGE (created_at).
+Секции называются users_logs_pYYYYMM и покрывают интервал от 1-го числа
+месяца до 1-го числа следующего (UTC). Обслуживание:
+- ensure_partitions() заранее создает секции на LOG_PARTITION_MONTHS_AHEAD месяцев вперед;
+- drop_expired() отсоединяет и удаляет секции, целиком вышедшие за срок
+  хранения. Это операция над метаданными: время не зависит от числа строк,
+  нет долгих блокировок, WAL на каждую строку и раздувания таблицы.
+
+Срок хранения округляется до месяца: строки старше срока остаются до
+истечения всей их секции. Default-секции нет (с ней невозможен DETACH
+CONCURRENTLY), поэтому вставка в месяц без секции завершится ошибкой.
+Будущие секции создаются с большим запасом (миграция — на 12 месяцев,
+ensure_partitions() при каждом запуске очистки — на LOG_PARTITION_MONTHS_AHEAD),
+а если до последней секции остается меньше LOG_PARTITION_MIN_MONTHS_AHEAD
+месяцев (обслуживание давно не выполнялось или DDL не проходит),
+check_headroom() пишет ошибку в лог при каждом запуске.
+
+Если таблица не секционирована (другая СУБД или миграция не применена),
+is_partitioned() возвращает False и очистка идет обычным DELETE.
+"""
+import re
+from datetime import date, datetime, timezone, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.logger import app_logger as logger
+
+
+TABLE = "users_logs"
+_PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Месяц секции по ее имени (None для чужих таблиц)"""
+    match = _PARTITION_RE.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partition_ddl(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+class LogPartitionManager:
+    """Создание будущих и удаление истекших секций users_logs"""
+
+    @staticmethod
+    async def _connect():
+        """Соединение в autocommit: каждый DDL — отдельная короткая транзакция"""
+        connection = await engine.connect()
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        # Не вставать в очередь за долгими транзакциями, блокируя вставки в журнал
+        await connection.execute(text(f"SET lock_timeout = {int(settings.LOG_PARTITION_LOCK_TIMEOUT_MS)}"))
+        return connection
+
+    @staticmethod
+    async def _close(connection):
+        try:
+            await connection.execute(text("RESET lock_timeout"))
+        finally:
+            await connection.close()
+
+    @staticmethod
+    async def is_partitioned() -> bool:
+        if engine.dialect.name != "postgresql":
+            return False
+        async with engine.connect() as connection:
+            return bool(await connection.scalar(
+                text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+                {"table": TABLE}
+            ))
+
+    @staticmethod
+    async def list_partitions() -> list[dict]:
+        """Секции с оценкой числа строк по статистике (без COUNT)"""
+        async with engine.connect() as connection:
+            result = await connection.execute(
+                text(
+                    "SELECT c.relname, GREATEST(c.reltuples, 0)::bigint "
+                    "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+                ),
+                {"table": TABLE}
+            )
+            return [
+                {"name": name, "month": partition_month(name), "estimated_rows": rows}
+                for name, rows in result.all()
+            ]
+
+    @classmethod
+    async def ensure_partitions(cls, months_ahead: int = None) -> list[str]:
+        """Создает недостающие секции с текущего месяца на months_ahead вперед"""
+        if months_ahead is None:
+            months_ahead = settings.LOG_PARTITION_MONTHS_AHEAD
+        existing = {partition["name"] for partition in await cls.list_partitions()}
+        current = month_start(datetime.now(timezone.utc).date())
+
+        created = []
+        connection = await cls._connect()
+        try:
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                if partition_name(month) in existing:
+                    continue
+                try:
+                    await connection.execute(text(partition_ddl(month)))
+                    created.append(partition_name(month))
+                except Exception as e:
+                    logger.error(f"❌ Не удалось создать секцию {partition_name(month)}: {e}")
+        finally:
+            await cls._close(connection)
+
+        if created:
+            logger.info(f"✅ Созданы секции журнала: {', '.join(created)}")
+        await cls.check_headroom()
+        return created
+
+    @classmethod
+    async def check_headroom(cls, min_months: int = None) -> Optional[int]:
+        """
+        Сколько полных месяцев вперед покрыто секциями (None — секций нет).
+        Если меньше min_months, пишет ошибку: без секции вставки в журнал падают.
+        """
+        if min_months is None:
+            min_months = settings.LOG_PARTITION_MIN_MONTHS_AHEAD
+        months = [partition["month"] for partition in await cls.list_partitions() if partition["month"]]
+        current = month_start(datetime.now(timezone.utc).date())
+        headroom = None
+        if months:
+            furthest = max(months)
+            headroom = (furthest.year - current.year) * 12 + furthest.month - current.month
+
+        if headroom is None or headroom < min_months:
+            logger.error(
+                f"🚨 Секции журнала {TABLE} созданы только до "
+                f"{add_months(max(months), 1) if months else current}: "
+                f"запас {headroom or 0} мес. меньше {min_months}. Без секции вставки в журнал "
+                f"завершатся ошибкой — проверьте обслуживание секций (LogPartitionManager.ensure_partitions)"
+            )
+        return headroom
+
+    @classmethod
+    async def drop_expired(cls, days_to_keep: int, cutoff: datetime = None) -> dict:
+        """
+        Отсоединяет (и, если не LOG_PARTITION_DETACH_ONLY, удаляет) секции,
+        все строки которых старше days_to_keep дней (или старше cutoff, если задан).
+
+        Возвращает:
+            {"partitions": имена секций, "rows": оценка числа удаленных строк}.
+        """
+        if cutoff is None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
+        cutoff = cutoff.date()
+        expired = [
+            partition for partition in await cls.list_partitions()
+            if partition["month"] is not None and add_months(partition["month"], 1) <= cutoff
+        ]
+        if not expired:
+            return {"partitions": [], "rows": 0}
+
+        removed, rows = [], 0
+        connection = await cls._connect()
+        try:
+            # С PostgreSQL 14 отсоединение не берет эксклюзивную блокировку родителя
+            concurrently = (connection.dialect.server_version_info or (0,)) >= (14,)
+            for partition in expired:
+                name = partition["name"]
+                try:
+                    await connection.execute(text(
+                        f"ALTER TABLE {TABLE} DETACH PARTITION {name}{' CONCURRENTLY' if concurrently else ''}"
+                    ))
+                    if not settings.LOG_PARTITION_DETACH_ONLY:
+                        await connection.execute(text(f"DROP TABLE {name}"))
+                except Exception as e:
+                    logger.error(f"❌ Не удалось удалить секцию {name}: {e}")
+                    continue
+                removed.append(name)
+                rows += partition["estimated_rows"]
+        finally:
+            await cls._close(connection)
+
+        action = "отсоединены" if settings.LOG_PARTITION_DETACH_ONLY else "удалены"
+        if removed:
+            logger.info(
+                f"✅ Секции журнала старше {days_to_keep} дней {action}: {', '.join(removed)} (~{rows} строк)"
+            )
+        return {"partitions": removed, "rows": rows}
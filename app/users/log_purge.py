@@ -0,0 +1,219 @@
+# app/users/log_purge.py
+"""
+Пакетная очистка журнала users_logs без секционирования.
+
+Вместо одного DELETE по всему диапазону строки удаляются пакетами по
+LOG_PURGE_BATCH_SIZE:
+
+    DELETE FROM users_logs WHERE id IN (
+        SELECT id FROM users_logs
+        WHERE id > :watermark AND id < :frontier AND created_at < :cutoff
+        ORDER BY id LIMIT :n
+    )
+
+Каждый пакет — отдельная короткая транзакция по диапазону первичного
+ключа; блокируются только удаляемые (старые) строки, поэтому вставки в
+журнал (вход, аудит) не ждут очистку. В той же транзакции удаленные строки
+вычитаются из сводки users_logs_daily_stats (app.users.log_stats).
+Между пакетами — пауза LOG_PURGE_PAUSE_MS, длительность запуска ограничена LOG_PURGE_MAX_RUNTIME_S.
+
+frontier — id первой строки не старше срока: выше него удалять нечего, и
+поиск пакета не проходит по всей таблице. Водяной знак (последний
+удаленный id) сохраняется в LOG_PURGE_STATE_FILE: следующий пакет и
+запуск после прерванного по времени начинают с него, не перебирая мертвые
+записи индекса. Завершенный запуск сбрасывает водяной знак, чтобы
+следующий подобрал и строки, вставленные с небольшим опозданием (id
+больше, чем у соседей по времени).
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from app.config import settings
+from app.dao.session import session_scope
+from app.database import async_session_maker
+from app.logger import app_logger as logger
+from app.users.models import UserLog
+
+
+class LogPurger:
+    """Очистка старых записей журнала пакетами с отчетом о прогрессе"""
+
+    def __init__(self, batch_size: int, pause: float, max_runtime: float, state_file: str):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_runtime = max_runtime
+        self.state_file = state_file
+        self._lock = asyncio.Lock()
+        self._progress = self._empty_progress()
+
+    @staticmethod
+    def _empty_progress() -> dict:
+        return {
+            "running": False,
+            "cutoff": None,
+            "started_at": None,
+            "finished_at": None,
+            "deleted": 0,
+            "batches": 0,
+            "watermark": None,
+            "estimated_total": None,
+            "completed": None,
+            "error": None
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    def _load_watermark(self) -> int:
+        """Водяной знак прерванного запуска (0 — начать с начала)"""
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                return int(json.load(f).get("watermark", 0))
+        except (OSError, ValueError, TypeError):
+            return 0
+
+    def _save_watermark(self, watermark: int):
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"watermark": watermark, "updated_at": datetime.now(timezone.utc).isoformat()}, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить водяной знак очистки логов: {e}")
+
+    @staticmethod
+    async def _find_frontier(cutoff: datetime) -> Optional[int]:
+        """id первой записи не старше срока (None — старше срока весь журнал)"""
+        async with async_session_maker() as session:
+            return await session.scalar(
+                select(UserLog.id).where(UserLog.created_at >= cutoff).order_by(UserLog.id).limit(1)
+            )
+
+    async def _delete_batch(self, cutoff: datetime, watermark: int, frontier: Optional[int]) -> list[int]:
+        candidates = (
+            select(UserLog.id)
+            .where(UserLog.id > watermark, UserLog.created_at < cutoff)
+            .order_by(UserLog.id)
+            .limit(self.batch_size)
+        )
+        if frontier is not None:
+            candidates = candidates.where(UserLog.id < frontier)
+
+        # Импорт здесь: UserLogsDAO тянет за собой модуль пользователей
+        from app.users.dao import UserLogStatsDAO
+
+        # Своя транзакция на каждый пакет, даже если очистку вызвали из HTTP-запроса:
+        # пакет фиксируется до сохранения водяного знака и до паузы
+        async with session_scope(independent=True) as session:
+            result = await session.execute(
+                delete(UserLog)
+                .where(UserLog.id.in_(candidates.scalar_subquery()))
+                .returning(UserLog.id, UserLog.created_at, UserLog.action_type)
+            )
+            rows = [dict(row._mapping) for row in result]
+            # Сводка журнала (app.users.log_stats) — в той же транзакции
+            await UserLogStatsDAO.apply_deletes(rows)
+            return [row["id"] for row in rows]
+
+    async def purge(self, days_to_keep: int, cutoff: datetime = None) -> int:
+        """
+        Удаляет записи старше days_to_keep дней (или старше cutoff, если задан),
+        пока они не кончатся или не истечет max_runtime. Повторный вызов во
+        время работы возвращает 0.
+
+        Возвращает:
+            Количество удаленных за этот запуск записей.
+        """
+        if self._lock.locked():
+            logger.warning("⚠️ Очистка логов уже выполняется")
+            return 0
+
+        async with self._lock:
+            # Импорт здесь: UserLogsDAO тянет за собой модуль пользователей
+            from app.users.dao import UserLogsDAO
+
+            if cutoff is None:
+                cutoff = datetime.now(timezone.utc) - timedelta(days=days_to_keep)
+            cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None) if cutoff.tzinfo else cutoff
+            started = time.monotonic()
+            progress = self._empty_progress()
+            progress.update(running=True, cutoff=cutoff.isoformat(),
+                            started_at=datetime.now(timezone.utc).isoformat())
+            self._progress = progress
+
+            try:
+                watermark = self._load_watermark()
+                frontier = await self._find_frontier(cutoff)
+                progress["watermark"] = watermark
+                progress["estimated_total"], _ = await UserLogsDAO.estimate_count(UserLog.created_at < cutoff)
+
+                while True:
+                    ids = await self._delete_batch(cutoff, watermark, frontier)
+                    if ids:
+                        watermark = max(ids)
+                        progress["deleted"] += len(ids)
+                        progress["batches"] += 1
+                        progress["watermark"] = watermark
+                        self._save_watermark(watermark)
+
+                    if len(ids) < self.batch_size:
+                        progress["completed"] = True
+                        break
+                    if time.monotonic() - started >= self.max_runtime:
+                        progress["completed"] = False
+                        logger.info(f"⏸️ Очистка логов прервана по лимиту времени, удалено {progress['deleted']}")
+                        break
+                    await asyncio.sleep(self.pause)
+
+                if progress["completed"]:
+                    self._save_watermark(0)
+            except Exception as e:
+                progress["error"] = str(e)
+                raise
+            finally:
+                progress["running"] = False
+                progress["finished_at"] = datetime.now(timezone.utc).isoformat()
+                progress["elapsed_s"] = round(time.monotonic() - started, 1)
+
+            return progress["deleted"]
+
+    def get_status(self) -> dict:
+        """Прогресс текущего или последнего запуска: удалено, скорость, оценка остатка"""
+        status = dict(self._progress)
+        started_at = status["started_at"]
+        if started_at is None:
+            return status
+
+        elapsed = (
+            status.get("elapsed_s")
+            or (datetime.now(timezone.utc) - datetime.fromisoformat(started_at)).total_seconds()
+        )
+        rate = status["deleted"] / elapsed if elapsed > 0 else 0.0
+        status["rows_per_second"] = round(rate, 1)
+
+        remaining = None
+        if status["estimated_total"] is not None:
+            remaining = max(status["estimated_total"] - status["deleted"], 0)
+        status["estimated_remaining"] = remaining
+        status["eta_seconds"] = (
+            round(remaining / rate) if status["running"] and remaining is not None and rate > 0 else None
+        )
+        return status
+
+
+log_purger = LogPurger(
+    batch_size=settings.LOG_PURGE_BATCH_SIZE,
+    pause=settings.LOG_PURGE_PAUSE_MS / 1000,
+    max_runtime=settings.LOG_PURGE_MAX_RUNTIME_S,
+    state_file=settings.LOG_PURGE_STATE_FILE
+)
@@ -0,0 +1,67 @@
+# app/users/log_stats.py
+"""
+Сводная статистика журнала users_logs без сканирования таблицы на каждый запрос.
+
+Счетчики хранятся в таблице users_logs_daily_stats (UserLogDailyStat) по
+ключу (день, action_type) вместе с первой и последней записью дня. Таблица
+меняется в той же транзакции, что и журнал (UserLogStatsDAO):
+- вставки — create_log, запись входа (record_login) и пачки audit_log_writer;
+- пакетная очистка (app.users.log_purge) вычитает удаленные строки;
+- удаление секций — record_deletion() после очистки.
+
+Поэтому сводка общая для всех воркеров и точная, а summary() читает
+не больше (число дней × типов действий) строк вместо GROUP BY по журналу.
+Начальное заполнение — миграцией a4c8e2f61b93.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+
+from app.users.dao import UserLogStatsDAO
+
+
+class LogStatistics:
+    """Сводка журнала по таблице счетчиков users_logs_daily_stats"""
+
+    @staticmethod
+    async def record_deletion(before: datetime):
+        """Учитывает удаление всех записей старше before — начала суток (граница секции)"""
+        await UserLogStatsDAO.remove_before(before)
+
+    @staticmethod
+    async def summary(days: int = 30) -> dict:
+        """
+        Сводка журнала: всего записей, записи старше days дней (с точностью
+        до дня), диапазон дат, разбивки по типам действий и по дням.
+        """
+        rows = await UserLogStatsDAO.find_all(
+            columns=["day", "action_type", "count", "first_at", "last_at"], as_dicts=True
+        )
+
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+        by_action_type = defaultdict(int)
+        by_day = defaultdict(int)
+        total = old = 0
+        oldest = newest = None
+        for row in rows:
+            count = row["count"]
+            if count <= 0:
+                continue
+            total += count
+            by_action_type[row["action_type"]] += count
+            by_day[row["day"].isoformat()] += count
+            if row["day"] < cutoff:
+                old += count
+            oldest = row["first_at"] if oldest is None else min(oldest, row["first_at"])
+            newest = row["last_at"] if newest is None else max(newest, row["last_at"])
+
+        return {
+            "total_logs": total,
+            f"old_logs_{days}_days": old,
+            "oldest_log_date": oldest,
+            "newest_log_date": newest,
+            "by_action_type": dict(sorted(by_action_type.items(), key=lambda item: -item[1])),
+            "by_day": dict(sorted(by_day.items()))
+        }
+
+
+log_stats = LogStatistics()
@@ -1,5 +1,5 @@
 
-from sqlalchemy import Integer, ForeignKey, Text, text, event, DateTime
+from sqlalchemy import BigInteger, Date, Integer, ForeignKey, Text, text, event, DateTime, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import Optional, List
 from app.database import Base, str_uniq, int_pk, str_null_true
@@ -8,7 +8,14 @@ from app.tickets.models import Ticket, TicketMessage
 #from app.roles.models import Role
 
 class UserLog(Base):
+    # В PostgreSQL таблица секционирована по месяцам created_at (миграция 7f3b9d1e6a52,
+    # обслуживание — app.users.log_partitions), первичный ключ там — (id, created_at)
     __tablename__ = "users_logs"
+    __table_args__ = (
+        # Выборки журнала: по пользователю или типу действия, новые сначала
+        Index('ix_users_logs_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_users_logs_action_type_created_at', 'action_type', 'created_at'),
+    )
     
     id: Mapped[int_pk]
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -32,8 +39,29 @@ class UserLog(Base):
     def __repr__(self):
         return str(self)
 
+class UserLogDailyStat(Base):
+    # Сводка журнала по дням и типам действий (app.users.log_stats); меняется
+    # в той же транзакции, что и строки users_logs
+    __tablename__ = "users_logs_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    action_type: Mapped[str] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text('0'))
+    first_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), nullable=False)
+    last_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), nullable=False)
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(day={self.day}, action={self.action_type}, count={self.count})"
+
+    def __repr__(self):
+        return str(self)
+
 class UserAllowedIP(Base):
     __tablename__ = "users_allowed_ips"
+    __table_args__ = (
+        # Нужен для upsert (ON CONFLICT) при пакетном добавлении IP
+        Index('uq_users_allowed_ips_user_ip', 'user_id', 'ip_address', unique=True),
+    )
     
     id: Mapped[int_pk]
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -61,6 +89,9 @@ class UserAllowedIP(Base):
 
 # создаем модель таблицы Пользователей
 class User(Base):
+    # Кэш find_one_or_none_by_id, секунд (app.dao.cache); короткий, т.к. между воркерами не синхронизируется
+    __cache_ttl__ = 30
+
     id: Mapped[int_pk] #= mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
     user_phone: Mapped[str_uniq] #= mapped_column(String, unique=True, index=True, nullable=False)
     first_name: Mapped[str] = mapped_column(index=True, nullable=True)
@@ -87,6 +118,8 @@ class User(Base):
     secondary_email: Mapped[Optional[str]] = mapped_column(nullable=True)
     allowed_ips: Mapped[list["UserAllowedIP"]] = relationship("UserAllowedIP", back_populates="user", cascade="all, delete-orphan")
     security_settings: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON с настройками безопасности
+    # Версия токенов: увеличивается при смене роли или пароля, старые токены перестают действовать
+    token_version: Mapped[int] = mapped_column(default=0, nullable=False, server_default=text('0'))
 
     # Определяем отношения: один пользователь имеет одну группу
     role: Mapped["Role"] = relationship("Role", back_populates="users", lazy="joined")
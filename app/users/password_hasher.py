@@ -0,0 +1,106 @@
+# app/users/password_hasher.py
+"""
+Хеширование и проверка паролей вне event loop.
+
+bcrypt тратит 100–300 мс CPU на вызов; в async-эндпоинте это блокирует
+все остальные запросы воркера. PasswordHasher выполняет вызовы passlib в
+отдельном пуле потоков (bcrypt отпускает GIL), ограничивает число
+одновременных вычислений размером пула и длину очереди — при переполнении
+запрос получает 503 вместо бесконечного ожидания.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.monitoring.pool_metrics import LatencyHistogram
+
+
+class PasswordHasher:
+    """Пул потоков для bcrypt с ограничением очереди и метриками"""
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int = 0):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue  # 0 — без ограничения
+        self.pending = 0  # отправлено в пул и не завершено
+        self.running = 0  # выполняется в потоках пула
+        self.max_queue_depth = 0
+        self.rejected = 0
+        self.wait_latency = LatencyHistogram()
+        self.total_latency = LatencyHistogram()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Вызовы, ожидающие свободного потока"""
+        with self._lock:
+            return max(self.pending - self.running, 0)
+
+    def _call(self, submitted_at: float, func, *args):
+        with self._lock:
+            self.running += 1
+            self.wait_latency.observe((time.perf_counter() - submitted_at) * 1000)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def _run(self, func, *args):
+        queue_depth = self.queue_depth
+        if self.max_queue and queue_depth >= self.max_queue:
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, повторите попытку позже",
+                headers={"Retry-After": "1"}
+            )
+
+        with self._lock:
+            self.pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.pending - self.running)
+        submitted_at = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._call, submitted_at, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.total_latency.observe((time.perf_counter() - submitted_at) * 1000)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    def snapshot(self) -> dict:
+        """Текущая загрузка пула и накопленные метрики"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queue_depth": max(self.pending - self.running, 0),
+                "max_queue_depth": self.max_queue_depth,
+                "rejected": self.rejected,
+                "wait_latency": self.wait_latency.snapshot(),
+                "total_latency": self.total_latency.snapshot()
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,112 @@
+# app/users/principal.py
+"""
+Снимок аутентифицированного пользователя (principal) для get_current_user.
+
+Вместо ORM-объекта User зависимость отдает неизменяемый CurrentUser с
+полями, которые нужны для авторизации и шаблонов. Снимки хранятся в кэше
+сущностей (app.dao.cache, TTL+LRU) по ключу (CurrentUser, id), поэтому
+аутентифицированный запрос, который сам не обращается к БД, не делает ни
+одного запроса. Методы записи UsersDAO и UserAllowedIPsDAO сбрасывают снимок.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from app.config import settings
+from app.dao.cache import entity_cache, invalidate_entities, request_memo
+from app.dao.session import get_current_session
+
+
+@dataclass(frozen=True, slots=True)
+class RoleSnapshot:
+    id: int
+    role_name: str
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """Неизменяемый снимок текущего пользователя"""
+
+    # Включает сброс через invalidate_entities (app.dao.cache)
+    __cache_ttl__ = settings.PRINCIPAL_CACHE_TTL
+
+    id: int
+    role_id: Optional[int]
+    user_status: Optional[int]
+    token_version: int
+    first_name: Optional[str]
+    last_name: Optional[str]
+    user_nick: Optional[str]
+    user_email: str
+    user_phone: Optional[str]
+    secondary_email: Optional[str]
+    last_login: Optional[datetime]
+    created_at: Optional[datetime]
+    role: Optional[RoleSnapshot]
+
+    @classmethod
+    def from_user(cls, user) -> "CurrentUser":
+        role = user.role
+        return cls(
+            id=user.id,
+            role_id=user.role_id,
+            user_status=user.user_status,
+            token_version=user.token_version or 0,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            user_nick=user.user_nick,
+            user_email=user.user_email,
+            user_phone=user.user_phone,
+            secondary_email=user.secondary_email,
+            last_login=user.last_login,
+            created_at=user.created_at,
+            role=RoleSnapshot(id=role.id, role_name=role.role_name) if role else None
+        )
+
+    @property
+    def is_admin(self) -> bool:
+        """Проверяет, является ли пользователь администратором"""
+        return self.role_id in [1, 2]
+
+    @property
+    def is_super_admin(self) -> bool:
+        """Проверяет, является ли пользователь суперадмином"""
+        return self.role_id == 1
+
+    @property
+    def is_moderator(self) -> bool:
+        """Проверяет, является ли пользователь модератором или выше"""
+        return self.role_id in [1, 2, 3]
+
+
+def get_cached_principal(user_id: int) -> Optional[CurrentUser]:
+    """Снимок пользователя из памяти запроса или кэша процесса"""
+    key = (CurrentUser, user_id)
+    memo = request_memo()
+    if memo is not None and key in memo:
+        return memo[key]
+
+    principal = entity_cache.get(key)
+    if principal is not None and memo is not None:
+        memo[key] = principal
+    return principal
+
+
+def cache_principal(user) -> CurrentUser:
+    """Строит снимок из ORM-объекта User и кладет его в кэш"""
+    principal = CurrentUser.from_user(user)
+    key = (CurrentUser, principal.id)
+    entity_cache.set(key, principal, CurrentUser.__cache_ttl__)
+    memo = request_memo()
+    if memo is not None:
+        memo[key] = principal
+    return principal
+
+
+def invalidate_principal(user_id: Optional[int] = None, session=None):
+    """
+    Сбрасывает снимок пользователя (user_id=None — всех пользователей).
+    Если есть сессия (явная или текущего запроса), сброс повторяется после коммита.
+    """
+    ids = None if user_id is None else [user_id]
+    invalidate_entities(CurrentUser, ids, session or get_current_session())
@@ -1,25 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
+from typing import Optional, List, Literal
 import re
 import random
 import json
 import logging
-import asyncio
+from datetime import datetime
 from jose import jwt, JWTError
 from app.config import get_auth_data
-from app.tasks.log_cleanup_task import log_cleanup
 from app.logger import app_logger as logger
 from fastapi.requests import Request
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from app.users.auth import get_password_hash, authenticate_user, create_access_token
+from app.users.auth import get_password_hash_async, authenticate_user
+from app.users.tokens import (
+    ACCESS_COOKIE, REFRESH_COOKIE, create_token_pair, issue_tokens_for_user, refresh_tokens, revoke_tokens
+)
+from app.users.tokens import set_auth_cookies, clear_auth_cookies
 from app.exceptions import UserAlreadyExistsException, IncorrectEmailOrPasswordException, PasswordMismatchException
+from app.exceptions import TokenNoFoundException
 from app.users.dao import UsersDAO, UserLogsDAO
 from app.roles.dao import RolesDAO
 from app.users.rb import RBUser
 from app.users.models import User
 from app.utils.secutils import SecurityUtils
+from app.utils.streaming import stream_response, STREAM_FORMATS
+from app.utils.rate_limiter import check_rate_limit
 from app.users.log_cleaner import LogCleaner
-from app.tasks.background_tasks import background_tasks
+from app.tasks.router import get_leader_job, start_job_run
+from app.users.log_archive import log_archiver
+from app.users.log_stats import log_stats
 from app.users.ip_dao import UserAllowedIPsDAO
 from app.users.schemas import SUserBase, SUserAdd, SUserResponse, SUserListResponse, SUserAuth
 from app.users.schemas import SUserRegister, SUserByEmailResponse, SUserUpdateProfile, SUserChangePassword
@@ -59,9 +67,12 @@ async def get_categories(request: Request):
     return templates.TemplateResponse("auth.html", {"request": request})
 
 @router.post("/register/")
-async def register_user(user_data: SUserRegister) -> dict:
+async def register_user(user_data: SUserRegister, request: Request) -> dict:
     from app.users.dao import UsersDAO
     
+    # Ограничение частоты регистраций по IP и email
+    await check_rate_limit("register", request, user_data.user_email)
+
     # Проверяем существование пользователя по email
     user_by_email = await UsersDAO.find_by_email(user_data.user_email)
     if user_by_email:
@@ -87,7 +98,7 @@ async def register_user(user_data: SUserRegister) -> dict:
             user_data.last_name
         )
 
-    user_dict['user_pass'] = get_password_hash(user_data.user_pass)
+    user_dict['user_pass'] = await get_password_hash_async(user_data.user_pass)
     
     await UsersDAO.add_user(**user_dict)
     return {'message': f'Вы успешно зарегистрированы!'}
@@ -219,6 +230,9 @@ def _create_base_nick(first_name: str, last_name: str) -> str:
 
 @router.post("/login/")
 async def auth_user(response: Response, user_data: SUserAuth, request: Request):
+    # Ограничение частоты попыток входа по IP и email (до проверки пароля)
+    await check_rate_limit("login", request, user_data.user_email)
+
     check = await authenticate_user(
         user_email=user_data.user_email, 
         user_pass=user_data.user_pass,
@@ -227,30 +241,14 @@ async def auth_user(response: Response, user_data: SUserAuth, request: Request):
     if check is None:
         raise IncorrectEmailOrPasswordException
     
-    # Обновляем время последнего входа
-    success = await UsersDAO.update_last_login(check.id)
+    # Время последнего входа и запись о входе в журнал — одним запросом
+    client_ip = SecurityUtils.get_client_ip(request)
+    success = await UsersDAO.record_login(check.id, client_ip)
     if not success:
         log_error(f"Не удалось обновить last_login для пользователя {check.id}")
     
-    access_token = create_access_token({"sub": str(check.id)})
-    response.set_cookie(
-        key="users_access_token", 
-        value=access_token, 
-        httponly=True,
-        max_age=30*24*60*60,
-        path="/"
-    )
-    
-    # Логируем успешный вход с IP
-    client_ip = SecurityUtils.get_client_ip(request)
-    await UserLogsDAO.create_log(
-        user_id=check.id,
-        action_type='login',
-        old_value=None,
-        new_value=f"ip:{client_ip}",
-        description=f'Успешный вход в систему с IP {client_ip}',
-        changed_by=check.id
-    )
+    access_token, refresh_token = create_token_pair(check)
+    set_auth_cookies(response, access_token, refresh_token)
     
     result = {
         "ok": True,
@@ -267,9 +265,25 @@ async def auth_user(response: Response, user_data: SUserAuth, request: Request):
 async def get_me(user_data: User = Depends(get_current_user)):
     return user_data
 
+@router.post("/refresh/", summary="Обновить токены")
+async def refresh_user_tokens(request: Request, response: Response):
+    """
+    Обмен refresh-токена на новую пару access/refresh.
+    Токен, выданный до смены роли или пароля, отклоняется.
+    """
+    refresh_token = request.cookies.get(REFRESH_COOKIE)
+    if not refresh_token:
+        raise TokenNoFoundException
+
+    access_token, refresh_token = await refresh_tokens(refresh_token)
+    set_auth_cookies(response, access_token, refresh_token)
+    return {'ok': True, 'message': 'Токены обновлены'}
+
 @router.post("/logout/")
-async def logout_user(response: Response):
-    response.delete_cookie(key="users_access_token")
+async def logout_user(request: Request, response: Response):
+    """Выход: выданные токены отзываются (refresh-токен больше не обменивается), cookie удаляются"""
+    await revoke_tokens(request.cookies.get(REFRESH_COOKIE), request.cookies.get(ACCESS_COOKIE))
+    clear_auth_cookies(response)
     return {'message': 'Пользователь успешно вышел из системы'}
 
 @router.get("/all/", summary="Получить список всех пользователей", response_model=SUserListResponse)
@@ -300,7 +314,13 @@ async def get_all_users(
     return SUserListResponse(users=user_responses, total=len(user_responses))
 
 @router.get("/all_users/")
-async def get_all_users(user_data: User = Depends(get_current_super_admin)):
+async def get_all_users(
+    user_data: User = Depends(get_current_super_admin),
+    fmt: Optional[Literal["json", "ndjson", "csv"]] = Query(None, alias="format")
+):
+    # format=ndjson|csv — потоковая выгрузка без загрузки всей таблицы в память
+    if fmt in STREAM_FORMATS:
+        return stream_response(UsersDAO.stream_users(), fmt, UsersDAO.EXPORT_COLUMNS, filename="users")
     return await UsersDAO.find_all()
 
 # @router.get("/all_users/")
@@ -377,7 +397,7 @@ async def add_user(
         )
 
     user_data = user.model_dump()
-    user_data['user_pass'] = get_password_hash(user_data['user_pass'])
+    user_data['user_pass'] = await get_password_hash_async(user_data['user_pass'])
     
     user_id = await UsersDAO.add_user(**user_data)
     if user_id:
@@ -501,57 +521,64 @@ async def update_user_role_by_email(
     )
 
 # Новые роутеры для работы с логами
+@router.get("/logs/export/", summary="Потоковая выгрузка логов пользователей")
+async def export_users_logs(
+    user_id: Optional[int] = None,
+    action_type: Optional[str] = None,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    admin_user: User = Depends(get_current_super_admin)
+):
+    """
+    Выгрузка логов в NDJSON или CSV (только для администраторов).
+    Строки читаются из БД пачками и сразу отдаются клиенту.
+    """
+    filters = {}
+    if user_id:
+        filters['user_id'] = user_id
+    if action_type:
+        filters['action_type'] = action_type
+
+    fieldnames = [column.key for column in UserLogsDAO.model.__table__.columns]
+    return stream_response(UserLogsDAO.stream_logs(**filters), fmt, fieldnames, filename="users_logs")
+
 @router.get("/logs/", 
            summary="Получить логи пользователей", 
            response_model=SUserLogsList)
 async def get_users_logs(
     user_id: Optional[int] = None,
     action_type: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
+    changed_by: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
     admin_user: User = Depends(get_current_super_admin)
 ) -> SUserLogsList:
     """
     Получить логи пользователей (только для администраторов).
+    Пагинация по курсору: для следующей страницы передайте next_cursor из ответа.
+    total — оценка по статистике БД (total_estimated=true), а не точный подсчет.
     """
-    # Собираем фильтры
-    filters = {}
-    if user_id:
-        filters['user_id'] = user_id
-    if action_type:
-        filters['action_type'] = action_type
-    
-    # Получаем логи с помощью BaseDAO
-    logs = await UserLogsDAO.find_all(**filters)
-    
-    # Сортируем и ограничиваем результат (так как BaseDAO не поддерживает сортировку и пагинацию напрямую)
-    sorted_logs = sorted(logs, key=lambda x: x.created_at, reverse=True)
-    paginated_logs = sorted_logs[offset:offset + limit]
-    
-    # Преобразуем в схему ответа
-    log_responses = []
-    for log in paginated_logs:
-        # Получаем связанные данные пользователей
-        user = await UsersDAO.find_one_or_none_by_id(log.user_id) if log.user_id else None
-        changer = await UsersDAO.find_one_or_none_by_id(log.changed_by) if log.changed_by else None
-        
-        log_response = SUserLogResponse(
-            id=log.id,
-            user_id=log.user_id,
-            changed_by=log.changed_by,
-            action_type=log.action_type,
-            old_value=log.old_value,
-            new_value=log.new_value,
-            description=log.description,
-            created_at=log.created_at,
-            user_email=user.user_email if user else None,
-            changer_email=changer.user_email if changer else None,
-            user_name=f"{user.first_name} {user.last_name}" if user else None,
-            changer_name=f"{changer.first_name} {changer.last_name}" if changer else None
+    try:
+        page = await UserLogsDAO.get_logs_page(
+            cursor=cursor,
+            limit=limit,
+            user_id=user_id,
+            action_type=action_type,
+            changed_by=changed_by,
+            date_from=date_from,
+            date_to=date_to
         )
-        log_responses.append(log_response)
-    
-    return SUserLogsList(logs=log_responses, total=len(sorted_logs))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Email и имена пользователей уже выбраны тем же запросом
+    return SUserLogsList(
+        logs=[SUserLogResponse(**row) for row in page["items"]],
+        total=page["total"],
+        total_estimated=page["total_estimated"],
+        next_cursor=page["next_cursor"]
+    )
 
 @router.get("/logs/role-changes/", 
            summary="Получить логи изменений ролей", 
@@ -559,36 +586,32 @@ async def get_users_logs(
 async def get_role_change_logs(
     user_id: Optional[int] = None,
     days: int = 30,
+    limit: int = Query(100, ge=1, le=1000),
     admin_user: User = Depends(get_current_super_admin)
 ) -> list[SRoleChangeLog]:
     """
     Получить логи изменений ролей (только для администраторов).
     """
-    logs = await UserLogsDAO.get_recent_role_changes(days=days)
-    
-    # Если нужна фильтрация по конкретному пользователю
-    if user_id:
-        logs = [log for log in logs if log.user_id == user_id]
+    logs = await UserLogsDAO.get_role_change_logs(user_id=user_id, days=days, limit=limit)
     
     role_change_logs = []
     for log in logs:
-        if log.action_type == 'role_change':
-            # Парсим old_value и new_value
-            old_role_info = log.old_value.split(':') if log.old_value else ['', '', '']
-            new_role_info = log.new_value.split(':') if log.new_value else ['', '', '']
-            
-            role_change_log = SRoleChangeLog(
-                id=log.id,
-                user_id=log.user_id,
-                user_email=log.user.user_email if log.user else "Unknown",
-                user_name=f"{log.user.first_name} {log.user.last_name}" if log.user else "Unknown User",
-                old_role=old_role_info[2] if len(old_role_info) > 2 else "Unknown",
-                new_role=new_role_info[2] if len(new_role_info) > 2 else "Unknown",
-                changed_by=f"{log.changer.first_name} {log.changer.last_name}" if log.changer else "Unknown",
-                changer_email=log.changer.user_email if log.changer else "Unknown",
-                created_at=log.created_at
-            )
-            role_change_logs.append(role_change_log)
+        # Парсим old_value и new_value
+        old_role_info = log["old_value"].split(':') if log["old_value"] else ['', '', '']
+        new_role_info = log["new_value"].split(':') if log["new_value"] else ['', '', '']
+        
+        role_change_log = SRoleChangeLog(
+            id=log["id"],
+            user_id=log["user_id"],
+            user_email=log["user_email"] or "Unknown",
+            user_name=log["user_name"] or "Unknown User",
+            old_role=old_role_info[2] if len(old_role_info) > 2 else "Unknown",
+            new_role=new_role_info[2] if len(new_role_info) > 2 else "Unknown",
+            changed_by=log["changer_name"] or "Unknown",
+            changer_email=log["changer_email"] or "Unknown",
+            created_at=log["created_at"]
+        )
+        role_change_logs.append(role_change_log)
     
     return role_change_logs
 
@@ -597,34 +620,34 @@ async def get_role_change_logs(
            response_model=SUserLogsList)
 async def get_user_logs(
     user_id: int,
-    limit: int = 50,
-    offset: int = 0,
+    action_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
     admin_user: User = Depends(get_current_super_admin)
 ) -> SUserLogsList:
     """
     Получить логи конкретного пользователя (только для администраторов).
     """
-    logs = await UserLogsDAO.get_user_logs(user_id, limit=limit, offset=offset)
-    
-    log_responses = []
-    for log in logs:
-        log_response = SUserLogResponse(
-            id=log.id,
-            user_id=log.user_id,
-            changed_by=log.changed_by,
-            action_type=log.action_type,
-            old_value=log.old_value,
-            new_value=log.new_value,
-            description=log.description,
-            created_at=log.created_at,
-            user_email=log.user.user_email if log.user else None,
-            changer_email=log.changer.user_email if log.changer else None,
-            user_name=f"{log.user.first_name} {log.user.last_name}" if log.user else None,
-            changer_name=f"{log.changer.first_name} {log.changer.last_name}" if log.changer else None
+    try:
+        page = await UserLogsDAO.get_logs_page(
+            cursor=cursor,
+            limit=limit,
+            user_id=user_id,
+            action_type=action_type,
+            date_from=date_from,
+            date_to=date_to
         )
-        log_responses.append(log_response)
-    
-    return SUserLogsList(logs=log_responses, total=len(log_responses))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return SUserLogsList(
+        logs=[SUserLogResponse(**row) for row in page["items"]],
+        total=page["total"],
+        total_estimated=page["total_estimated"],
+        next_cursor=page["next_cursor"]
+    )
 
 @router.get("/available-roles/", 
            summary="Получить список доступных ролей для назначения")
@@ -840,22 +863,21 @@ async def check_secondary_email_availability(
 @router.put("/change-password/", summary="Сменить пароль")
 async def change_password(
     password_data: SUserChangePassword,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """
     Смена пароля пользователя
     """
-    from app.users.auth import verify_password, get_password_hash
-    
-    # Проверяем текущий пароль
-    if not verify_password(password_data.current_password, current_user.user_pass):
+    # Проверяем текущий пароль (хеша пароля в снимке текущего пользователя нет)
+    if not await UsersDAO.verify_current_password(current_user.id, password_data.current_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный текущий пароль"
         )
     
     # Хешируем новый пароль
-    new_hashed_password = get_password_hash(password_data.new_password)
+    new_hashed_password = await get_password_hash_async(password_data.new_password)
     
     # Обновляем пароль
     success = await UsersDAO.change_password(current_user.id, new_hashed_password)
@@ -875,6 +897,11 @@ async def change_password(
         description='Пароль изменен',
         changed_by=current_user.id
     )
+
+    # Смена пароля отозвала все токены — выдаем новые для текущего сеанса
+    tokens = await issue_tokens_for_user(current_user.id)
+    if tokens:
+        set_auth_cookies(response, *tokens)
     
     return {"message": "Пароль успешно изменен"}
 
@@ -918,10 +945,10 @@ async def add_ip_address(
     """
     
     # Проверяем валидность IP адреса
-    if not SecurityUtils.validate_ip_address(ip_data.ip_address):
+    if not SecurityUtils.validate_ip_or_network(ip_data.ip_address):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Неверный формат IP адреса"
+            detail="Неверный формат IP адреса или сети"
         )
     
     # Добавляем IP адрес
@@ -1008,21 +1035,17 @@ async def add_multiple_ips(
     """    
     # Валидируем все IP адреса
     for ip_item in ip_data.ip_addresses:
-        if not SecurityUtils.validate_ip_address(ip_item.ip_address):
+        if not SecurityUtils.validate_ip_or_network(ip_item.ip_address):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Неверный формат IP адреса: {ip_item.ip_address}"
             )
     
-    # Добавляем IP адреса
-    added_ips = []
-    for ip_item in ip_data.ip_addresses:
-        ip_record = await UserAllowedIPsDAO.add_ip_for_user(
-            current_user.id,
-            ip_item.ip_address,
-            ip_item.description
-        )
-        added_ips.append(ip_record)
+    # Добавляем IP адреса одним запросом
+    added_ips = await UserAllowedIPsDAO.add_multiple_ips(
+        current_user.id,
+        [ip_item.model_dump(include={'ip_address', 'description'}) for ip_item in ip_data.ip_addresses]
+    )
     
     # Логируем добавление IP
     await UserLogsDAO.create_log(
@@ -1080,12 +1103,12 @@ async def check_current_ip(
     """
     
     client_ip = SecurityUtils.get_client_ip(request)
-    is_allowed = await SecurityUtils.is_ip_allowed(current_user.id, client_ip)
+    allowlist = await SecurityUtils.get_ip_allowlist(current_user.id)
     
     return {
         "ip_address": client_ip,
-        "is_allowed": is_allowed,
-        "has_restrictions": len(await UserAllowedIPsDAO.find_by_user_id(current_user.id)) > 0
+        "is_allowed": allowlist.allows(client_ip),
+        "has_restrictions": not allowlist.is_empty
     }
 
 @router.get("/my-profile/", summary="Получить свой профиль", response_model=SUserProfileResponse)
@@ -1142,19 +1165,15 @@ async def disable_ip_restrictions(
     """
     Отключение ограничений по IP
     """
-    success = await UsersDAO.update_allowed_ips(current_user.id, [])
-    
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка при отключении ограничений IP"
-        )
+    old_ips = await UserAllowedIPsDAO.get_user_allowed_ips_list(current_user.id)
+    # Ограничения хранятся в users_allowed_ips: деактивируем все записи
+    await UserAllowedIPsDAO.deactivate_all_user_ips(current_user.id)
     
     # Логируем отключение ограничений
     await UserLogsDAO.create_log(
         user_id=current_user.id,
         action_type='ip_restrictions_disable',
-        old_value=current_user.allowed_ips or '[]',
+        old_value=json.dumps(old_ips, ensure_ascii=False),
         new_value='[]',
         description='Ограничения по IP отключены',
         changed_by=current_user.id
@@ -1162,297 +1181,87 @@ async def disable_ip_restrictions(
     
     return {"message": "Ограничения по IP отключены"}
 
-@router.post("/logs/cleanup", summary="Очистить старые логи")
+@router.post("/logs/cleanup", summary="Очистить старые логи", status_code=status.HTTP_202_ACCEPTED,
+             deprecated=True)
 async def cleanup_old_logs(
     days_to_keep: int = 30,
     current_user: User = Depends(get_current_admin)
 ):
     """
-    Ручная очистка логов старше указанного количества дней
-    """
-    if days_to_keep < 1:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Количество дней должно быть положительным числом"
-        )
-    
-    try:
-        deleted_count = await LogCleaner.cleanup_old_logs(days_to_keep)
-        
-        # Логируем действие администратора
-        await UserLogsDAO.create_log(
-            user_id=current_user.id,
-            action_type='logs_cleanup',
-            old_value=None,
-            new_value=str(deleted_count),
-            description=f'Администратор выполнил очистку логов старше {days_to_keep} дней. Удалено записей: {deleted_count}',
-            changed_by=current_user.id
-        )
-        
-        return {
-            "message": f"Удалено {deleted_count} записей логов старше {days_to_keep} дней",
-            "deleted_count": deleted_count,
-            "days_to_keep": days_to_keep
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка при очистке логов: {str(e)}"
-        )
-
-@router.get("/logs/statistics", summary="Статистика логов")
-async def get_logs_statistics(
-    current_user: User = Depends(get_current_admin)
-):
-    """
-    Получение статистики по логам
-    """
-    statistics = await LogCleaner.get_log_statistics()
-    return statistics
-
-@router.get("/logs/cleanup/status", summary="Статус фоновой очистки")
-async def get_cleanup_status(
-    current_user: User = Depends(get_current_admin)
-):
-    """
-    Получение статуса фоновой задачи очистки
+    Ручная очистка логов старше указанного количества дней — то же, что
+    POST /admin/jobs/log_cleanup/run с params {"days_to_keep": ...}.
+    Запуск идет в фоне через планировщик: только в ведущем процессе, без
+    наложения на идущий запуск (иначе 409), с проверкой параметров (400)
+    и историей. Результат — в GET /admin/jobs/log_cleanup.
     """
-    return {
-        "is_running": background_tasks.is_running,
-        "cleanup_interval_hours": background_tasks.cleanup_interval / 3600
-    }
+    get_leader_job("log_cleanup")
+    record = start_job_run("log_cleanup", {"days_to_keep": days_to_keep})
 
-@router.post("/logs/cleanup/start", summary="Запустить фоновую очистку")
-async def start_background_cleanup(
-    current_user: User = Depends(get_current_admin)
-):
-    """
-    Запуск фоновой задачи очистки логов
-    """
-    if background_tasks.is_running:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Фоновая очистка уже запущена"
-        )
-    
-    asyncio.create_task(background_tasks.start_cleanup_task())
-    
-    await UserLogsDAO.create_log(
-        user_id=current_user.id,
-        action_type='background_cleanup_start',
-        old_value="stopped",
-        new_value="started",
-        description='Администратор запустил фоновую очистку логов',
-        changed_by=current_user.id
-    )
-    
-    return {"message": "Фоновая очистка логов запущена"}
-
-@router.post("/logs/cleanup/stop", summary="Остановить фоновую очистку")
-async def stop_background_cleanup(
-    current_user: User = Depends(get_current_admin)
-):
-    """
-    Остановка фоновой задачи очистки логов
-    """
-    if not background_tasks.is_running:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Фоновая очистка не запущена"
-        )
-    
-    background_tasks.stop_cleanup_task()
-    
+    # Логируем действие администратора
     await UserLogsDAO.create_log(
         user_id=current_user.id,
-        action_type='background_cleanup_stop',
-        old_value="started",
-        new_value="stopped",
-        description='Администратор остановил фоновую очистку логов',
+        action_type='logs_cleanup',
+        old_value=None,
+        new_value=json.dumps(record["params"], default=str),
+        description=f'Администратор запустил очистку логов старше {days_to_keep} дней',
         changed_by=current_user.id
     )
-    
-    return {"message": "Фоновая очистка логов остановлена"}
-
-# Новые эндпоинты для управления очисткой логов
-@router.post("/admin/logs/cleanup-now", summary="Ручная очистка старых логов")
-async def cleanup_logs_now(
-    days_to_keep: Optional[int] = None,
-    current_user: User = Depends(get_current_admin)
-):
-    """
-    Ручной запуск очистки логов старше указанного количества дней
-    """
-    try:
-        # Если указано количество дней, временно меняем настройку
-        original_days = log_cleanup.cleanup_days
-        if days_to_keep is not None:
-            if days_to_keep < 1:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Количество дней должно быть положительным числом"
-                )
-            log_cleanup.cleanup_days = days_to_keep
-
-        deleted_count = await log_cleanup.run_cleanup()
-        
-        # Возвращаем оригинальные настройки
-        if days_to_keep is not None:
-            log_cleanup.cleanup_days = original_days
-        
-        # Логируем действие администратора
-        await UserLogsDAO.create_log(
-            user_id=current_user.id,
-            action_type='manual_logs_cleanup',
-            old_value=None,
-            new_value=str(deleted_count),
-            description=f'Администратор выполнил ручную очистку логов. Удалено: {deleted_count} записей',
-            changed_by=current_user.id
-        )
-        
-        logger.info(f"Администратор {current_user.user_email} выполнил очистку логов")
-        
-        return {
-            "message": f"Очистка завершена. Удалено {deleted_count} записей",
-            "deleted_count": deleted_count,
-            "days_to_keep": days_to_keep or original_days
-        }
-        
-    except Exception as e:
-        logger.error(f"Ошибка при ручной очистке логов: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка очистки: {str(e)}"
-        )
 
-@router.get("/admin/logs/cleanup-status", summary="Статус задачи очистки логов")
-async def get_cleanup_status(
-    current_user: User = Depends(get_current_admin)
-):
-    """
-    Получение статуса фоновой задачи очистки логов
-    """
-    logger.info(f"Администратор {current_user.user_email} запросил статус очистки")
-    
     return {
-        "is_running": log_cleanup.is_running,
-        "cleanup_days": log_cleanup.cleanup_days,
-        "interval_hours": log_cleanup.interval_hours,
-        "description": f"Автоматическая очистка логов старше {log_cleanup.cleanup_days} дней"
+        "message": f"Очистка логов старше {days_to_keep} дней запущена",
+        "days_to_keep": days_to_keep,
+        "run": record
     }
 
-@router.post("/admin/logs/cleanup/start", summary="Запуск фоновой очистки")
-async def start_background_cleanup(
+@router.get("/logs/statistics", summary="Статистика логов")
+async def get_logs_statistics(
+    days: int = Query(30, ge=1, le=3650),
+    exact: bool = False,
     current_user: User = Depends(get_current_admin)
 ):
     """
-    Запуск фоновой задачи очистки логов
-    """
-    if log_cleanup.is_running:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Фоновая очистка уже запущена"
-        )
-    
-    # Запускаем в фоне
-    asyncio.create_task(log_cleanup.start_periodic_cleanup())
-    
-    # Логируем действие
-    await UserLogsDAO.create_log(
-        user_id=current_user.id,
-        action_type='background_cleanup_start',
-        old_value="stopped",
-        new_value="started",
-        description='Администратор запустил фоновую очистку логов',
-        changed_by=current_user.id
-    )
-    
-    logger.info(f"Администратор {current_user.user_email} запустил фоновую очистку")
-    
-    return {"message": "Фоновая очистка логов запущена"}
+    Получение статистики по логам.
 
-@router.post("/admin/logs/cleanup/stop", summary="Остановка фоновой очистки")
-async def stop_background_cleanup(
+    По умолчанию — сводка из таблицы счетчиков users_logs_daily_stats
+    (разбивка по типам действий и по дням, без сканирования журнала).
+    exact=true — итоги одним агрегирующим запросом по журналу.
+    """
+    if exact:
+        return await LogCleaner.get_log_statistics()
+    return await log_stats.summary(days)
+
+@router.get("/logs/archive", summary="Поиск в архиве логов")
+async def search_logs_archive(
+    user_id: int = None,
+    action_type: str = None,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    limit: int = Query(100, ge=1, le=1000),
     current_user: User = Depends(get_current_admin)
 ):
     """
-    Остановка фоновой задачи очистки логов
+    Поиск записей, перенесенных в архив при очистке (новые сначала).
+    С диска читаются только блоки сегментов, нужные по индексу.
     """
-    if not log_cleanup.is_running:
+    if date_from and date_to and date_from >= date_to:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Фоновая очистка не запущена"
+            detail="date_from должна быть раньше date_to"
         )
-    
-    log_cleanup.stop()
-    
-    # Логируем действие
-    await UserLogsDAO.create_log(
-        user_id=current_user.id,
-        action_type='background_cleanup_stop',
-        old_value="started",
-        new_value="stopped",
-        description='Администратор остановил фоновую очистку логов',
-        changed_by=current_user.id
+    return await log_archiver.query(
+        user_id=user_id,
+        action_type=action_type,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit
     )
-    
-    logger.info(f"Администратор {current_user.user_email} остановил фоновую очистку")
-    
-    return {"message": "Фоновая очистка логов остановлена"}
 
-@router.put("/admin/logs/cleanup/settings", summary="Настройка очистки логов")
-async def update_cleanup_settings(
-    cleanup_days: Optional[int] = None,
-    interval_hours: Optional[int] = None,
-    current_user: User = Depends(get_current_admin)
-):
-    """
-    Обновление настроек очистки логов
-    """
-    old_settings = {
-        "cleanup_days": log_cleanup.cleanup_days,
-        "interval_hours": log_cleanup.interval_hours
-    }
-    
-    # Обновляем настройки если переданы
-    if cleanup_days is not None:
-        if cleanup_days < 1:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Количество дней должно быть положительным числом"
-            )
-        log_cleanup.cleanup_days = cleanup_days
-    
-    if interval_hours is not None:
-        if interval_hours < 1:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Интервал должен быть положительным числом"
-            )
-        log_cleanup.interval_hours = interval_hours
-    
-    new_settings = {
-        "cleanup_days": log_cleanup.cleanup_days,
-        "interval_hours": log_cleanup.interval_hours
-    }
-    
-    # Логируем изменение настроек
-    await UserLogsDAO.create_log(
-        user_id=current_user.id,
-        action_type='cleanup_settings_update',
-        old_value=json.dumps(old_settings),
-        new_value=json.dumps(new_settings),
-        description='Администратор обновил настройки очистки логов',
-        changed_by=current_user.id
-    )
-    
-    logger.info(f"Администратор {current_user.user_email} обновил настройки очистки: {new_settings}")
-    
+@router.get("/logs/archive/segments", summary="Сегменты архива логов")
+async def list_logs_archive_segments(current_user: User = Depends(get_current_admin)):
+    """Файлы архива логов с периодами и числом записей"""
     return {
-        "message": "Настройки очистки логов обновлены",
-        "old_settings": old_settings,
-        "new_settings": new_settings
+        "segments": await log_archiver.list_segments(),
+        "last_run": log_archiver.last_run
     }
 
 @router.get("/check-nickname")
@@ -227,6 +227,8 @@ class SUserLogResponse(SUserLogBase):
 class SUserLogsList(BaseModel):
     logs: list[SUserLogResponse]
     total: int
+    total_estimated: bool = False  # total — оценка по статистике БД, а не точный COUNT
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (keyset-пагинация)
 
 class SRoleChangeLog(BaseModel):
     id: int
@@ -334,10 +336,11 @@ class SUserAllowedIPBase(BaseModel):
     def validate_ip_address(cls, value):
         import ipaddress
         try:
-            ipaddress.ip_address(value)
-            return value
+            # Отдельный адрес или CIDR-сеть
+            ipaddress.ip_network(value.strip(), strict=False)
+            return value.strip()
         except ValueError:
-            raise ValueError(f'Неверный формат IP адреса: {value}')
+            raise ValueError(f'Неверный формат IP адреса или сети: {value}')
 
 class SUserAllowedIPCreate(SUserAllowedIPBase):
     pass
@@ -0,0 +1,268 @@
+# app/users/tokens.py
+"""
+Access- и refresh-токены.
+
+Access-токен живет ACCESS_TOKEN_EXPIRE_MINUTES и несет claims: sub (id),
+role (role_id), status (user_status) и ver (token_version). Зависимости
+авторизации проверяют роль по claims, не обращаясь к БД. Refresh-токен
+(REFRESH_TOKEN_EXPIRE_DAYS) обменивается на новую пару в /users/refresh/ или
+автоматически в TokenRefreshMiddleware — в этот момент читается БД и
+сверяется token_version пользователя.
+
+Смена роли или пароля и выход (/users/logout/) увеличивают token_version:
+refresh-токены прежней версии больше не обмениваются, старые access-токены
+в текущем воркере отклоняются сразу, в остальных — как только
+get_current_user сверит версию со снимком пользователя (не позже
+PRINCIPAL_CACHE_TTL), и в любом случае не позже истечения токена.
+Выход завершает все сеансы пользователя: версия одна на пользователя.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from jose import jwt, JWTError, ExpiredSignatureError
+
+from app.config import settings, get_auth_data
+from app.exceptions import TokenExpiredException, NoJwtException, NoUserIdException
+
+
+ACCESS_COOKIE = "users_access_token"
+REFRESH_COOKIE = "users_refresh_token"
+
+
+@dataclass(frozen=True, slots=True)
+class TokenClaims:
+    """Проверенные claims access-токена"""
+
+    user_id: int
+    role_id: Optional[int]
+    user_status: Optional[int]
+    token_version: int
+
+    @property
+    def is_admin(self) -> bool:
+        """Проверяет, является ли пользователь администратором"""
+        return self.role_id in [1, 2]
+
+    @property
+    def is_super_admin(self) -> bool:
+        """Проверяет, является ли пользователь суперадмином"""
+        return self.role_id == 1
+
+    @property
+    def is_moderator(self) -> bool:
+        """Проверяет, является ли пользователь модератором или выше"""
+        return self.role_id in [1, 2, 3]
+
+
+# Известные воркеру текущие версии токенов: user_id -> token_version.
+# Заполняется при смене роли/пароля и при каждом обновлении токенов из БД.
+_token_versions: Dict[int, int] = {}
+
+
+def note_token_version(user_id: int, version: int):
+    """Запоминает актуальную версию токенов пользователя"""
+    _token_versions[user_id] = version
+
+
+def is_token_version_current(user_id: int, version: int) -> bool:
+    """False, если версия токена меньше известной воркеру"""
+    return version >= _token_versions.get(user_id, 0)
+
+
+def _encode(payload: dict, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    to_encode = {**payload, "iat": now, "exp": now + expires_delta}
+    auth_data = get_auth_data()
+    return jwt.encode(to_encode, auth_data['secret_key'], algorithm=auth_data['algorithm'])
+
+
+def create_access_token(data: dict) -> str:
+    return _encode({**data, "type": "access"}, timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+
+
+def create_refresh_token(data: dict) -> str:
+    return _encode({**data, "type": "refresh"}, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+def create_token_pair(user) -> Tuple[str, str]:
+    """
+    Новая пара токенов для пользователя.
+    user — объект User или строка с полями id, role_id, user_status, token_version.
+    """
+    version = user.token_version or 0
+    access_token = create_access_token({
+        "sub": str(user.id),
+        "role": user.role_id,
+        "status": user.user_status,
+        "ver": version
+    })
+    refresh_token = create_refresh_token({"sub": str(user.id), "ver": version})
+    return access_token, refresh_token
+
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Проверяет подпись, срок действия и тип токена; возвращает payload"""
+    try:
+        auth_data = get_auth_data()
+        payload = jwt.decode(token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
+    except ExpiredSignatureError:
+        raise TokenExpiredException
+    except JWTError:
+        raise NoJwtException
+
+    # Токены старого формата (без типа и claims роли) требуют повторного входа
+    if "type" not in payload:
+        raise TokenExpiredException
+    if payload["type"] != token_type:
+        raise NoJwtException
+    if not payload.get('sub'):
+        raise NoUserIdException
+    return payload
+
+
+def decode_access_token(token: str) -> TokenClaims:
+    """Claims access-токена; отозванный сменой роли/пароля токен считается истекшим"""
+    payload = decode_token(token, "access")
+    claims = TokenClaims(
+        user_id=int(payload['sub']),
+        role_id=payload.get('role'),
+        user_status=payload.get('status'),
+        token_version=payload.get('ver', 0)
+    )
+    if not is_token_version_current(claims.user_id, claims.token_version):
+        raise TokenExpiredException
+    return claims
+
+
+async def issue_tokens_for_user(user_id: int) -> Optional[Tuple[str, str]]:
+    """Пара токенов по актуальному состоянию пользователя в БД (None, если его нет)"""
+    from app.users.dao import UsersDAO
+
+    state = await UsersDAO.get_token_state(user_id)
+    if state is None:
+        return None
+    note_token_version(state.id, state.token_version)
+    return create_token_pair(state)
+
+
+async def refresh_tokens(refresh_token: str) -> Tuple[str, str]:
+    """Обменивает refresh-токен на новую пару; токен прежней версии отклоняется"""
+    from app.users.dao import UsersDAO
+
+    payload = decode_token(refresh_token, "refresh")
+    state = await UsersDAO.get_token_state(int(payload['sub']))
+    if state is None:
+        raise NoUserIdException
+
+    note_token_version(state.id, state.token_version)
+    if payload.get('ver', 0) != state.token_version:
+        raise TokenExpiredException
+    return create_token_pair(state)
+
+
+async def revoke_tokens(refresh_token: Optional[str], access_token: Optional[str]) -> bool:
+    """
+    Отзывает токены пользователя по предъявленному refresh- или access-токену
+    (выход). False, если ни один из них недействителен.
+    """
+    from app.users.dao import UsersDAO
+
+    for token, token_type in ((refresh_token, "refresh"), (access_token, "access")):
+        if not token:
+            continue
+        try:
+            payload = decode_token(token, token_type)
+        except HTTPException:
+            continue
+        return await UsersDAO.revoke_tokens(int(payload['sub']), payload.get('ver', 0))
+    return False
+
+
+def set_auth_cookies(response: Response, access_token: str, refresh_token: str):
+    response.set_cookie(
+        key=ACCESS_COOKIE,
+        value=access_token,
+        httponly=True,
+        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        path="/"
+    )
+    response.set_cookie(
+        key=REFRESH_COOKIE,
+        value=refresh_token,
+        httponly=True,
+        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
+        path="/"
+    )
+
+
+def clear_auth_cookies(response: Response):
+    response.delete_cookie(key=ACCESS_COOKIE, path="/")
+    response.delete_cookie(key=REFRESH_COOKIE, path="/")
+
+
+def _is_access_valid(token: Optional[str]) -> bool:
+    if not token:
+        return False
+    try:
+        decode_access_token(token)
+    except HTTPException:
+        return False
+    return True
+
+
+def _cookie_name(set_cookie_value: bytes) -> bytes:
+    return set_cookie_value.split(b"=", 1)[0].strip()
+
+
+class TokenRefreshMiddleware:
+    """
+    ASGI middleware: если access-токен отсутствует, истек или отозван, а
+    refresh-токен есть, выпускает новую пару до обработки запроса. Новый
+    access-токен подставляется в cookie запроса, новые cookie добавляются в
+    ответ (если эндпоинт сам не установил их, например при входе/выходе).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cookies = Request(scope).cookies
+        refresh_token = cookies.get(REFRESH_COOKIE)
+        if not refresh_token or _is_access_valid(cookies.get(ACCESS_COOKIE)):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            access_token, refresh_token = await refresh_tokens(refresh_token)
+        except HTTPException:
+            # Обновить не удалось — запрос обработается как неавторизованный
+            await self.app(scope, receive, send)
+            return
+
+        cookies = {**cookies, ACCESS_COOKIE: access_token, REFRESH_COOKIE: refresh_token}
+        cookie_header = "; ".join(f"{name}={value}" for name, value in cookies.items())
+        headers = [(key, value) for key, value in scope["headers"] if key != b"cookie"]
+        headers.append((b"cookie", cookie_header.encode("latin-1")))
+        scope = {**scope, "headers": headers}
+
+        cookie_response = Response()
+        set_auth_cookies(cookie_response, access_token, refresh_token)
+        refreshed = [(key, value) for key, value in cookie_response.raw_headers if key == b"set-cookie"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response_headers = list(message.get("headers", []))
+                already_set = {_cookie_name(value) for key, value in response_headers if key == b"set-cookie"}
+                response_headers.extend(
+                    (key, value) for key, value in refreshed if _cookie_name(value) not in already_set
+                )
+                message = {**message, "headers": response_headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,196 @@
+# app/utils/rate_limiter.py
+"""
+Ограничение частоты запросов скользящим окном.
+
+Используется счетчик скользящего окна: на ключ хранятся номер текущего
+окна и число попыток в текущем и предыдущем окнах; оценка числа попыток
+за последние window секунд — prev * (доля предыдущего окна) + curr. Это
+три числа на ключ вместо списка отметок времени.
+
+Бэкенды:
+- memory — в памяти процесса (по умолчанию, без внешних сервисов),
+  устаревшие ключи периодически вычищаются;
+- redis — общий для всех воркеров (нужен пакет redis и RATE_LIMIT_REDIS_URL).
+"""
+import abc
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request
+
+from app.config import settings
+from app.exceptions import TooManyRequestsException
+from app.logger import app_logger as logger
+from app.utils.secutils import SecurityUtils
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    limit: int  # попыток
+    window: int  # секунд
+
+
+def _retry_after(prev: int, curr: int, fraction: float, rate: RateLimit) -> float:
+    """Через сколько секунд оценка окна опустится ниже лимита"""
+    if curr + 1 > rate.limit or prev == 0:
+        # Не хватит даже полного "выветривания" предыдущего окна — ждем следующее
+        return (1 - fraction) * rate.window
+    # Нужно: prev * (1 - f') + curr + 1 <= limit
+    needed_fraction = 1 - (rate.limit - curr - 1) / prev
+    return max(needed_fraction - fraction, 0) * rate.window
+
+
+class RateLimitBackend(abc.ABC):
+    """Хранилище счетчиков; hit() учитывает попытку, только если она разрешена"""
+
+    @abc.abstractmethod
+    async def hit(self, key: str, rate: RateLimit) -> float:
+        """0 — попытка разрешена и учтена, иначе секунды до следующей разрешенной"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Счетчики в памяти процесса (у каждого воркера свои)"""
+
+    EVICT_INTERVAL = 60  # секунд между чистками устаревших ключей
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # ключ -> [номер окна, попыток в предыдущем окне, попыток в текущем окне, размер окна]
+        self._counters: dict = {}
+        self._next_eviction = time.monotonic() + self.EVICT_INTERVAL
+
+    async def hit(self, key: str, rate: RateLimit) -> float:
+        now = time.monotonic()
+        if now >= self._next_eviction:
+            self._evict(now)
+
+        window_index, offset = divmod(now, rate.window)
+        window_index = int(window_index)
+        counter = self._counters.get(key)
+        if counter is None or counter[0] < window_index - 1:
+            prev, curr = 0, 0
+        elif counter[0] == window_index - 1:
+            prev, curr = counter[2], 0
+        else:
+            prev, curr = counter[1], counter[2]
+
+        fraction = offset / rate.window
+        if prev * (1 - fraction) + curr + 1 > rate.limit:
+            return _retry_after(prev, curr, fraction, rate)
+
+        if counter is None and len(self._counters) >= self.max_keys:
+            # Переполнение: сначала чистим устаревшие, затем вытесняем самые старые ключи
+            self._evict(now)
+            while len(self._counters) >= self.max_keys:
+                self._counters.pop(next(iter(self._counters)))
+        self._counters[key] = [window_index, prev, curr + 1, rate.window]
+        return 0.0
+
+    def _evict(self, now: float):
+        """Удаляет ключи, у которых и текущее, и предыдущее окно уже закончились"""
+        stale = [
+            key for key, (window_index, _, _, window) in self._counters.items()
+            if window_index < int(now // window) - 1
+        ]
+        for key in stale:
+            del self._counters[key]
+        self._next_eviction = now + self.EVICT_INTERVAL
+
+    def __len__(self):
+        return len(self._counters)
+
+
+# Проверка и учет попытки одной операцией: между чтением счетчиков и INCR
+# другой воркер не может учесть свою попытку (Lua-скрипт выполняется атомарно).
+# KEYS: предыдущее окно, текущее окно; ARGV: доля прошедшего окна, лимит, TTL.
+# Возвращает {учтена (1/0), попыток в предыдущем окне, попыток в текущем окне}.
+_HIT_SCRIPT = """
+local prev = tonumber(redis.call('GET', KEYS[1]) or '0')
+local curr = tonumber(redis.call('GET', KEYS[2]) or '0')
+if prev * (1 - tonumber(ARGV[1])) + curr + 1 > tonumber(ARGV[2]) then
+    return {0, prev, curr}
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {1, prev, curr}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Счетчики в Redis, общие для всех воркеров: по ключу на окно с TTL в два окна"""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("Для RATE_LIMIT_BACKEND=redis установите пакет redis") from e
+        self._redis = redis.from_url(url)
+        self._hit_script = self._redis.register_script(_HIT_SCRIPT)
+
+    async def hit(self, key: str, rate: RateLimit) -> float:
+        now = time.time()
+        window_index, offset = divmod(now, rate.window)
+        window_index = int(window_index)
+        curr_key = f"rate_limit:{key}:{window_index}"
+        prev_key = f"rate_limit:{key}:{window_index - 1}"
+
+        fraction = offset / rate.window
+        allowed, prev, curr = await self._hit_script(
+            keys=[prev_key, curr_key], args=[repr(fraction), rate.limit, rate.window * 2]
+        )
+        if allowed:
+            return 0.0
+        return _retry_after(int(prev), int(curr), fraction, rate)
+
+
+def create_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
+class RateLimiter:
+    """Проверка лимитов действия по IP клиента и по email аккаунта"""
+
+    def __init__(self, backend: RateLimitBackend, rules: dict):
+        self.backend = backend
+        self.rules = rules  # действие -> {"ip": RateLimit, "email": RateLimit}
+        self.rejected = 0
+
+    async def check(self, action: str, client_ip: str, email: Optional[str] = None):
+        """Учитывает попытку; при превышении лимита — 429 с Retry-After"""
+        rules = self.rules[action]
+        checks = [("ip", client_ip)]
+        if email:
+            checks.append(("email", email.strip().lower()))
+
+        for kind, identity in checks:
+            retry_after = await self.backend.hit(f"{action}:{kind}:{identity}", rules[kind])
+            if retry_after:
+                self.rejected += 1
+                logger.warning(f"⛔ Превышен лимит {action} по {kind}: {identity}")
+                raise TooManyRequestsException(retry_after=max(1, math.ceil(retry_after)))
+
+
+rate_limiter = RateLimiter(
+    create_backend(),
+    rules={
+        "login": {
+            "ip": RateLimit(settings.RATE_LIMIT_LOGIN_PER_IP, settings.RATE_LIMIT_LOGIN_WINDOW),
+            "email": RateLimit(settings.RATE_LIMIT_LOGIN_PER_EMAIL, settings.RATE_LIMIT_LOGIN_WINDOW),
+        },
+        "register": {
+            "ip": RateLimit(settings.RATE_LIMIT_REGISTER_PER_IP, settings.RATE_LIMIT_REGISTER_WINDOW),
+            "email": RateLimit(settings.RATE_LIMIT_REGISTER_PER_EMAIL, settings.RATE_LIMIT_REGISTER_WINDOW),
+        },
+    }
+)
+
+
+async def check_rate_limit(action: str, request: Request, email: Optional[str] = None):
+    """Проверка лимита для эндпоинта (ничего не делает при RATE_LIMIT_ENABLED=False)"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    await rate_limiter.check(action, SecurityUtils.get_client_ip(request), email)
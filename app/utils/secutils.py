@@ -4,6 +4,7 @@ from typing import List, Optional, Dict, Any
 from fastapi import Request
 from datetime import datetime, timezone
 from app.users.ip_dao import UserAllowedIPsDAO
+from app.users.ip_allowlist import IPAllowlist, get_cached_allowlist, cache_allowlist, parse_network
 
 class SecurityUtils:
     @staticmethod
@@ -18,16 +19,27 @@ class SecurityUtils:
         
         return ip.strip()
     
+    @staticmethod
+    async def get_ip_allowlist(user_id: int) -> IPAllowlist:
+        """Скомпилированный список разрешенных IP пользователя (из кэша или одним запросом)"""
+        allowlist = get_cached_allowlist(user_id)
+        if allowlist is None:
+            allowed_ips = await UserAllowedIPsDAO.get_user_allowed_ips_list(user_id)
+            allowlist = cache_allowlist(user_id, allowed_ips)
+        return allowlist
+
     @staticmethod
     async def is_ip_allowed(user_id: int, client_ip: str) -> bool:
-        """Проверяет, разрешен ли IP адрес для пользователя"""
+        """Проверяет, разрешен ли IP адрес для пользователя (адреса и CIDR-сети)"""
         # Если у пользователя нет ограничений по IP, разрешаем доступ
-        user_ips = await UserAllowedIPsDAO.find_by_user_id(user_id, active_only=True)
-        if not user_ips:
-            return True
-        
-        return await UserAllowedIPsDAO.is_ip_allowed(user_id, client_ip)
-    
+        allowlist = await SecurityUtils.get_ip_allowlist(user_id)
+        return allowlist.allows(client_ip)
+
+    @staticmethod
+    def is_ip_in_allowed_list(user_id: int, client_ip: str, allowed_ips: List[str]) -> bool:
+        """Проверяет IP по уже загруженному списку разрешенных и кэширует скомпилированный список"""
+        return cache_allowlist(user_id, allowed_ips).allows(client_ip)
+
     @staticmethod
     def validate_ip_address(ip: str) -> bool:
         """Валидирует IP адрес"""
@@ -37,6 +49,15 @@ class SecurityUtils:
         except ValueError:
             return False
     
+    @staticmethod
+    def validate_ip_or_network(value: str) -> bool:
+        """Валидирует IP адрес или CIDR-сеть (IPv4/IPv6)"""
+        try:
+            parse_network(value)
+            return True
+        except ValueError:
+            return False
+
     @staticmethod
     def validate_ip_restrictions(ip_list: List[str]) -> bool:
         """Валидирует список IP адресов"""
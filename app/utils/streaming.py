@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import AsyncIterable, Iterable, Optional
+
+from fastapi.responses import StreamingResponse
+
+
+STREAM_FORMATS = ("ndjson", "csv")
+
+
+def _json_default(value):
+    """Сериализация типов, которых нет в стандартном json"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+async def _ndjson_lines(items: AsyncIterable[dict]):
+    async for item in items:
+        yield json.dumps(item, ensure_ascii=False, default=_json_default) + "\n"
+
+
+async def _csv_lines(items: AsyncIterable[dict], fieldnames: Iterable[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fieldnames), extrasaction="ignore")
+
+    writer.writeheader()
+    async for item in items:
+        writer.writerow({key: _csv_value(value) for key, value in item.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder
+
+
+def stream_response(items: AsyncIterable[dict], fmt: str, fieldnames: Iterable[str],
+                    filename: Optional[str] = None) -> StreamingResponse:
+    """
+    Отдает элементы асинхронного итератора построчно в формате NDJSON или CSV,
+    не накапливая весь ответ в памяти.
+
+    Аргументы:
+        items: Асинхронный итератор словарей (например, BaseDAO.stream(as_dicts=True)).
+        fmt: "ndjson" или "csv".
+        fieldnames: Колонки CSV (для NDJSON не используются).
+        filename: Имя файла для скачивания (без расширения).
+    """
+    if fmt == "csv":
+        content, media_type = _csv_lines(items, fieldnames), "text/csv; charset=utf-8"
+    else:
+        content, media_type = _ndjson_lines(items), "application/x-ndjson"
+
+    headers = {}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return StreamingResponse(content, media_type=media_type, headers=headers)
@@ -0,0 +1,131 @@
+"""
+Бенчмарк: накладные расходы логирования на один запрос.
+
+"Запрос" — корутина, которая пишет столько же сообщений, сколько типичный
+обработчик входа: print() или отладочные сообщения, информационное
+сообщение loguru и запись через стандартный logging (InterceptHandler).
+Сравниваются конфигурации:
+  off      — без sink'ов (нижняя граница);
+  sync     — как было: синхронные sink'и, print(), zip при ротации в вызывающем потоке;
+  enqueue  — sink'и loguru с enqueue=True (запись сериализуется pickle и
+             передается через multiprocessing-очередь), zip в потоке записи;
+  app      — как сейчас (app.logger): синхронные sink'и loguru, ротация и
+             срок хранения loguru, zip после ротации в отдельном потоке
+             (compress_in_background), ленивые отладочные сообщения,
+             фильтр RateLimitFilter.
+
+Маленький --rotation-kb заставляет ротацию (и сжатие) происходить во время
+замера: в sync это видно по max (сжатие в вызывающем потоке). На одном
+ядре поток сжатия делит процессор с вызывающим, поэтому среднее у app
+близко к sync; выигрыш — в отсутствии остановок на сжатии. Вывод консольного sink'а и print()
+направляется в /dev/null. БД не нужна.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_logging --requests 80000 --rotation-kb 10240
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from loguru import logger
+
+from app.logger import InterceptHandler, RateLimitFilter, compress_in_background, wait_for_compression
+
+
+FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+stdlib_logger = logging.getLogger("bench.dao")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def configure(mode: str, directory: str, rotation_bytes: int, devnull):
+    logger.remove()
+    logging.basicConfig(handlers=[InterceptHandler()], level=logging.INFO, force=True)
+    if mode == "off":
+        return
+    path = os.path.join(directory, f"{mode}.log")
+    common = {"format": FORMAT, "level": "INFO", "enqueue": mode == "enqueue"}
+
+    if mode in ("sync", "enqueue"):
+        logger.add(devnull, colorize=False, **common)
+        logger.add(path, rotation=rotation_bytes, compression="zip", **common)
+        return
+
+    # app — как в app.logger.setup_logger; фильтр без ограничения (burst=0),
+    # чтобы все режимы писали одинаковое число сообщений
+    rate_limit = RateLimitFilter(burst=0, window=10)
+    logger.add(devnull, colorize=False, filter=rate_limit, **common)
+    logger.add(path, rotation=rotation_bytes, retention="30 days", compression=compress_in_background,
+               filter=rate_limit, **common)
+
+
+async def handle_request(mode: str, user_id: int):
+    if mode == "sync":
+        # Как в UsersDAO.update_last_login до изменений
+        print(f"🔄 Обновление last_login для пользователя {user_id}: {time.time()}")
+        print(f"✅ Last_login обновлен для пользователя {user_id}")
+    else:
+        logger.debug("🔄 Обновление last_login для пользователя {}", user_id)
+        stdlib_logger.debug("Last_login обновлен для пользователя %s", user_id)
+    logger.info("Успешный вход пользователя {}", user_id)
+    stdlib_logger.info("Вход пользователя %s с IP %s", user_id, "127.0.0.1")
+
+
+async def run(mode: str, requests: int, directory: str, rotation_bytes: int) -> dict:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        configure(mode, directory, rotation_bytes, devnull)
+        latencies = []
+        started = time.perf_counter()
+        for i in range(requests):
+            request_started = time.perf_counter()
+            await handle_request(mode, i)
+            latencies.append((time.perf_counter() - request_started) * 1e6)
+        elapsed = time.perf_counter() - started
+        # Время дописывания очереди не входит в задержку запросов
+        await logger.complete()
+        logger.remove()
+
+    return {
+        "mode": mode,
+        "mean_us": statistics.fmean(latencies),
+        "p50_us": percentile(latencies, 50),
+        "p99_us": percentile(latencies, 99),
+        "max_us": max(latencies),
+        "rps": requests / elapsed
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rotation-kb", type=int, default=1024, help="Размер ротации файла лога")
+    parser.add_argument("--modes", default="off,sync,enqueue,app")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = [
+            await run(mode, args.requests, directory, args.rotation_kb * 1024)
+            for mode in args.modes.split(",")
+        ]
+        # Дожидаемся фонового сжатия до удаления каталога
+        wait_for_compression()
+
+    print(f"{'mode':<8} {'mean µs':>9} {'p50 µs':>9} {'p99 µs':>9} {'max µs':>10} {'req/s':>10}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['mean_us']:>9.1f} {r['p50_us']:>9.1f} {r['p99_us']:>9.1f} "
+              f"{r['max_us']:>10.1f} {r['rps']:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
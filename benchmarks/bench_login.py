@@ -0,0 +1,85 @@
+"""
+Бенчмарк пропускной способности входа (POST /users/login/).
+
+Нагружает запущенный сервер параллельными входами одного пользователя и
+выводит RPS, p50/p99 задержки и среднее число запросов к БД на вход (из
+заголовка Server-Timing, который добавляет SQLMetricsMiddleware). Для
+сравнения "до/после" запустите на двух версиях с одной и той же БД.
+
+Пример:
+    python -m benchmarks.bench_login --url http://127.0.0.1:8000 \\
+        --email user@example.com --password secret --concurrency 32 --duration 20
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import time
+
+import httpx
+
+
+SERVER_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def worker(client: httpx.AsyncClient, payload: dict, deadline: float, stats: dict):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/users/login/", json=payload)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if response.status_code != 200:
+            stats["errors"][response.status_code] = stats["errors"].get(response.status_code, 0) + 1
+            continue
+
+        stats["latencies"].append(elapsed_ms)
+        match = SERVER_TIMING_RE.search(response.headers.get("server-timing", ""))
+        if match:
+            stats["db_ms"].append(float(match.group(1)))
+            stats["db_queries"].append(int(match.group(2)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Секунд нагрузки")
+    args = parser.parse_args()
+
+    payload = {"user_email": args.email, "user_pass": args.password}
+    stats = {"latencies": [], "db_ms": [], "db_queries": [], "errors": {}}
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        # Прогрев: соединения, кэш подготовленных запросов
+        await client.post("/users/login/", json=payload)
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(worker(client, payload, deadline, stats) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies = stats["latencies"]
+    print(f"concurrency={args.concurrency} duration={elapsed:.1f}s")
+    print(f"  успешных входов: {len(latencies)}, ошибок: {stats['errors'] or 0}")
+    print(f"  RPS:             {len(latencies) / elapsed:.1f}")
+    if latencies:
+        print(f"  p50, мс:         {statistics.median(latencies):.1f}")
+        print(f"  p99, мс:         {percentile(latencies, 99):.1f}")
+    if stats["db_queries"]:
+        print(f"  запросов к БД:   {statistics.mean(stats['db_queries']):.1f} на вход")
+        print(f"  время БД, мс:    {statistics.mean(stats['db_ms']):.1f} на вход")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Бенчмарк: задержки входа и постороннего эндпоинта при параллельных входах.
+
+Сравнивает проверку bcrypt прямо в async-эндпоинте (как было) и через
+PasswordHasher (пул потоков). БД не нужна: "вход" — только verify пароля.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_password_hashing --logins 64 --concurrency 16 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from passlib.context import CryptContext
+
+from app.users.password_hasher import PasswordHasher
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def build_app(context: CryptContext, hasher: PasswordHasher, hashed: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login-sync")
+    async def login_sync():
+        return {"ok": context.verify("secret-password", hashed)}
+
+    @app.post("/login-async")
+    async def login_async():
+        return {"ok": await hasher.verify("secret-password", hashed)}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def run_scenario(app: FastAPI, login_path: str, logins: int, concurrency: int) -> dict:
+    login_times, ping_times = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(login_path)
+                login_times.append((time.perf_counter() - started) * 1000)
+                assert response.json()["ok"]
+
+        async def pinger():
+            # Посторонний запрос каждые 10 мс, пока идут входы. Задержка считается
+            # от запланированного момента отправки, т.е. включает простой event loop
+            while not done.is_set():
+                scheduled = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                await client.get("/ping")
+                ping_times.append((time.perf_counter() - scheduled) * 1000)
+
+        ping_task = asyncio.create_task(pinger())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ping_task
+
+    return {
+        "throughput_rps": logins / elapsed,
+        "login_p50_ms": statistics.median(login_times),
+        "login_p99_ms": percentile(login_times, 99),
+        "ping_p50_ms": statistics.median(ping_times) if ping_times else 0.0,
+        "ping_p99_ms": percentile(ping_times, 99),
+        "ping_max_ms": max(ping_times) if ping_times else 0.0,
+        "ping_samples": len(ping_times)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64, help="Всего входов в сценарии")
+    parser.add_argument("--concurrency", type=int, default=16, help="Одновременных входов")
+    parser.add_argument("--workers", type=int, default=4, help="Потоков PasswordHasher")
+    args = parser.parse_args()
+
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    hasher = PasswordHasher(context, workers=args.workers)
+    hashed = context.hash("secret-password")
+    app = build_app(context, hasher, hashed)
+
+    print(f"logins={args.logins} concurrency={args.concurrency} workers={args.workers}")
+    for name, path in (("до: bcrypt в event loop", "/login-sync"), ("после: PasswordHasher", "/login-async")):
+        result = await run_scenario(app, path, args.logins, args.concurrency)
+        print(f"\n{name}")
+        for key, value in result.items():
+            print(f"  {key:>15}: {value:.1f}" if isinstance(value, float) else f"  {key:>15}: {value}")
+
+    print("\nметрики PasswordHasher:", hasher.snapshot()["max_queue_depth"], "макс. глубина очереди")
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Настройки приложения обязательны при импорте app.config; БД в тестах — SQLite
+for name, value in {
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "test",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def orm_models():
+    """Модели приложения: связи User ссылаются на них по имени"""
+    import app.billing.models  # noqa: F401
+    import app.chat.models  # noqa: F401
+    import app.majors.models  # noqa: F401
+    import app.roles.models  # noqa: F401
+    import app.services.models  # noqa: F401
+    import app.students.models  # noqa: F401
+    import app.tickets.models  # noqa: F401
+    import app.users.models  # noqa: F401
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def sqlite_maker(tmp_path, monkeypatch):
+    """
+    Фабрика сессий SQLite вместо основной БД: подменяется в app.dao.session,
+    через который работают все DAO.
+    """
+    import app.dao.session as session_module
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(session_module, "async_session_maker", maker)
+    monkeypatch.setattr(session_module, "_read_makers", None)
+    yield maker
+    await engine.dispose()
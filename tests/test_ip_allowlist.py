@@ -0,0 +1,68 @@
+import pytest
+
+from app.users.ip_allowlist import IPAllowlist, parse_network
+
+
+@pytest.mark.parametrize("client_ip, allowed", [
+    ("10.1.2.3", True),
+    ("10.255.255.255", True),
+    ("11.0.0.1", False),
+    ("192.168.1.10", True),
+    ("192.168.1.11", False),
+    ("172.16.5.1", True),
+    ("172.32.0.1", False),
+])
+def test_ipv4_addresses_and_cidr(client_ip, allowed):
+    allowlist = IPAllowlist(["10.0.0.0/8", "192.168.1.10", "172.16.0.0/12"])
+    assert allowlist.allows(client_ip) is allowed
+
+
+@pytest.mark.parametrize("client_ip, allowed", [
+    ("2001:db8::1", True),
+    ("2001:db8:ffff::1", True),
+    ("2001:db9::1", False),
+    ("fe80::1", True),
+    ("fe80::2", False),
+    ("10.0.0.1", False),
+])
+def test_ipv6_networks(client_ip, allowed):
+    allowlist = IPAllowlist(["2001:db8::/32", "fe80::1"])
+    assert allowlist.allows(client_ip) is allowed
+
+
+def test_ipv4_mapped_addresses_match_ipv4_entries():
+    allowlist = IPAllowlist(["203.0.113.0/24", "::ffff:198.51.100.7"])
+    assert allowlist.allows("::ffff:203.0.113.9")
+    assert allowlist.allows("198.51.100.7")
+    assert not allowlist.allows("::ffff:198.51.100.8")
+    assert parse_network("::ffff:10.0.0.0/104") == parse_network("10.0.0.0/8")
+
+
+def test_host_bits_in_network_and_overlapping_entries():
+    allowlist = IPAllowlist(["10.0.0.1/8", "10.1.0.0/16", "10.1.2.3"])
+    assert allowlist.size == 3
+    assert allowlist.allows("10.200.0.1")
+
+
+def test_empty_list_allows_everything():
+    allowlist = IPAllowlist([])
+    assert allowlist.is_empty
+    assert allowlist.allows("8.8.8.8")
+
+
+def test_invalid_entries_are_skipped_but_list_stays_restrictive():
+    allowlist = IPAllowlist(["not-an-ip", "10.0.0.0/8"])
+    assert allowlist.size == 1
+    assert allowlist.allows("10.0.0.1")
+    assert not allowlist.allows("8.8.8.8")
+
+
+def test_only_invalid_entries_fail_closed():
+    allowlist = IPAllowlist(["not-an-ip", "300.1.1.1"])
+    assert not allowlist.is_empty
+    assert not allowlist.allows("10.0.0.1")
+    assert not allowlist.allows("::1")
+
+
+def test_invalid_client_address_is_rejected():
+    assert not IPAllowlist(["0.0.0.0/0"]).allows("garbage")
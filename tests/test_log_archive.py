@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.config import settings
+from app.users.log_archive import LogArchiver, check_archive_storage
+from app.users.models import UserLog
+
+
+pytestmark = pytest.mark.anyio
+
+BASE = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+async def log_rows(sqlite_maker):
+    async with sqlite_maker() as session:
+        await session.run_sync(lambda sync_session: UserLog.__table__.create(sync_session.connection()))
+        # id назначен позже created_at (отложенная запись): строка 1 новее строк 2 и 3
+        await session.execute(insert(UserLog), [
+            {"id": 1, "user_id": 1, "changed_by": 1, "action_type": "login", "created_at": BASE + timedelta(days=5)},
+            {"id": 2, "user_id": 1, "changed_by": 1, "action_type": "login", "created_at": BASE},
+            {"id": 3, "user_id": 2, "changed_by": 1, "action_type": "update", "created_at": BASE + timedelta(days=1)},
+        ])
+        await session.commit()
+
+
+async def archived_ids(archiver: LogArchiver) -> list[int]:
+    result = await archiver.query(limit=100)
+    return sorted(row["id"] for row in result["items"])
+
+
+async def test_watermark_follows_created_at_not_id(tmp_path, log_rows):
+    archiver = LogArchiver(str(tmp_path / "archive"), "gzip", block_rows=2, segment_rows=10)
+
+    first = await archiver.archive(BASE + timedelta(days=2))
+    assert first["rows"] == 2
+    assert first["archived_before"] == BASE + timedelta(days=2)
+    assert await archived_ids(archiver) == [2, 3]
+
+    # Строка 1 с меньшим id стала старше срока позже — она не теряется
+    second = await archiver.archive(BASE + timedelta(days=10))
+    assert second["rows"] == 1
+    assert await archived_ids(archiver) == [1, 2, 3]
+
+    assert (await archiver.archive(BASE + timedelta(days=10)))["rows"] == 0
+
+
+async def test_watermark_persists_between_instances(tmp_path, log_rows):
+    directory = str(tmp_path / "archive")
+    await LogArchiver(directory, "gzip", block_rows=1, segment_rows=1).archive(BASE + timedelta(days=2))
+
+    archiver = LogArchiver(directory, "gzip", block_rows=1, segment_rows=1)
+    assert archiver._load_watermark() == (BASE + timedelta(days=1), 3)
+    assert (await archiver.archive(BASE + timedelta(days=2)))["rows"] == 0
+
+
+@pytest.fixture
+def archive_settings(monkeypatch, tmp_path):
+    from app.tasks.leader import log_cleanup_leader
+
+    monkeypatch.setattr(settings, "LOG_ARCHIVE_ENABLED", True)
+    monkeypatch.setattr(settings, "LOG_ARCHIVE_DIR", str(tmp_path / "shared"))
+    monkeypatch.setattr(log_cleanup_leader, "_enabled", True)
+    return settings
+
+
+def test_archive_requires_shared_directory_with_leader_election(archive_settings, tmp_path, monkeypatch):
+    with pytest.raises(RuntimeError, match="LOG_ARCHIVE_DIR_SHARED"):
+        check_archive_storage()
+
+    # Объявлен общим, но том не смонтирован
+    monkeypatch.setattr(archive_settings, "LOG_ARCHIVE_DIR_SHARED", True)
+    with pytest.raises(RuntimeError, match="не найден"):
+        check_archive_storage()
+
+    (tmp_path / "shared").mkdir()
+    check_archive_storage()
+
+
+def test_archive_storage_is_not_checked_without_election(archive_settings, monkeypatch):
+    from app.tasks.leader import log_cleanup_leader
+
+    monkeypatch.setattr(log_cleanup_leader, "_enabled", False)
+    check_archive_storage()
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.users import log_partitions
+from app.users.log_partitions import LogPartitionManager, add_months, month_start, partition_name
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def errors(monkeypatch):
+    messages = []
+    monkeypatch.setattr(log_partitions.logger, "error", messages.append)
+    return messages
+
+
+def with_partitions(monkeypatch, offsets):
+    current = month_start(datetime.now(timezone.utc).date())
+    partitions = [
+        {"name": partition_name(add_months(current, offset)), "month": add_months(current, offset), "estimated_rows": 0}
+        for offset in offsets
+    ]
+
+    async def list_partitions():
+        return partitions
+
+    monkeypatch.setattr(LogPartitionManager, "list_partitions", list_partitions)
+
+
+def test_add_months():
+    assert add_months(datetime(2026, 11, 1).date(), 2) == datetime(2027, 1, 1).date()
+    assert add_months(datetime(2026, 1, 1).date(), -1) == datetime(2025, 12, 1).date()
+
+
+async def test_enough_headroom_is_quiet(monkeypatch, errors):
+    with_partitions(monkeypatch, range(-2, 13))
+    assert await LogPartitionManager.check_headroom(min_months=3) == 12
+    assert errors == []
+
+
+async def test_low_headroom_is_logged_as_error(monkeypatch, errors):
+    with_partitions(monkeypatch, range(-2, 2))
+    assert await LogPartitionManager.check_headroom(min_months=3) == 1
+    assert len(errors) == 1
+
+    with_partitions(monkeypatch, [])
+    assert await LogPartitionManager.check_headroom(min_months=3) is None
+    assert len(errors) == 2
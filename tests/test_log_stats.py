@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.dao.session import session_scope
+from app.users.dao import UserLogsDAO, UserLogStatsDAO, _flush_audit_logs
+from app.users.log_purge import LogPurger
+from app.users.log_stats import log_stats
+from app.users.models import UserLog, UserLogDailyStat
+
+
+pytestmark = pytest.mark.anyio
+
+DAY = datetime(2026, 3, 10, 12, 0)
+
+
+def log_row(action_type="update", created_at=DAY):
+    return {"user_id": 1, "changed_by": 1, "action_type": action_type, "created_at": created_at}
+
+
+@pytest.fixture
+async def tables(sqlite_maker):
+    async with sqlite_maker() as session:
+        def create(sync_session):
+            for model in (UserLog, UserLogDailyStat):
+                model.__table__.create(sync_session.connection())
+        await session.run_sync(create)
+        await session.commit()
+
+
+async def counts() -> dict:
+    rows = await UserLogStatsDAO.find_all(columns=["day", "action_type", "count"], as_rows=True)
+    return {(row.day.isoformat(), row.action_type): row.count for row in rows}
+
+
+async def test_sync_and_batched_inserts_are_counted(tables):
+    await UserLogsDAO.create_log(critical=True, **log_row("login"))
+    await _flush_audit_logs([
+        log_row(),
+        log_row(created_at=DAY + timedelta(hours=1)),
+        log_row(created_at=DAY + timedelta(days=1)),
+    ])
+    assert await counts() == {
+        ("2026-03-10", "login"): 1,
+        ("2026-03-10", "update"): 2,
+        ("2026-03-11", "update"): 1,
+    }
+
+    summary = await log_stats.summary(days=30)
+    assert summary["total_logs"] == 4
+    assert summary["by_action_type"] == {"update": 3, "login": 1}
+    assert summary["by_day"] == {"2026-03-10": 3, "2026-03-11": 1}
+    assert summary["oldest_log_date"] == DAY
+    assert summary["newest_log_date"] == DAY + timedelta(days=1)
+
+
+async def test_rolled_back_insert_is_not_counted(tables):
+    with pytest.raises(RuntimeError):
+        async with session_scope():
+            await UserLogsDAO.create_log(critical=True, **log_row())
+            raise RuntimeError("откат")
+    assert await counts() == {}
+
+
+async def test_purge_batches_subtract_deleted_rows(tables, tmp_path):
+    rows = [log_row(created_at=DAY + timedelta(hours=n)) for n in range(5)]
+    rows.append(log_row("login", created_at=DAY + timedelta(days=40)))
+    await _flush_audit_logs(rows)
+
+    purger = LogPurger(batch_size=3, pause=0, max_runtime=60, state_file=str(tmp_path / "purge.json"))
+    cutoff = DAY + timedelta(days=1)
+    ids = await purger._delete_batch(cutoff, watermark=0, frontier=None)
+    assert len(ids) == 3
+    assert await counts() == {("2026-03-10", "update"): 2, ("2026-04-19", "login"): 1}
+
+    assert len(await purger._delete_batch(cutoff, watermark=max(ids), frontier=None)) == 2
+    assert await counts() == {("2026-04-19", "login"): 1}
+
+
+async def test_record_deletion_drops_days_before_boundary(tables):
+    await _flush_audit_logs([log_row(), log_row(created_at=DAY + timedelta(days=1))])
+    # Граница секции — полночь 11-го
+    await log_stats.record_deletion(datetime(2026, 3, 11))
+    summary = await log_stats.summary(days=30)
+    assert summary["by_day"] == {"2026-03-11": 1}
+    assert summary["oldest_log_date"] == DAY + timedelta(days=1)
+
+
+async def test_record_deletion_rejects_boundary_inside_day(tables):
+    await _flush_audit_logs([log_row()])
+    with pytest.raises(ValueError):
+        await log_stats.record_deletion(datetime(2026, 3, 10, 12))
+    summary = await log_stats.summary(days=30)
+    assert summary["by_day"] == {"2026-03-10": 1}
+
+
+async def test_purge_batch_commits_independently_of_caller_transaction(tables, tmp_path):
+    await _flush_audit_logs([log_row(created_at=DAY + timedelta(hours=n)) for n in range(3)])
+    purger = LogPurger(batch_size=10, pause=0, max_runtime=60, state_file=str(tmp_path / "purge.json"))
+
+    # Очистка из HTTP-запроса: транзакция запроса откатывается, пакет уже зафиксирован
+    with pytest.raises(RuntimeError):
+        async with session_scope():
+            assert len(await purger._delete_batch(DAY + timedelta(days=1), watermark=0, frontier=None)) == 3
+            raise RuntimeError("откат запроса")
+
+    assert await UserLogsDAO.find_all() == []
+    assert await counts() == {}
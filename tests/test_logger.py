@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+from loguru import logger
+
+from app import logger as logger_module
+from app.logger import RateLimitFilter
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(logger_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def sinks():
+    """Два sink'а с общим фильтром, как в setup_logger"""
+    rate_limit = RateLimitFilter(burst=2, window=10)
+    first, second, records = [], [], []
+
+    def sink(messages):
+        def write(message):
+            messages.append(message.record["message"])
+            records.append(message.record)
+        return write
+
+    ids = [
+        logger.add(sink(first), format="{message}", level="DEBUG", filter=rate_limit),
+        logger.add(sink(second), format="{message}", level="DEBUG", filter=rate_limit),
+    ]
+    yield rate_limit, first, second, records
+    for handler_id in ids:
+        logger.remove(handler_id)
+
+
+def noisy(n: int):
+    logger.bind(test_sink=True).info("шум {}", n)
+
+
+def test_noisy_site_is_suppressed_once_for_all_sinks(clock, sinks):
+    rate_limit, first, second, _ = sinks
+    for n in range(5):
+        noisy(n)
+    assert first == second == ["шум 0", "шум 1"]
+    assert rate_limit.suppressed == 3
+
+
+def test_suppressed_count_is_reported_in_next_window(clock, sinks):
+    rate_limit, first, second, records = sinks
+    for n in range(5):
+        noisy(n)
+
+    clock.now += 10
+    noisy(5)
+    assert first[2].startswith("Пропущено похожих сообщений из ")
+    assert ":noisy:" in first[2] and first[2].endswith(": 3")
+    assert first[3] == "шум 5"
+    assert first == second
+
+    # Запись не изменена фильтром: сообщение и extra — как у вызова
+    assert records[-1]["message"] == "шум 5"
+    assert records[-1]["extra"] == {"test_sink": True}
+
+    clock.now += 10
+    noisy(6)
+    assert first[-1] == "шум 6"  # в прошлом окне ничего не пропущено — без отчета
+
+
+def test_errors_are_never_suppressed(clock, sinks):
+    rate_limit, first, _, _ = sinks
+    for n in range(5):
+        logger.error("ошибка {}", n)
+    assert len(first) == 5
+    assert rate_limit.suppressed == 0
+
+
+def test_sampling(clock, sinks, monkeypatch):
+    _, first, _, _ = sinks
+    values = iter([0.5, 0.005])
+    monkeypatch.setattr(logger_module.random, "random", lambda: next(values))
+    for n in range(2):
+        logger.bind(sample=0.01).debug("выборка {}", n)
+    assert first == ["выборка 1"]
+
+
+def test_rotated_files_are_compressed_by_one_daemon_worker(tmp_path):
+    paths = []
+    for n in range(3):
+        path = tmp_path / f"app.{n}.log"
+        path.write_text(f"строка {n}\n")
+        paths.append(path)
+        logger_module.compress_in_background(str(path))
+    logger_module.wait_for_compression()
+
+    for path in paths:
+        assert not path.exists()
+        assert path.with_name(path.name + ".zip").exists()
+    workers = [t for t in threading.enumerate() if t.name == "log-compression"]
+    assert len(workers) == 1 and workers[0].daemon
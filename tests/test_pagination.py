@@ -0,0 +1,140 @@
+import base64
+import json
+from datetime import date, datetime, timedelta
+from enum import Enum
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.dao.base import BaseDAO
+from app.tickets.dao import TicketDAO
+from app.tickets.models import Ticket
+from app.users.dao import UserLogsDAO
+from app.users.models import UserLog
+
+
+pytestmark = pytest.mark.anyio
+
+BASE = datetime(2026, 5, 1, 12, 0)
+COLUMNS = [UserLog.created_at, UserLog.id]
+
+
+class Color(Enum):
+    RED = "red"
+
+
+def test_cursor_round_trip():
+    cursor = BaseDAO._encode_cursor([BASE, 42])
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert BaseDAO._decode_cursor(cursor, COLUMNS) == [BASE, 42]
+
+    # Дата, перечисление и NULL в ключе сортировки
+    raw = json.loads(base64.urlsafe_b64decode(BaseDAO._encode_cursor([date(2026, 5, 1), Color.RED, None]) + "=="))
+    assert raw == ["2026-05-01", "red", None]
+
+
+def test_cursor_rejects_unsupported_values():
+    with pytest.raises(TypeError):
+        BaseDAO._encode_cursor([object()])
+
+
+@pytest.mark.parametrize("cursor", [
+    "не base64",
+    base64.urlsafe_b64encode(b"{broken").decode(),
+    base64.urlsafe_b64encode(b'{"id": 1}').decode(),  # не список
+    BaseDAO._encode_cursor([1]),  # число значений не совпадает с полями сортировки
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        BaseDAO._decode_cursor(cursor, COLUMNS)
+
+
+@pytest.mark.parametrize("values", [
+    [12345, 1],  # время не строкой
+    ["не дата", 1],
+    [["2026-05-01"], 1],
+])
+def test_tampered_cursor_values_raise_value_error(values):
+    tampered = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    with pytest.raises(ValueError, match="Некорректный курсор пагинации"):
+        BaseDAO._decode_cursor(tampered, COLUMNS)
+
+
+def test_parse_order_by():
+    assert BaseDAO._parse_order_by("-created_at") == (["created_at", "id"], True)
+    assert BaseDAO._parse_order_by(["action_type", "id"]) == (["action_type", "id"], False)
+    with pytest.raises(ValueError):
+        BaseDAO._parse_order_by(["-created_at", "action_type"])
+
+
+@pytest.fixture
+async def logs(sqlite_maker):
+    """Пять записей, у пар 1-2 и 3-4 одинаковое время: порядок внутри пары задает id"""
+    async with sqlite_maker() as session:
+        await session.run_sync(lambda sync_session: UserLog.__table__.create(sync_session.connection()))
+        await session.execute(insert(UserLog), [
+            {"id": 1, "user_id": 1, "changed_by": 1, "action_type": "login", "created_at": BASE},
+            {"id": 2, "user_id": 1, "changed_by": 1, "action_type": "login", "created_at": BASE},
+            {"id": 3, "user_id": 2, "changed_by": 1, "action_type": "update", "created_at": BASE + timedelta(hours=1)},
+            {"id": 4, "user_id": 1, "changed_by": 1, "action_type": "login", "created_at": BASE + timedelta(hours=1)},
+            {"id": 5, "user_id": 1, "changed_by": 1, "action_type": "login", "created_at": BASE - timedelta(hours=1)},
+        ])
+        await session.commit()
+
+
+async def pages(order_by, *criteria, limit=2, **kwargs) -> list[list[int]]:
+    result, after = [], None
+    while True:
+        page = await UserLogsDAO.find_page(*criteria, order_by=order_by, after=after, limit=limit, **kwargs)
+        result.append([item["id"] if isinstance(item, dict) else item.id for item in page["items"]])
+        after = page["next_cursor"]
+        if after is None:
+            return result
+
+
+async def test_keyset_pages_break_ties_by_id(logs):
+    assert await pages("-created_at") == [[4, 3], [2, 1], [5]]
+    assert await pages("created_at") == [[5, 1], [2, 3], [4]]
+
+
+async def test_keyset_pages_with_filters(logs):
+    assert await pages("-created_at", user_id=1) == [[4, 2], [1, 5]]
+    assert await pages("-created_at", UserLog.created_at >= BASE) == [[4, 3], [2, 1]]
+
+
+async def test_new_rows_do_not_shift_next_page(logs, sqlite_maker):
+    first = await UserLogsDAO.find_page(order_by="-created_at", limit=2)
+    async with sqlite_maker() as session:
+        await session.execute(insert(UserLog), [{
+            "id": 6, "user_id": 1, "changed_by": 1, "action_type": "login", "created_at": BASE + timedelta(days=1)
+        }])
+        await session.commit()
+
+    second = await UserLogsDAO.find_page(order_by="-created_at", after=first["next_cursor"], limit=2)
+    assert [item.id for item in second["items"]] == [2, 1]
+
+
+async def test_projection_query_pages_dicts(logs):
+    query = select(UserLog.id, UserLog.created_at, UserLog.action_type)
+    assert await pages("-created_at", query=query) == [[4, 3], [2, 1], [5]]
+    page = await UserLogsDAO.find_page(order_by="-created_at", limit=1, query=query)
+    assert page["next_cursor"] == UserLogsDAO.make_cursor({"created_at": page["items"][0]["created_at"], "id": 4},
+                                                           "-created_at")
+
+
+async def test_ticket_offset_page_continues_with_cursor(sqlite_maker):
+    async with sqlite_maker() as session:
+        await session.run_sync(lambda sync_session: Ticket.__table__.create(sync_session.connection()))
+        # У всех тикетов одинаковое updated_at: порядок задает только id
+        await session.execute(insert(Ticket), [
+            {"id": n, "user_id": 1, "subject": f"t{n}", "description": "", "status": "Open",
+             "priority": "Medium", "is_pinned": False, "updated_at": BASE}
+            for n in range(1, 8)
+        ])
+        await session.commit()
+
+    order = TicketDAO.ADMIN_TICKETS_ORDER
+    page_2, cursor = await TicketDAO._fetch_tickets_page(order, page=2, page_size=2, cursor=None, filters={})
+    assert [ticket.id for ticket in page_2] == [5, 4]
+    page_3, _ = await TicketDAO._fetch_tickets_page(order, page=2, page_size=2, cursor=cursor, filters={})
+    assert [ticket.id for ticket in page_3] == [3, 2]
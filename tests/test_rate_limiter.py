@@ -0,0 +1,106 @@
+import pytest
+
+from app.exceptions import TooManyRequestsException
+from app.utils import rate_limiter as rate_limiter_module
+from app.utils.rate_limiter import (
+    MemoryRateLimitBackend, RateLimit, RateLimitBackend, RateLimiter, _retry_after
+)
+
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)  # начало окна при window=10
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", clock)
+    return clock
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+async def test_limit_within_one_window(clock):
+    backend = MemoryRateLimitBackend(max_keys=100)
+    rate = RateLimit(limit=3, window=10)
+    assert [await backend.hit("k", rate) for _ in range(3)] == [0, 0, 0]
+
+    clock.now = 1004.0
+    assert await backend.hit("k", rate) == pytest.approx(6.0)  # до следующего окна
+
+
+async def test_previous_window_is_weighted_by_remaining_fraction(clock):
+    backend = MemoryRateLimitBackend(max_keys=100)
+    rate = RateLimit(limit=4, window=10)
+    for _ in range(4):
+        assert await backend.hit("k", rate) == 0
+
+    # 25% нового окна: оценка 4 * 0.75 = 3, разрешена еще одна попытка
+    clock.now = 1012.5
+    assert await backend.hit("k", rate) == 0
+    # 4 * 0.75 + 1 + 1 > 4: ждать, пока оценка не опустится до 2 (доля 0.5)
+    assert await backend.hit("k", rate) == pytest.approx(2.5)
+
+    clock.now = 1015.0
+    assert await backend.hit("k", rate) == 0
+
+
+async def test_rejected_hits_are_not_counted(clock):
+    backend = MemoryRateLimitBackend(max_keys=100)
+    rate = RateLimit(limit=2, window=10)
+    assert [await backend.hit("k", rate) for _ in range(2)] == [0, 0]
+    for _ in range(5):
+        assert await backend.hit("k", rate) > 0
+    # В следующем окне вес предыдущего — только учтенные попытки: 2 * 0.5 + 1 <= 2
+    clock.now = 1015.0
+    assert await backend.hit("k", rate) == 0
+
+
+async def test_counters_expire_after_two_windows(clock):
+    backend = MemoryRateLimitBackend(max_keys=100)
+    rate = RateLimit(limit=1, window=10)
+    await backend.hit("old", rate)
+    clock.now = 1000.0 + backend.EVICT_INTERVAL
+    await backend.hit("new", rate)
+    assert len(backend) == 1
+    assert await backend.hit("old", rate) == 0
+
+
+async def test_key_limit_evicts_oldest(clock):
+    backend = MemoryRateLimitBackend(max_keys=2)
+    rate = RateLimit(limit=1, window=10)
+    for key in ("a", "b", "c"):
+        await backend.hit(key, rate)
+    assert len(backend) == 2
+    assert await backend.hit("a", rate) == 0  # вытеснен — счетчик начат заново
+
+
+@pytest.mark.parametrize("prev, curr, fraction, expected", [
+    (0, 5, 0.3, 7.0),  # текущее окно заполнено — до его конца
+    (10, 0, 0.0, 1.0),  # нужна доля 0.1 предыдущего окна
+    (10, 4, 0.2, 3.0),  # 10 * (1 - f) + 5 <= 10 при f >= 0.5
+    (10, 4, 0.6, 0.0),
+])
+def test_retry_after(prev, curr, fraction, expected):
+    assert _retry_after(prev, curr, fraction, RateLimit(limit=10, window=10)) == pytest.approx(expected)
+
+
+async def test_rate_limiter_checks_ip_and_email(clock):
+    limiter = RateLimiter(MemoryRateLimitBackend(max_keys=100), rules={
+        "login": {"ip": RateLimit(10, 60), "email": RateLimit(2, 60)},
+    })
+    await limiter.check("login", "10.0.0.1", "User@Example.com")
+    await limiter.check("login", "10.0.0.2", "user@example.com ")
+    with pytest.raises(TooManyRequestsException):
+        await limiter.check("login", "10.0.0.3", "USER@example.com")
+    assert limiter.rejected == 1
@@ -0,0 +1,176 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.dao.session import get_current_session, in_write_scope, session_scope
+from app.tasks.scheduler import (
+    CronTrigger, IntervalTrigger, Job, JobAlreadyRunningError, JobNotLeaderError, Scheduler
+)
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    ("*/15 * * * *", utc(2026, 3, 1, 10, 7), utc(2026, 3, 1, 10, 15)),
+    ("0 3 * * *", utc(2026, 3, 1, 3, 0), utc(2026, 3, 2, 3, 0)),
+    ("30 2 1 * *", utc(2026, 12, 5), utc(2027, 1, 1, 2, 30)),
+    ("0 9 * * 1-5", utc(2026, 10, 17, 12), utc(2026, 10, 19, 9, 0)),  # суббота -> понедельник
+    ("0 0 * * 7", utc(2026, 10, 17), utc(2026, 10, 18, 0, 0)),  # 7 — воскресенье
+    ("0 0 13 * 5", utc(2026, 10, 10), utc(2026, 10, 13, 0, 0)),  # день месяца или пятница
+    ("0 0 29 2 *", utc(2026, 1, 1), utc(2028, 2, 29, 0, 0)),
+    ("0-30/10 8,20 * * *", utc(2026, 5, 5, 8, 25), utc(2026, 5, 5, 8, 30)),
+])
+def test_cron_next_after(expression, moment, expected):
+    assert CronTrigger(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *", "* * 0 * *", "x * * * *",
+])
+def test_cron_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronTrigger(expression)
+
+
+def test_cron_without_matching_date():
+    with pytest.raises(ValueError):
+        CronTrigger("0 0 31 2 *").next_after(utc(2026, 1, 1))
+
+
+def make_job(func=None, **kwargs) -> Job:
+    async def noop():
+        return "ok"
+    return Job("test", func or noop, IntervalTrigger(3600), **kwargs)
+
+
+def test_backoff_grows_exponentially_up_to_limit():
+    job = make_job(retry_base=10, max_backoff=100)
+    delays = []
+    for failures in range(1, 6):
+        job.consecutive_failures = failures
+        delays.append(job.backoff_delay())
+    assert delays == [10, 20, 40, 80, 100]
+
+
+def test_next_run_after_failure_is_not_later_than_schedule():
+    job = make_job(retry_base=60, max_backoff=7200)
+    now = utc(2026, 1, 1)
+    assert job.compute_next_run(now) == utc(2026, 1, 1, 1, 0)
+    job.consecutive_failures = 1
+    assert job.compute_next_run(now) == utc(2026, 1, 1, 0, 1)
+    job.consecutive_failures = 10
+    assert job.compute_next_run(now) == utc(2026, 1, 1, 1, 0)
+
+
+class FakeLeader:
+    def __init__(self, is_leader: bool):
+        self.is_leader = is_leader
+
+
+@pytest.mark.anyio
+async def test_run_now_runs_in_background_and_rejects_overlap():
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return 42
+
+    scheduler = Scheduler()
+    job = make_job(slow)
+    scheduler.add_job(job)
+
+    record = scheduler.run_now("test")
+    assert record["status"] == "running" and record["reason"] == "manual"
+    assert job.is_running
+    with pytest.raises(JobAlreadyRunningError):
+        scheduler.run_now("test")
+
+    release.set()
+    await asyncio.gather(*scheduler._manual_runs)
+    assert record["status"] == "success" and record["result"] == 42
+    assert not job.is_running and job.history[0] is record
+
+
+@pytest.mark.anyio
+async def test_failed_run_is_recorded_and_counts_for_backoff():
+    async def broken():
+        raise RuntimeError("boom")
+
+    scheduler = Scheduler()
+    job = make_job(broken)
+    scheduler.add_job(job)
+    scheduler.run_now("test")
+    await asyncio.gather(*scheduler._manual_runs)
+    assert job.history[0]["status"] == "error"
+    assert job.consecutive_failures == 1
+
+
+@pytest.mark.anyio
+async def test_manual_run_does_not_inherit_request_session(sqlite_maker):
+    seen = {}
+
+    async def job_func():
+        seen["session"] = get_current_session()
+        seen["primary"] = in_write_scope()
+        return "ok"
+
+    scheduler = Scheduler()
+    scheduler.add_job(make_job(job_func))
+    # Запуск из обработчика: в контексте открыта сессия запроса
+    async with session_scope():
+        scheduler.run_now("test")
+        await asyncio.gather(*scheduler._manual_runs)
+    assert seen == {"session": None, "primary": False}
+
+
+@pytest.mark.anyio
+async def test_manual_run_params_apply_to_one_run():
+    calls = []
+
+    async def job_func(days_to_keep):
+        calls.append(days_to_keep)
+
+    def validate(params):
+        if params["days_to_keep"] < 1:
+            raise ValueError("days_to_keep должно быть положительным")
+
+    scheduler = Scheduler()
+    job = Job("test", job_func, IntervalTrigger(3600), params={"days_to_keep": 30}, validate_params=validate)
+    scheduler.add_job(job)
+    with pytest.raises(ValueError):
+        scheduler.run_now("test", {"days_to_keep": 0})
+    with pytest.raises(ValueError):
+        scheduler.run_now("test", {"unknown": 1})
+    assert not job.is_running
+
+    record = scheduler.run_now("test", {"days_to_keep": 7})
+    await asyncio.gather(*scheduler._manual_runs)
+    assert calls == [7] and record["params"] == {"days_to_keep": 7}
+    assert job.params == {"days_to_keep": 30}
+
+
+def test_non_leader_rejects_manual_run_and_changes():
+    scheduler = Scheduler()
+    job = make_job(leader=FakeLeader(is_leader=False))
+    scheduler.add_job(job)
+    with pytest.raises(JobNotLeaderError):
+        scheduler.run_now("test")
+    with pytest.raises(JobNotLeaderError):
+        scheduler.pause("test")
+    with pytest.raises(JobNotLeaderError):
+        scheduler.reschedule("test", IntervalTrigger(60))
+    assert job.enabled and not job.is_running
+    assert job.trigger.describe() == {"type": "interval", "seconds": 3600}
+
+
+def test_leader_accepts_changes():
+    scheduler = Scheduler()
+    job = make_job(leader=FakeLeader(is_leader=True))
+    scheduler.add_job(job)
+    scheduler.pause("test")
+    assert not job.enabled
+    scheduler.resume("test")
+    assert job.enabled
@@ -0,0 +1,45 @@
+import pytest
+
+from app.monitoring import sql_metrics
+from app.monitoring.sql_metrics import describe_parameters, normalize_statement, sql_config
+
+
+@pytest.fixture
+def slow_log(monkeypatch):
+    messages = []
+    monkeypatch.setattr(sql_metrics.logger, "bind", lambda **fields: sql_metrics.logger)
+    monkeypatch.setattr(sql_metrics.logger, "warning", messages.append)
+    monkeypatch.setattr(sql_config, "slow_query_ms", 0)
+    return messages
+
+
+def run_query(statement, parameters, executemany=False):
+    conn = type("Connection", (), {"info": {}})()
+    sql_metrics._before_cursor_execute(conn, None, statement, parameters, None, executemany)
+    sql_metrics._after_cursor_execute(conn, None, statement, parameters, None, executemany)
+
+
+def test_normalize_statement_collapses_parameters():
+    assert normalize_statement("SELECT *\n FROM users WHERE id IN (?, ?, ?) AND email = $1") == \
+        "SELECT * FROM users WHERE id IN (?) AND email = ?"
+
+
+def test_slow_query_parameters_are_redacted_by_default(slow_log):
+    run_query("UPDATE users SET password = $1 WHERE id = $2", ("secret-hash", 7))
+    assert len(slow_log) == 1
+    assert "secret-hash" not in slow_log[0]
+    assert "параметры: скрыты (2)" in slow_log[0]
+
+    run_query("INSERT INTO users_logs VALUES ($1)", [("a",), ("b",), ("c",)], executemany=True)
+    assert "скрыты (3 наборов)" in slow_log[1]
+
+
+def test_slow_query_parameters_are_logged_when_enabled(slow_log, monkeypatch):
+    monkeypatch.setattr(sql_config, "log_parameters", True)
+    run_query("SELECT * FROM users WHERE user_email = $1", ("user@example.com",))
+    assert "user@example.com" in slow_log[0]
+
+
+def test_redaction_setting_is_reported():
+    assert sql_config.to_dict()["log_parameters"] is False
+    assert describe_parameters(None) == "нет"
@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.exceptions import NoJwtException, TokenExpiredException
+from app.users import dependencies, tokens
+from app.users.dao import UsersDAO
+
+
+@contextmanager
+def raises(expected):
+    # Исключения приложения — классы или готовые экземпляры HTTPException
+    with pytest.raises(HTTPException) as info:
+        yield
+    if isinstance(expected, type):
+        assert isinstance(info.value, expected)
+    else:
+        assert info.value is expected
+
+
+def make_user(user_id=7, token_version=0, role_id=4):
+    return SimpleNamespace(id=user_id, role_id=role_id, user_status=1, token_version=token_version)
+
+
+@pytest.fixture(autouse=True)
+def clean_versions(monkeypatch):
+    monkeypatch.setattr(tokens, "_token_versions", {})
+
+
+@pytest.fixture
+def token_state(monkeypatch):
+    """Состояние пользователя в "БД" для refresh_tokens"""
+    users = {}
+
+    async def get_token_state(user_id):
+        return users.get(user_id)
+
+    monkeypatch.setattr(UsersDAO, "get_token_state", get_token_state)
+    return users
+
+
+def test_access_token_carries_role_and_version():
+    access_token, refresh_token = tokens.create_token_pair(make_user(token_version=3, role_id=2))
+    claims = tokens.decode_access_token(access_token)
+    assert (claims.user_id, claims.role_id, claims.token_version) == (7, 2, 3)
+    assert claims.is_admin
+    with raises(NoJwtException):
+        tokens.decode_access_token(refresh_token)
+
+
+def test_access_token_of_older_version_is_rejected():
+    access_token, _ = tokens.create_token_pair(make_user(token_version=1))
+    tokens.note_token_version(7, 1)
+    assert tokens.decode_access_token(access_token).token_version == 1
+
+    tokens.note_token_version(7, 2)
+    with raises(TokenExpiredException):
+        tokens.decode_access_token(access_token)
+
+
+def test_legacy_tokens():
+    # Без типа — старый формат, нужен повторный вход
+    legacy = tokens._encode({"sub": "7"}, timedelta(minutes=5))
+    with raises(TokenExpiredException):
+        tokens.decode_access_token(legacy)
+
+    # Без версии — считается версией 0
+    unversioned = tokens._encode({"sub": "7", "type": "access", "role": 4}, timedelta(minutes=5))
+    assert tokens.decode_access_token(unversioned).token_version == 0
+    tokens.note_token_version(7, 1)
+    with raises(TokenExpiredException):
+        tokens.decode_access_token(unversioned)
+
+
+@pytest.mark.anyio
+async def test_refresh_checks_version(token_state):
+    _, refresh_token = tokens.create_token_pair(make_user(token_version=0))
+    token_state[7] = make_user(token_version=0)
+    access_token, _ = await tokens.refresh_tokens(refresh_token)
+    assert tokens.decode_access_token(access_token).token_version == 0
+
+    # После выхода (или смены пароля) версия увеличена
+    token_state[7] = make_user(token_version=1)
+    with raises(TokenExpiredException):
+        await tokens.refresh_tokens(refresh_token)
+
+
+@pytest.mark.anyio
+async def test_logout_revokes_by_refresh_or_access_token(monkeypatch):
+    revoked = []
+
+    async def revoke(user_id, token_version):
+        revoked.append((user_id, token_version))
+        return True
+
+    monkeypatch.setattr(UsersDAO, "revoke_tokens", revoke)
+    access_token, refresh_token = tokens.create_token_pair(make_user(token_version=4))
+
+    assert await tokens.revoke_tokens(refresh_token, access_token)
+    assert await tokens.revoke_tokens("garbage", access_token)
+    assert not await tokens.revoke_tokens(None, "garbage")
+    assert revoked == [(7, 4), (7, 4)]
+
+
+@pytest.mark.anyio
+async def test_current_user_rejects_token_revoked_in_other_worker(monkeypatch):
+    principal = SimpleNamespace(id=7, token_version=2)
+
+    async def load_principal(user_id):
+        return principal
+
+    monkeypatch.setattr(dependencies, "load_principal", load_principal)
+    access_token, _ = tokens.create_token_pair(make_user(token_version=1))
+    claims = tokens.decode_access_token(access_token)  # этот воркер о смене версии не знает
+
+    with raises(TokenExpiredException):
+        await dependencies.get_current_user(claims)
+    # Версия запомнена: следующий запрос отклоняется без снимка пользователя
+    with raises(TokenExpiredException):
+        tokens.decode_access_token(access_token)
+
+    current, _ = tokens.create_token_pair(make_user(token_version=2))
+    assert await dependencies.get_current_user(tokens.decode_access_token(current)) is principal
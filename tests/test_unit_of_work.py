@@ -0,0 +1,163 @@
+import httpx
+import pytest
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Column, Integer, MetaData, String, Table, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.dao.session import (
+    UnitOfWorkMiddleware, WriteAfterCommitError, _current_session, release_request_connection,
+    savepoint_scope, session_scope
+)
+
+
+pytestmark = pytest.mark.anyio
+
+metadata = MetaData()
+items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("name", String))
+
+
+async def add_item(name: str, item_id: int = None):
+    async with session_scope() as session:
+        await session.execute(insert(items).values(id=item_id, name=name))
+
+
+async def item_names(maker) -> list[str]:
+    async with maker() as session:
+        return list((await session.scalars(select(items.c.name).order_by(items.c.id))).all())
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(UnitOfWorkMiddleware)
+    state = {}
+
+    @app.post("/ok")
+    async def ok():
+        await add_item("ok")
+        return {}
+
+    @app.post("/bad-request")
+    async def bad_request():
+        await add_item("before-400")
+        raise HTTPException(status_code=400, detail="bad")
+
+    @app.post("/crash")
+    async def crash():
+        await add_item("before-crash")
+        raise RuntimeError("boom")
+
+    @app.post("/savepoint")
+    async def savepoint():
+        await add_item("first", item_id=1)
+        with pytest.raises(IntegrityError):
+            async with savepoint_scope():
+                await add_item("duplicate", item_id=1)
+        await add_item("after-savepoint")
+        return {}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            # DAO после коммита запроса — в собственной транзакции
+            await add_item("from-stream")
+            yield b"dao-ok\n"
+            # Прямая запись в зафиксированную сессию запроса — ошибка
+            try:
+                await _current_session.get().execute(insert(items).values(name="lost"))
+            except WriteAfterCommitError:
+                state["write_after_commit"] = True
+            yield b"done\n"
+        return StreamingResponse(body())
+
+    @app.post("/background")
+    async def background(tasks: BackgroundTasks):
+        tasks.add_task(add_item, "from-background")
+        return {}
+
+    @app.post("/release")
+    async def release():
+        async with session_scope() as session:
+            await session.execute(select(items.c.id))
+        await release_request_connection()
+        # Как во время проверки пароля: соединение возвращено в пул
+        state["released"] = not _current_session.get().in_transaction()
+        await add_item("after-release")
+        return {}
+
+    @app.post("/release-after-write")
+    async def release_after_write():
+        await add_item("before-release")
+        await release_request_connection()
+        # Транзакцию с записью не разрываем: ошибка ниже откатит все
+        state["kept"] = _current_session.get().in_transaction()
+        raise RuntimeError("boom")
+
+    app.state.test_state = state
+    return app
+
+
+@pytest.fixture
+async def client(sqlite_maker):
+    async with sqlite_maker() as session:
+        await session.run_sync(lambda sync_session: metadata.create_all(sync_session.connection()))
+        await session.commit()
+    app = build_app()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        client.app = app
+        yield client
+
+
+async def test_commit_on_success(client, sqlite_maker):
+    assert (await client.post("/ok")).status_code == 200
+    assert await item_names(sqlite_maker) == ["ok"]
+
+
+async def test_handler_error_response_keeps_writes(client, sqlite_maker):
+    assert (await client.post("/bad-request")).status_code == 400
+    assert await item_names(sqlite_maker) == ["before-400"]
+
+
+async def test_rollback_on_unhandled_exception(client, sqlite_maker):
+    assert (await client.post("/crash")).status_code == 500
+    assert await item_names(sqlite_maker) == []
+
+
+async def test_savepoint_failure_keeps_request_transaction(client, sqlite_maker):
+    assert (await client.post("/savepoint")).status_code == 200
+    assert await item_names(sqlite_maker) == ["first", "after-savepoint"]
+
+
+async def test_streaming_body_writes_are_committed_or_rejected(client, sqlite_maker):
+    response = await client.get("/stream")
+    assert response.text == "dao-ok\ndone\n"
+    assert await item_names(sqlite_maker) == ["from-stream"]
+    assert client.app.state.test_state["write_after_commit"] is True
+
+
+async def test_background_task_writes_are_committed(client, sqlite_maker):
+    assert (await client.post("/background")).status_code == 200
+    assert await item_names(sqlite_maker) == ["from-background"]
+
+
+async def test_session_scope_outside_request_commits(sqlite_maker, client):
+    await add_item("standalone")
+    assert await item_names(sqlite_maker) == ["standalone"]
+
+    async with session_scope() as outer:
+        await add_item("nested")
+        assert _current_session.get() is outer
+    assert await item_names(sqlite_maker) == ["standalone", "nested"]
+
+
+async def test_release_returns_read_only_connection(client, sqlite_maker):
+    assert (await client.post("/release")).status_code == 200
+    assert client.app.state.test_state["released"] is True
+    assert await item_names(sqlite_maker) == ["after-release"]
+
+
+async def test_release_keeps_transaction_with_writes(client, sqlite_maker):
+    assert (await client.post("/release-after-write")).status_code == 500
+    assert client.app.state.test_state["kept"] is True
+    assert await item_names(sqlite_maker) == []
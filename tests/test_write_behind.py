@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.dao.session import session_scope
+from app.dao.write_behind import WriteBehindWriter
+
+
+pytestmark = pytest.mark.anyio
+
+
+class Sink:
+    """flush-функция, запоминающая пачки; строки с bad=True не вставляются"""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, rows):
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        if any(row.get("bad") for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("constraint"))
+        self.batches.append([row["n"] for row in rows])
+
+    @property
+    def rows(self):
+        return sorted(n for batch in self.batches for n in batch)
+
+
+def make_writer(sink, **kwargs) -> WriteBehindWriter:
+    options = {"queue_size": 100, "batch_size": 10, "flush_interval": 0.05, "enqueue_timeout": 0.05,
+               "max_retries": 1}
+    options.update(kwargs)
+    return WriteBehindWriter("test", sink, **options)
+
+
+async def test_flush_by_batch_size():
+    sink = Sink()
+    writer = make_writer(sink, batch_size=3, flush_interval=1)
+    writer.start()
+    for n in range(7):
+        assert await writer.submit({"n": n})
+    await asyncio.sleep(0.01)
+    assert sink.batches == [[0, 1, 2], [3, 4, 5]]
+    await writer.stop()
+    assert sink.batches[-1] == [6]
+
+
+async def test_flush_by_interval():
+    sink = Sink()
+    writer = make_writer(sink, batch_size=100, flush_interval=0.05)
+    writer.start()
+    await writer.submit({"n": 1})
+    await asyncio.sleep(0.01)
+    assert sink.batches == []
+    await asyncio.sleep(0.1)
+    assert sink.batches == [[1]]
+    await writer.stop()
+
+
+async def test_backpressure_rejects_when_queue_stays_full():
+    sink = Sink()
+    sink.release.clear()  # запись пачек "зависла"
+    writer = make_writer(sink, queue_size=2, batch_size=1, enqueue_timeout=0.02)
+    writer.start()
+    results = [await writer.submit({"n": n}) for n in range(5)]
+    # Одна запись — в зависшей пачке, две — в очереди, остальные отклонены
+    assert results == [True, True, True, False, False]
+    assert writer.rejected == 2 and writer.backpressure_waits >= 2
+
+    sink.release.set()
+    await writer.stop()
+    assert sink.rows == [0, 1, 2]
+
+
+async def test_stop_drains_queue_and_rejects_new_rows():
+    sink = Sink()
+    writer = make_writer(sink, batch_size=4, flush_interval=1)
+    writer.start()
+    for n in range(10):
+        await writer.submit({"n": n})
+    await writer.stop()
+    assert sink.rows == list(range(10))
+    assert not await writer.submit({"n": 99})
+    assert writer.stats()["written"] == 10
+
+
+async def test_bad_row_is_isolated_instead_of_dropping_batch():
+    sink = Sink()
+    writer = make_writer(sink, batch_size=8, flush_interval=1)
+    writer.start()
+    for n in range(8):
+        await writer.submit({"n": n, "bad": n == 5})
+    await writer.stop()
+    assert sink.rows == [0, 1, 2, 3, 4, 6, 7]
+    assert writer.failed == 1 and writer.written == 7
+
+
+async def test_connection_error_drops_batch_without_bisecting():
+    sink = Sink(error=OperationalError("INSERT", {}, Exception("connection refused")))
+    calls = 0
+    original = sink.__call__
+
+    async def counting(rows):
+        nonlocal calls
+        calls += 1
+        await original(rows)
+
+    writer = make_writer(counting, batch_size=8, flush_interval=1, max_retries=2)
+    writer.start()
+    for n in range(8):
+        await writer.submit({"n": n})
+    await writer.stop()
+    assert calls == 2 and writer.failed == 8
+
+
+async def test_rows_of_transaction_are_queued_after_commit_only(sqlite_maker):
+    sink = Sink()
+    writer = make_writer(sink, flush_interval=0.01)
+    writer.start()
+
+    async with session_scope() as session:
+        await session.execute(text("SELECT 1"))
+        assert await writer.submit({"n": 1}, session)
+        await asyncio.sleep(0.05)
+        assert sink.rows == []  # до коммита в очереди нет
+
+    with pytest.raises(RuntimeError):
+        async with session_scope() as session:
+            await session.execute(text("SELECT 1"))
+            await writer.submit({"n": 2}, session)
+            raise RuntimeError("откат")
+
+    await writer.stop()
+    assert sink.rows == [1]
+
+
+async def test_rows_committed_when_queue_is_full_are_written_separately(sqlite_maker):
+    sink = Sink()
+    sink.release.clear()
+    writer = make_writer(sink, queue_size=1, batch_size=1)
+    writer.start()
+    await writer.submit({"n": 0})
+    await asyncio.sleep(0.01)  # пачка с 0 зависла, очередь пуста
+
+    async with session_scope() as session:
+        await session.execute(text("SELECT 1"))
+        for n in (1, 2, 3):
+            await writer.submit({"n": n}, session)
+
+    sink.release.set()
+    await writer.stop()
+    assert sink.rows == [0, 1, 2, 3]